@@ -1,14 +1,54 @@
+import argparse
+import os
+import random
 import sqlite3
+import time
+from datetime import date, timedelta
 
+# 外键列上的索引；employee_projects(employee_id) 已由主键覆盖
+FOREIGN_KEY_INDEXES = {
+    "idx_departments_manager_id": ("departments", "manager_id"),
+    "idx_projects_department_id": ("projects", "department_id"),
+    "idx_employee_projects_project_id": ("employee_projects", "project_id"),
+}
 
-def create_sample_database():
-    """创建一个名为 sample.db 的 SQLite 数据库文件并填充数据"""
+# 批量导入时关闭回滚日志和同步写盘，这些设置不会保存到数据库文件中
+LOAD_PRAGMAS = (
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA cache_size=-262144",
+    "PRAGMA temp_store=MEMORY",
+)
 
-    # 连接到（或创建）一个名为 sample.db 的数据库文件
-    conn = sqlite3.connect("company_data.db")
-    cursor = conn.cursor()
+DEPARTMENT_NAMES = [
+    "研发",
+    "市场",
+    "销售",
+    "财务",
+    "人力资源",
+    "运营",
+    "法务",
+    "采购",
+    "客服",
+    "产品",
+]
+# 职位 -> (权重, 月薪中位数)
+POSITIONS = {
+    "工程师": (30, 10000),
+    "高级工程师": (15, 15000),
+    "专员": (20, 8000),
+    "销售代表": (15, 9000),
+    "会计": (5, 12000),
+    "主管": (10, 20000),
+    "经理": (5, 18000),
+}
+PROJECT_ROLES = ["开发者", "测试员", "研究员", "负责人", "项目经理", "主管"]
+SURNAMES = "张李王赵钱孙周吴郑冯陈褚卫蒋沈韩杨朱秦许何吕施孔曹严华金魏陶姜"
+GIVEN_NAMES = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰萍红"
 
-    # --- 创建表 ---
+
+def create_tables(cursor):
+    """创建四张表"""
 
     # 创建员工表
     cursor.execute(
@@ -67,6 +107,23 @@ def create_sample_database():
     """
     )
 
+
+def create_indexes(cursor):
+    """为外键列创建索引"""
+    for index_name, (table, column) in FOREIGN_KEY_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({column})")
+
+
+def create_sample_database():
+    """创建一个名为 sample.db 的 SQLite 数据库文件并填充数据"""
+
+    # 连接到（或创建）一个名为 sample.db 的数据库文件
+    conn = sqlite3.connect("company_data.db")
+    cursor = conn.cursor()
+
+    # --- 创建表 ---
+    create_tables(cursor)
+
     # --- 插入示例数据 (使用 INSERT OR IGNORE 防止重复插入) ---
 
     # 员工数据
@@ -126,6 +183,8 @@ def create_sample_database():
         "INSERT OR IGNORE INTO employee_projects VALUES (?, ?, ?, ?)", employee_projects
     )
 
+    create_indexes(cursor)
+
     # 提交更改
     conn.commit()
 
@@ -135,6 +194,156 @@ def create_sample_database():
     print("数据库 'sample.db' 已成功创建并填充数据。")
 
 
+def skewed_index(rng, n, skew=2.0):
+    """在 0..n-1 中取一个下标，越小的下标越容易被选中"""
+    return min(n - 1, int(n * rng.random() ** skew))
+
+
+def department_name(i):
+    """第 i 个部门的简称，与 employees.department 一致，部门表中的名称再加上“部”"""
+    base = DEPARTMENT_NAMES[i % len(DEPARTMENT_NAMES)]
+    round_ = i // len(DEPARTMENT_NAMES)
+    return base if round_ == 0 else f"{base}{round_ + 1}"
+
+
+def create_scaled_database(
+    db_path,
+    employees,
+    departments,
+    projects,
+    projects_per_employee=3,
+    seed=42,
+):
+    """按给定规模生成数据库：N 名员工、M 个部门和项目，以及稠密的员工项目关联表
+
+    相同的参数和 seed 总是生成相同的数据。所有数据在一个事务中用 executemany
+    批量写入，写完后再建外键索引并执行 ANALYZE。
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    for pragma in LOAD_PRAGMAS:
+        cursor.execute(pragma)
+    create_tables(cursor)
+
+    # 员工：部门规模不均匀，前面的部门人更多
+    position_names = list(POSITIONS)
+    position_weights = [POSITIONS[p][0] for p in position_names]
+    first_day = date(2010, 1, 1)
+    span = (date(2024, 12, 31) - first_day).days
+    employee_departments = []
+    employee_rows = []
+    for employee_id in range(1, employees + 1):
+        dept = skewed_index(rng, departments, 1.5)
+        position = rng.choices(position_names, position_weights)[0]
+        name = rng.choice(SURNAMES) + "".join(
+            rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2))
+        )
+        employee_departments.append(dept)
+        employee_rows.append(
+            (
+                employee_id,
+                name,
+                department_name(dept),
+                position,
+                round(POSITIONS[position][1] * rng.lognormvariate(0, 0.25), -2),
+                (first_day + timedelta(days=rng.randrange(span))).isoformat(),
+            )
+        )
+    cursor.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?, ?)", employee_rows)
+
+    # 部门：经理取该部门的第一名员工
+    managers = {}
+    for employee_id, dept in enumerate(employee_departments, start=1):
+        managers.setdefault(dept, employee_id)
+    cursor.executemany(
+        "INSERT INTO departments VALUES (?, ?, ?, ?)",
+        (
+            (
+                dept + 1,
+                department_name(dept) + "部",
+                managers.get(dept),
+                round(rng.uniform(1, 50)) * 100000,
+            )
+            for dept in range(departments)
+        ),
+    )
+
+    # 项目
+    project_rows = []
+    for project_id in range(1, projects + 1):
+        start = first_day + timedelta(days=rng.randrange(span))
+        end = start + timedelta(days=rng.randint(30, 720))
+        project_rows.append(
+            (
+                project_id,
+                f"项目{project_id:05d}",
+                skewed_index(rng, departments, 1.5) + 1,
+                start.isoformat(),
+                None if rng.random() < 0.2 else end.isoformat(),
+                round(rng.uniform(1, 100)) * 10000,
+            )
+        )
+    cursor.executemany("INSERT INTO projects VALUES (?, ?, ?, ?, ?, ?)", project_rows)
+
+    # 员工项目关联：每名员工参与 projects_per_employee 个不同的项目
+    per_employee = min(projects_per_employee, projects)
+
+    def assignments():
+        for employee_id in range(1, employees + 1):
+            for project_id in rng.sample(range(1, projects + 1), per_employee):
+                yield (
+                    employee_id,
+                    project_id,
+                    rng.choice(PROJECT_ROLES),
+                    rng.randrange(10, 200, 10),
+                )
+
+    cursor.executemany(
+        "INSERT INTO employee_projects VALUES (?, ?, ?, ?)", assignments()
+    )
+
+    create_indexes(cursor)
+    conn.commit()
+    cursor.execute("ANALYZE")
+    conn.close()
+
+    total = employees + departments + projects + employees * per_employee
+    elapsed = time.perf_counter() - started
+    print(
+        f"数据库 '{db_path}' 已生成：{employees} 名员工，{departments} 个部门，"
+        f"{projects} 个项目，{employees * per_employee} 条员工项目关联，"
+        f"共 {total} 行，耗时 {elapsed:.1f} 秒"
+    )
+
+
 # --- 运行函数 ---
 if __name__ == "__main__":
-    create_sample_database()
+    parser = argparse.ArgumentParser(description="创建 company_data.db 示例数据库")
+    parser.add_argument("--employees", type=int, help="按规模生成：员工数量")
+    parser.add_argument("--departments", type=int, help="部门数量，默认按员工数推算")
+    parser.add_argument("--projects", type=int, help="项目数量，默认按员工数推算")
+    parser.add_argument(
+        "--projects-per-employee", type=int, default=3, help="每名员工参与的项目数"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument(
+        "--output", default="company_data_scaled.db", help="按规模生成时的输出文件"
+    )
+    args = parser.parse_args()
+
+    if args.employees:
+        create_scaled_database(
+            args.output,
+            employees=args.employees,
+            departments=args.departments or max(5, args.employees // 2000),
+            projects=args.projects or max(6, args.employees // 50),
+            projects_per_employee=args.projects_per_employee,
+            seed=args.seed,
+        )
+    else:
+        create_sample_database()
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+
+class PoolClosedError(RuntimeError):
+    """Raised when a connection is requested from a closed pool"""
+
+
+def sqlite_uri(path: str, read_only: bool = False, immutable: bool = False) -> str:
+    """Build a ``file:`` URI for aiosqlite.connect(..., uri=True).
+
+    ``mode=ro`` makes SQLite refuse every write at the file level.
+    ``immutable=1`` additionally promises that nobody else changes the
+    file, so SQLite skips locking and change detection entirely; only use
+    it for databases that really are static while the server runs.
+    """
+    params = []
+    if read_only:
+        params.append("mode=ro")
+    if immutable:
+        params.append("immutable=1")
+    uri = f"file:{quote(os.path.abspath(path))}"
+    return f"{uri}?{'&'.join(params)}" if params else uri
+
+
+def pragma_hook(
+    pragmas: Dict[str, Any],
+) -> Callable[[aiosqlite.Connection], Awaitable[None]]:
+    """Return an on_connect hook that applies pragmas to each new connection"""
+
+    async def apply(db: aiosqlite.Connection) -> None:
+        for name, value in pragmas.items():
+            await db.execute_fetchall(f"PRAGMA {name}={value}")
+
+    return apply
+
+
+class ConnectionPool:
+    """A bounded pool of long-lived aiosqlite connections.
+
+    Each aiosqlite connection owns a background thread, so opening one per
+    request is expensive. The pool opens ``size`` connections up front and
+    hands them out with ``acquire()``; callers that find every connection
+    busy wait until one is returned. Idle connections are reused most
+    recently released first, which keeps one connection's page cache hot
+    under light traffic.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        size: int = 4,
+        health_check_interval: float = 30.0,
+        acquire_timeout: Optional[float] = None,
+        **connect_kwargs,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.database = database
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.connect_kwargs = connect_kwargs
+
+        self._idle: "asyncio.LifoQueue[aiosqlite.Connection]" = asyncio.LifoQueue()
+        self._connections: List[aiosqlite.Connection] = []
+        # Connections open or being opened; may dip below size after a failure
+        self._total = 0
+        self._last_used = {}
+        self._lock = asyncio.Lock()
+        self._opened = False
+        self._closed = False
+        self._connect_hooks: List[Callable[[aiosqlite.Connection], Awaitable[None]]] = (
+            []
+        )
+        self._wait_observers: List[Callable[[float], None]] = []
+
+    def on_connect(
+        self, hook: Callable[[aiosqlite.Connection], Awaitable[None]]
+    ) -> None:
+        """Register a coroutine run on every new connection before first use"""
+        self._connect_hooks.append(hook)
+
+    def on_acquire(self, observer: Callable[[float], None]) -> None:
+        """Register a callback given the seconds each acquire() waited"""
+        self._wait_observers.append(observer)
+
+    async def _connect(self) -> aiosqlite.Connection:
+        self._total += 1
+        try:
+            db = await aiosqlite.connect(self.database, **self.connect_kwargs)
+        except Exception:
+            self._total -= 1
+            raise
+        db.row_factory = aiosqlite.Row
+        try:
+            for hook in self._connect_hooks:
+                await hook(db)
+        except Exception:
+            self._total -= 1
+            await db.close()
+            raise
+        self._connections.append(db)
+        self._last_used[id(db)] = time.monotonic()
+        return db
+
+    async def _discard(self, db: aiosqlite.Connection) -> None:
+        if db in self._connections:
+            self._connections.remove(db)
+            self._total -= 1
+        self._last_used.pop(id(db), None)
+        try:
+            await db.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled connection: {e}")
+
+    async def open(self) -> None:
+        """Open and warm up every connection in the pool"""
+        async with self._lock:
+            if self._opened:
+                return
+            if self._closed:
+                raise PoolClosedError("Connection pool is closed")
+            for _ in range(self.size):
+                db = await self._connect()
+                # Touch the schema so the first real query skips the parse.
+                # Statements must run to completion: aiosqlite keeps the last
+                # cursor alive, and an unfinished one holds a read lock.
+                await db.execute_fetchall("SELECT count(*) FROM sqlite_master")
+                self._idle.put_nowait(db)
+            self._opened = True
+            logger.info(
+                f"Opened connection pool of {self.size} connections to {self.database}"
+            )
+
+    async def _healthy(self, db: aiosqlite.Connection) -> bool:
+        idle_for = time.monotonic() - self._last_used.get(id(db), 0)
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            await db.execute_fetchall("SELECT 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {e}")
+            return False
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Check a connection out of the pool for the duration of the block"""
+        if not self._opened:
+            await self.open()
+        if self._closed:
+            raise PoolClosedError("Connection pool is closed")
+
+        began = time.perf_counter()
+        if self._idle.empty() and self._total < self.size:
+            # Refill a slot lost to a connection that could not be replaced
+            db = await self._connect()
+        else:
+            db = await asyncio.wait_for(self._idle.get(), self.acquire_timeout)
+            if not await self._healthy(db):
+                await self._discard(db)
+                db = await self._connect()
+        waited = time.perf_counter() - began
+        for observer in self._wait_observers:
+            observer(waited)
+
+        try:
+            yield db
+        finally:
+            await self._release(db)
+
+    async def _release(self, db: aiosqlite.Connection) -> None:
+        if self._closed:
+            await self._discard(db)
+            return
+        try:
+            # Never hand out a connection with a half-finished transaction
+            if db.in_transaction:
+                await db.rollback()
+        except Exception as e:
+            logger.warning(f"Dropping broken pooled connection: {e}")
+            await self._discard(db)
+            return
+        self._last_used[id(db)] = time.monotonic()
+        self._idle.put_nowait(db)
+
+    async def close(self) -> None:
+        """Close every idle connection; busy ones are closed on release"""
+        async with self._lock:
+            self._closed = True
+            while not self._idle.empty():
+                await self._discard(self._idle.get_nowait())
+            if self._opened:
+                logger.info(f"Closed connection pool for {self.database}")
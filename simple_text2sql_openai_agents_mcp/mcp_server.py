@@ -2,12 +2,38 @@
 import os
 import aiosqlite
 import asyncio
+import time
+import uuid
+from itertools import islice
+from contextlib import asynccontextmanager, nullcontext
 from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple, Union
 from dotenv import load_dotenv
 import logging
 
+from db_pool import ConnectionPool, pragma_hook, sqlite_uri
+from heavy_queries import HeavyQueryPool
+from index_advisor import IndexAdvisor, quote_identifier
+from materialized import MaterializedViews, load_definitions
+from pagination import decode_page_token, encode_page_token, paginated_sql
+from query_budget import BudgetExceeded, QueryBudgets
+from query_cache import QueryCache, is_cacheable, normalize_sql
+from query_stats import STAT_ORDERS, QueryStats
+from result_export import EXPORT_FORMATS, export_rows
+from result_format import RESULT_FORMATS, encode_rows
+from row_counts import RowCounts
+from sample_data import sample_rows
+from server_metrics import ServerMetrics
+from shards import ShardSet, plan_merge, shard_paths
+from sql_guard import QueryRejected, SqlGuard
+from startup import Startup, analyze_if_missing
+from statement_cache import StatementCacheStats
+from write_queue import WriteQueue
+from schema_cache import SchemaCache
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
@@ -21,17 +47,172 @@ load_dotenv()
 DB_PATH = str(os.getenv("DB_PATH", "simple_text2sql_openai_agents_mcp/company_data.db"))
 MCP_PORT = int(os.getenv("MCP_PORT", "8080"))
 READ_ONLY = os.getenv("READ_ONLY", "true").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+# Sharded mode: DB_PATH may instead be a glob ("data/*.db") or a .json
+# manifest of shard files. execute_query then runs on up to
+# SHARD_CONCURRENCY shards at a time and merges the results, explain_query,
+# describe_table and count_rows ask every shard, export_query is unavailable
+# and the schema tools use the first shard, whose schema all shards share
+SHARD_PATHS = shard_paths(DB_PATH)
+SHARD_CONCURRENCY = int(os.getenv("SHARD_CONCURRENCY", "8"))
+SHARD_POOL_SIZE = int(os.getenv("SHARD_POOL_SIZE", "1"))
+# Most groups one shard may return for a GROUP BY merged across shards
+SHARD_MAX_GROUPS = int(os.getenv("SHARD_MAX_GROUPS", "100000"))
+if SHARD_PATHS is not None:
+    if not SHARD_PATHS:
+        raise ValueError(f"No shard files match DB_PATH={DB_PATH}")
+    if not READ_ONLY:
+        raise ValueError("Sharded mode is read-only, set READ_ONLY=true")
+    DB_PATH = SHARD_PATHS[0][1]
+# Read tuning: only set immutable for files nothing else writes to
+SQLITE_IMMUTABLE = os.getenv("SQLITE_IMMUTABLE", "false").lower() == "true"
+SQLITE_PRAGMAS = {
+    name: value
+    for name, value in (
+        ("mmap_size", os.getenv("SQLITE_MMAP_SIZE")),
+        ("cache_size", os.getenv("SQLITE_CACHE_SIZE")),
+        ("temp_store", os.getenv("SQLITE_TEMP_STORE")),
+    )
+    if value
+}
+if not READ_ONLY:
+    # WAL lets readers keep going while a write commits
+    SQLITE_PRAGMAS = {"journal_mode": "WAL", **SQLITE_PRAGMAS}
+# Hard cap on the rows a single execute_query response may hold
+MAX_ROWS = int(os.getenv("MAX_ROWS", "1000"))
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+# Prepared statements kept per connection by sqlite3
+STATEMENT_CACHE_SIZE = int(os.getenv("STATEMENT_CACHE_SIZE", "256"))
+# Per-query budgets enforced inside SQLite, 0 disables a budget
+QUERY_TIMEOUT_MS = int(os.getenv("QUERY_TIMEOUT_MS", "10000"))
+QUERY_MAX_STEPS = int(os.getenv("QUERY_MAX_STEPS", "0"))
+MAX_RESULT_BYTES = int(os.getenv("MAX_RESULT_BYTES", str(8 * 1024 * 1024)))
+# Memory budget for cached execute_query results, 0 disables the cache
+QUERY_CACHE_BYTES = int(os.getenv("QUERY_CACHE_BYTES", str(32 * 1024 * 1024)))
+# Most queries accepted by one execute_queries call
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "20"))
+# Index advisor: executions scanning the same table before an index is
+# suggested, and whether suggestions are created automatically in write mode
+INDEX_ADVISOR = os.getenv("INDEX_ADVISOR", "true").lower() == "true"
+INDEX_ADVISOR_MIN_SCANS = int(os.getenv("INDEX_ADVISOR_MIN_SCANS", "3"))
+INDEX_ADVISOR_AUTO_CREATE = (
+    os.getenv("INDEX_ADVISOR_AUTO_CREATE", "false").lower() == "true"
+)
+# add_feedback group commit: most inserts per transaction, and how long the
+# writer waits for more after the first one arrives
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "64"))
+WRITE_BATCH_WAIT_MS = float(os.getenv("WRITE_BATCH_WAIT_MS", "2"))
+# insert_sample_data: largest count accepted, and rows per executemany chunk
+MAX_SAMPLE_ROWS = int(os.getenv("MAX_SAMPLE_ROWS", "1000000"))
+SAMPLE_CHUNK_ROWS = int(os.getenv("SAMPLE_CHUNK_ROWS", "10000"))
+# Worker processes for heavy read queries, 0 runs everything in-process.
+# Heavy means full scans over at least HEAVY_QUERY_ROWS rows, or still
+# running after HEAVY_QUERY_AFTER_MS
+HEAVY_QUERY_WORKERS = int(os.getenv("HEAVY_QUERY_WORKERS", "0"))
+HEAVY_QUERY_ROWS = int(os.getenv("HEAVY_QUERY_ROWS", "1000000"))
+HEAVY_QUERY_AFTER_MS = int(os.getenv("HEAVY_QUERY_AFTER_MS", "250"))
+# export_query: where files go, rows per chunk, preview rows returned and
+# the time budget of one export (0 for none)
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+EXPORT_PREVIEW_ROWS = int(os.getenv("EXPORT_PREVIEW_ROWS", "5"))
+EXPORT_TIMEOUT_MS = int(os.getenv("EXPORT_TIMEOUT_MS", "0"))
+# count_rows(exact=false) estimates tables above this size instead of counting
+COUNT_EXACT_BELOW = int(os.getenv("COUNT_EXACT_BELOW", "100000"))
+# Run ANALYZE at startup on databases without planner statistics, sampling
+# ANALYZE_LIMIT rows per index (0 reads every row). It writes sqlite_stat1, so
+# it is skipped when READ_ONLY or for immutable files
+ANALYZE_ON_START = os.getenv("ANALYZE_ON_START", "true").lower() == "true"
+ANALYZE_LIMIT = int(os.getenv("ANALYZE_LIMIT", "1000"))
+# Summary tables defined in the MATERIALIZED_VIEWS JSON file, stored in the
+# MATERIALIZED_DB sidecar and queried as mv.<name>. Every
+# MATERIALIZED_REFRESH_S seconds (0: at startup and on request only) they
+# take in the rows added since. Not available in sharded mode
+MATERIALIZED_VIEWS = os.getenv(
+    "MATERIALIZED_VIEWS", "simple_text2sql_openai_agents_mcp/materialized_views.json"
+)
+MATERIALIZED_DB = os.getenv("MATERIALIZED_DB", os.path.splitext(DB_PATH)[0] + ".mv.db")
+MATERIALIZED_REFRESH_S = float(os.getenv("MATERIALIZED_REFRESH_S", "60"))
+# Per-fingerprint execute_query statistics, and the log that keeps every
+# call at or above SLOW_QUERY_MS (0 disables it) together with its plan
+QUERY_STATS_MAX = int(os.getenv("QUERY_STATS_MAX", "5000"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "slow_queries.log")
+SLOW_QUERY_LOG_BYTES = int(os.getenv("SLOW_QUERY_LOG_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+# Seconds before get_database_schema re-reads a table's sample rows
+SCHEMA_SAMPLE_TTL = float(os.getenv("SCHEMA_SAMPLE_TTL", "60"))
+# Approximate tokens get_database_schema may return; larger schemas are
+# answered with a compact table index and get_table_details
+SCHEMA_TOKEN_BUDGET = int(os.getenv("SCHEMA_TOKEN_BUDGET", "4000"))
 
 
 # Models for request/response validation
 class QueryRequest(BaseModel):
     query: str
+    # Values for ? or :name placeholders in query
+    params: Optional[Union[List[Any], Dict[str, Any]]] = None
+    page_size: Optional[int] = None
+    cursor: Optional[str] = None
+    max_rows: Optional[int] = None
+    # objects | columnar | rows | tsv, see result_format.encode_rows
+    format: str = "objects"
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest]
+    # Run every query in one read transaction so they see the same data
+    snapshot: bool = False
+
+
+class ExplainRequest(BaseModel):
+    query: str
+    params: Optional[Union[List[Any], Dict[str, Any]]] = None
+
+
+class ExportRequest(BaseModel):
+    query: str
+    params: Optional[Union[List[Any], Dict[str, Any]]] = None
+    # csv | ndjson | parquet | arrow, see result_export.EXPORT_FORMATS
+    format: str = "csv"
+    # File name inside EXPORT_DIR, generated when omitted
+    file_name: Optional[str] = None
+
+
+class IndexAdviceRequest(BaseModel):
+    # Create the suggested indexes (write mode only)
+    apply: bool = False
+
+
+class QueryStatsRequest(BaseModel):
+    # total_ms | mean_ms | max_ms | calls | rows | errors
+    order_by: str = "total_ms"
+    limit: int = 20
+    # Clear the statistics after reading them
+    reset: bool = False
+
+
+class MaterializedRequest(BaseModel):
+    # Views by name, all when empty
+    names: Optional[List[str]] = None
+    # Recompute from the whole source instead of adding new rows
+    full: bool = False
 
 
 class TableRequest(BaseModel):
     table_name: str
 
 
+class TableDetailsRequest(BaseModel):
+    tables: List[str]
+
+
+class CountRowsRequest(BaseModel):
+    table_name: str
+    # False allows an estimate from ANALYZE statistics for large tables
+    exact: bool = False
+
+
 class SampleDataRequest(BaseModel):
     table_name: str
     count: int = 5
@@ -43,6 +224,17 @@ class FeedbackRequest(BaseModel):
     feedback: str
 
 
+# One startup per process, awaited by every session; serve() starts it
+startup = Startup()
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+    """Entered for each session: wait until the server has started up"""
+    await startup.wait(start_up)
+    yield {}
+
+
 # Initialize FastMCP
 app = FastMCP(
     title="SQLite MCP Server",
@@ -50,6 +242,7 @@ app = FastMCP(
     version="0.1.0",
     host="127.0.0.1",
     port=MCP_PORT,
+    lifespan=lifespan,
 )
 
 
@@ -60,6 +253,109 @@ async def get_db():
     return db
 
 
+# Long-lived connections shared by all tools
+pool = ConnectionPool(
+    sqlite_uri(DB_PATH, read_only=READ_ONLY, immutable=SQLITE_IMMUTABLE),
+    size=DB_POOL_SIZE,
+    uri=True,
+    cached_statements=STATEMENT_CACHE_SIZE,
+)
+statement_stats = StatementCacheStats(STATEMENT_CACHE_SIZE)
+tool_metrics = ServerMetrics()
+tool_metrics.measure_responses(app._mcp_server)
+pool.on_acquire(tool_metrics.observe_pool_wait)
+pool.on_connect(pragma_hook(SQLITE_PRAGMAS))
+query_cache = QueryCache(QUERY_CACHE_BYTES)
+# Record each connection's data_version before it serves cached reads
+pool.on_connect(query_cache.check_version)
+query_budgets = QueryBudgets(
+    timeout_ms=QUERY_TIMEOUT_MS,
+    max_steps=QUERY_MAX_STEPS,
+    max_result_bytes=MAX_RESULT_BYTES,
+)
+pool.on_connect(query_budgets.install)
+materialized = (
+    MaterializedViews(
+        MATERIALIZED_DB,
+        DB_PATH,
+        load_definitions(MATERIALIZED_VIEWS),
+        refresh_interval=MATERIALIZED_REFRESH_S,
+        # Commits to the sidecar don't move the main data_version
+        on_commit=query_cache.invalidate,
+    )
+    if SHARD_PATHS is None and os.path.exists(MATERIALIZED_VIEWS)
+    else None
+)
+if materialized is not None:
+    # Before the guard, which refuses ATTACH
+    pool.on_connect(materialized.attach)
+# SQL policy enforced by SQLite's authorizer while statements are prepared
+sql_guard = SqlGuard(read_only=READ_ONLY)
+pool.on_connect(sql_guard.install)
+index_advisor = IndexAdvisor(min_scans=INDEX_ADVISOR_MIN_SCANS)
+# One index build at a time; automatic ones run in index_task, off the
+# request path
+index_lock = asyncio.Lock()
+index_task: Optional[asyncio.Task] = None
+heavy_queries = (
+    HeavyQueryPool(
+        sqlite_uri(DB_PATH, read_only=True, immutable=SQLITE_IMMUTABLE),
+        HEAVY_QUERY_WORKERS,
+        # journal_mode cannot be set on a read-only connection
+        pragmas={k: v for k, v in SQLITE_PRAGMAS.items() if k != "journal_mode"},
+        heavy_rows=HEAVY_QUERY_ROWS,
+        timeout_ms=QUERY_TIMEOUT_MS,
+        max_steps=QUERY_MAX_STEPS,
+        max_result_bytes=MAX_RESULT_BYTES,
+        attach=materialized.attachment if materialized is not None else None,
+    )
+    if HEAVY_QUERY_WORKERS
+    else None
+)
+
+
+def shard_pool(path: str) -> ConnectionPool:
+    """A pool for one shard, guarded and budgeted like the main pool"""
+    shard = ConnectionPool(
+        sqlite_uri(path, read_only=True, immutable=SQLITE_IMMUTABLE),
+        size=SHARD_POOL_SIZE,
+        uri=True,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    shard.on_connect(pragma_hook(SQLITE_PRAGMAS))
+    shard.on_connect(query_budgets.install)
+    shard.on_connect(sql_guard.install)
+    return shard
+
+
+shards = (
+    ShardSet(SHARD_PATHS, shard_pool, concurrency=SHARD_CONCURRENCY)
+    if SHARD_PATHS is not None
+    else None
+)
+# Exact counts cached until the data changes, estimates for large tables
+row_counts = RowCounts(query_cache, exact_below=COUNT_EXACT_BELOW)
+# Single writer that batches feedback inserts into one commit
+write_queue = WriteQueue(
+    pool,
+    max_batch=WRITE_BATCH_SIZE,
+    max_wait=WRITE_BATCH_WAIT_MS / 1000,
+    on_commit=query_cache.invalidate,
+)
+query_stats = QueryStats(
+    max_entries=QUERY_STATS_MAX,
+    slow_ms=SLOW_QUERY_MS,
+    log_path=SLOW_QUERY_LOG,
+    log_max_bytes=SLOW_QUERY_LOG_BYTES,
+    log_backups=SLOW_QUERY_LOG_BACKUPS,
+)
+schema_cache = SchemaCache(
+    sample_ttl=SCHEMA_SAMPLE_TTL,
+    token_budget=SCHEMA_TOKEN_BUDGET,
+    row_counts=row_counts,
+)
+
+
 async def init_db():
     """Initialize the database with sample tables if it doesn't exist"""
     if not os.path.exists(DB_PATH):
@@ -146,83 +442,483 @@ async def init_db():
             await db.close()
 
 
-# SQL query validation to prevent SQL injection and enforce read-only mode
-def validate_query(query: str) -> bool:
-    query = query.strip().lower()
-
-    # Block potentially dangerous operations
-    dangerous_keywords = [
-        "drop",
-        "delete",
-        "truncate",
-        "alter",
-        "update",
-        "pragma",
-        "attach",
-        "detach",
-    ]
-    if READ_ONLY:
-        dangerous_keywords.extend(["insert", "create", "update"])
-
-    for keyword in dangerous_keywords:
-        if query.startswith(keyword) or f" {keyword} " in f" {query} ":
-            return False
-
-    return True
-
-
 # MCP tools
-@app.tool("execute_query", description="Execute a SQL query on the SQLite database")
+@app.tool(
+    "execute_query",
+    description="Execute a SQL query on the SQLite database. "
+    "Pass literal values in params using ? or :name placeholders.",
+)
+@tool_metrics.instrument
 async def execute_query(request: QueryRequest) -> Dict[str, Any]:
     """Execute a SQL query on the SQLite database"""
-    if not validate_query(request.query):
+    return await run_query(request)
+
+
+async def run_query(
+    request: QueryRequest, db: Optional[aiosqlite.Connection] = None
+) -> Dict[str, Any]:
+    """Run one execute_query request, on db if given or a pooled connection.
+
+    A caller-supplied connection may be inside a transaction whose snapshot
+    differs from what the result cache holds, so the cache is bypassed.
+    Every call is added to the per-fingerprint query statistics.
+    """
+    began = time.perf_counter()
+    response = await _run_query(request, db)
+    elapsed_ms = (time.perf_counter() - began) * 1000
+    query_stats.record(request.query, elapsed_ms, response)
+    if query_stats.is_slow(elapsed_ms) and not response.get("cached"):
+        await log_slow_query(request, elapsed_ms, response, db)
+    return response
+
+
+async def _run_query(
+    request: QueryRequest, db: Optional[aiosqlite.Connection]
+) -> Dict[str, Any]:
+    if request.format not in RESULT_FORMATS:
         return {
-            "error": "Invalid query. The query contains forbidden operations or keywords.",
-            "read_only_mode": READ_ONLY,
+            "error": f"Unknown format '{request.format}'. Use one of: {', '.join(RESULT_FORMATS)}"
         }
+    pooled = db is None
+
+    limit = max(1, min(request.max_rows or MAX_ROWS, MAX_ROWS))
+    if shards is not None:
+        return await run_sharded(request, limit)
+    sql, offset = request.query, 0
+    named = isinstance(request.params, dict)
+    params = dict(request.params) if named else list(request.params or ())
+    paginate = request.page_size is not None or request.cursor is not None
+    if paginate:
+        try:
+            if request.cursor:
+                offset = decode_page_token(
+                    request.cursor, request.query, request.params
+                )
+            sql = paginated_sql(request.query, named=named)
+        except ValueError as e:
+            return {"error": str(e)}
+        limit = max(1, min(request.page_size or DEFAULT_PAGE_SIZE, limit))
+        # One extra row tells us whether another page exists
+        if named:
+            params.update(_page_limit=limit + 1, _page_offset=offset)
+        else:
+            params.extend((limit + 1, offset))
+
+    # Deterministic reads; only these are cached, offloaded or advised on
+    read = is_cacheable(request.query)
+    cache_key = None
+    if db is None and query_cache.enabled and read:
+        params_key = tuple(sorted(params.items())) if named else tuple(params)
+        cache_key = (normalize_sql(sql), params_key, limit)
+
+    try:
+        async with pool.acquire() if db is None else nullcontext(db) as db:
+            cached = None
+            if cache_key is not None:
+                await query_cache.check_version(db)
+                cached = query_cache.get(cache_key)
+
+            if cached is not None:
+                columns, rows = cached
+            else:
+                generation = query_cache.generation
+                statement_stats.record(id(db), sql)
+                began = time.perf_counter()
+                if heavy_queries is not None and pooled and read:
+                    columns, rows = await fetch_or_offload(db, sql, params, limit + 1)
+                else:
+                    columns, rows = await fetch_rows(db, sql, params, limit + 1)
+                if cache_key is not None:
+                    query_cache.put(cache_key, columns, rows, generation)
+                if INDEX_ADVISOR and read:
+                    elapsed_ms = (time.perf_counter() - began) * 1000
+                    await record_plan(db, sql, params, elapsed_ms)
+
+        truncated = len(rows) > limit
+        rows = rows[:limit]
+
+        response = encode_rows(columns, rows, request.format)
+        response["row_count"] = len(rows)
+        response["truncated"] = truncated
+        response["cached"] = cached is not None
+        if paginate:
+            response["next_cursor"] = (
+                encode_page_token(request.query, offset + len(rows), request.params)
+                if truncated
+                else None
+            )
+        return response
+    except QueryRejected as e:
+        return {"error": str(e), "read_only_mode": READ_ONLY}
+    except BudgetExceeded as e:
+        return e.to_dict()
+    except Exception as e:
+        return {"error": str(e)}
+
 
-    db = await get_db()
+async def run_sharded(request: QueryRequest, limit: int) -> Dict[str, Any]:
+    """Run a read query on every shard and merge the results.
+
+    Rows are concatenated, merged in ORDER BY order, or re-aggregated for
+    GROUP BY and count/sum/total/min/max/avg; see shards.MergePlan. Results
+    are not cached, since each shard file changes on its own.
+    """
+    if request.page_size is not None or request.cursor is not None:
+        return {"error": "Sharded mode has no cursors; page with LIMIT and OFFSET"}
     try:
-        cursor = await db.execute(request.query)
-        rows = await cursor.fetchall()
-        columns = (
-            [column[0] for column in cursor.description] if cursor.description else []
+        plan = plan_merge(request.query)
+    except ValueError as e:
+        return {"error": str(e)}
+    named = isinstance(request.params, dict)
+    params = dict(request.params) if named else list(request.params or ())
+    shard_rows = plan.shard_rows(limit + 1, SHARD_MAX_GROUPS)
+
+    results = await shards.fan_out(
+        lambda db: fetch_rows(db, plan.sql, params, shard_rows)
+    )
+    timings, failed = shard_report(
+        results, lambda result: {"row_count": len(result[1])}
+    )
+    if failed is not None:
+        return failed
+
+    try:
+        columns, rows = plan.merge(
+            [(name, *result) for name, result, _, _ in results], SHARD_MAX_GROUPS
         )
+    except ValueError as e:
+        return {"error": str(e), "shards": timings}
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+    response = encode_rows(columns, rows, request.format)
+    response["row_count"] = len(rows)
+    response["truncated"] = truncated
+    response["cached"] = False
+    response["merge"] = plan.kind
+    response["shards"] = timings
+    return response
+
+
+def shard_report(
+    results: List[Tuple[str, Any, Optional[Exception], float]],
+    detail: Callable[[Any], Dict[str, Any]] = lambda result: {},
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Per-shard timings from fan_out, plus details of each shard's result.
+
+    Also returns the response for the first shard that failed, or None.
+    """
+    timings = []
+    for name, result, error, elapsed_ms in results:
+        timing = {"shard": name, "elapsed_ms": round(elapsed_ms, 2)}
+        if error is None:
+            timing.update(detail(result))
+        else:
+            timing["error"] = str(error)
+        timings.append(timing)
+    for name, _, error, _ in results:
+        if error is None:
+            continue
+        if isinstance(error, QueryRejected):
+            response = {"error": str(error), "read_only_mode": READ_ONLY}
+        elif isinstance(error, BudgetExceeded):
+            response = error.to_dict()
+        else:
+            response = {"error": str(error)}
+        return timings, {**response, "shard": name, "shards": timings}
+    return timings, None
+
+
+async def fetch_rows(
+    db: aiosqlite.Connection,
+    sql: str,
+    params: Any,
+    max_rows: int,
+    timeout_ms: Optional[int] = None,
+) -> Tuple[List[str], List[Any]]:
+    """Run sql on db under the SQL guard and budgets, returning up to max_rows"""
+    async with sql_guard.check(db), query_budgets.limit(db, timeout_ms):
+        cursor = await db.execute(sql, params)
+        try:
+            columns = (
+                [column[0] for column in cursor.description]
+                if cursor.description
+                else []
+            )
+            rows = await query_budgets.fetch(cursor, max_rows)
+        finally:
+            await cursor.close()
+    return columns, rows
+
+
+async def fetch_or_offload(
+    db: aiosqlite.Connection, sql: str, params: Any, max_rows: int
+) -> Tuple[List[str], List[Any]]:
+    """Like fetch_rows, but heavy queries run in a worker process.
+
+    A query is heavy when its plan fully scans tables holding at least
+    HEAVY_QUERY_ROWS rows between them. Queries that look light but are
+    still running after HEAVY_QUERY_AFTER_MS are restarted in a worker.
+    """
+    # Preparing the plan also runs the statement past the SQL guard
+    async with sql_guard.check(db):
+        scanned = await index_advisor.scanned_tables(db, sql, params)
+    if not await heavy_queries.is_heavy(db, scanned):
+        # Only worth restarting before the query's own time budget runs out;
+        # without a time budget slow queries simply keep running here
+        restart = 0 < HEAVY_QUERY_AFTER_MS < QUERY_TIMEOUT_MS
+        try:
+            return await fetch_rows(
+                db, sql, params, max_rows, HEAVY_QUERY_AFTER_MS if restart else None
+            )
+        except BudgetExceeded as e:
+            if e.budget != "time_ms" or not restart:
+                raise
+            logger.info(f"Moving slow query to a worker process: {sql!r}")
+    return await heavy_queries.run(sql, params, max_rows)
+
+
+@app.tool(
+    "execute_queries",
+    description="Execute several independent SQL queries in one call. "
+    "Each query takes the same fields as execute_query and gets its own result "
+    "or error. Set snapshot=true to run them in one read transaction.",
+)
+@tool_metrics.instrument
+async def execute_queries(request: BatchQueryRequest) -> Dict[str, Any]:
+    """Execute a batch of SQL queries concurrently, or in one snapshot"""
+    if not request.queries:
+        return {"error": "No queries given"}
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        return {"error": f"At most {MAX_BATCH_QUERIES} queries per batch"}
+
+    async def timed(query: QueryRequest, db=None) -> Dict[str, Any]:
+        began = time.perf_counter()
+        result = await run_query(query, db)
+        result["elapsed_ms"] = round((time.perf_counter() - began) * 1000, 3)
+        return result
+
+    began = time.perf_counter()
+    try:
+        if request.snapshot:
+            # One connection, one deferred transaction: every query reads
+            # the database as of the first read
+            async with pool.acquire() as db:
+                await db.execute("BEGIN")
+                try:
+                    results = [await timed(query, db) for query in request.queries]
+                finally:
+                    if db.in_transaction:
+                        await db.rollback()
+        else:
+            # Each query takes its own pooled connection; the pool size
+            # bounds how many run at once
+            results = await asyncio.gather(*(timed(query) for query in request.queries))
+    except Exception as e:
+        return {"error": str(e)}
+    return {
+        "results": list(results),
+        "snapshot": request.snapshot,
+        "elapsed_ms": round((time.perf_counter() - began) * 1000, 3),
+    }
+
+
+async def record_plan(
+    db: aiosqlite.Connection, sql: str, params: Any, elapsed_ms: float
+) -> None:
+    """Feed one execution to the index advisor, creating indexes if enabled"""
+    global index_task
+    try:
+        await index_advisor.record(db, sql, params, elapsed_ms)
+    except Exception as e:
+        logger.warning(f"Index advisor failed for {sql!r}: {e}")
+        return
+    if (
+        INDEX_ADVISOR_AUTO_CREATE
+        and not READ_ONLY
+        and (index_task is None or index_task.done())
+        and index_advisor.suggestions()
+    ):
+        index_task = asyncio.create_task(create_suggested_indexes())
+
+
+async def create_suggested_indexes() -> List[Dict[str, Any]]:
+    """Try every current suggestion once, on a connection of its own.
+
+    Failed and unused indexes are recorded by the advisor and not
+    suggested again.
+    """
+    results = []
+    async with index_lock, pool.acquire() as db:
+        for suggestion in index_advisor.suggestions():
+            try:
+                async with sql_guard.check(db), query_budgets.limit(db):
+                    result = await index_advisor.apply(db, suggestion["index"])
+                logger.info(f"Index advisor: {result}")
+            except Exception as e:
+                logger.warning(
+                    f"Index advisor could not create {suggestion['index']}: {e}"
+                )
+                result = index_advisor.applied[-1]
+            results.append(result)
+    return results
+
+
+async def log_slow_query(
+    request: QueryRequest,
+    elapsed_ms: float,
+    response: Dict[str, Any],
+    db: Optional[aiosqlite.Connection] = None,
+) -> None:
+    """Write a slow execute_query call and its plan to the slow-query log"""
+    plan = None
+    try:
+        async with pool.acquire() if db is None else nullcontext(db) as db:
+            async with sql_guard.check(db):
+                explained = await index_advisor.explain(
+                    db, request.query, request.params or ()
+                )
+        plan = explained["plan"]
+    except Exception as e:
+        logger.warning(f"Could not explain slow query {request.query!r}: {e}")
+    query_stats.log_slow(request.query, request.params, elapsed_ms, response, plan)
+
+
+@app.tool(
+    "explain_query",
+    description="Show the EXPLAIN QUERY PLAN tree of a SQL query without running it, "
+    "and the indexes that would avoid its full table scans.",
+)
+@tool_metrics.instrument
+async def explain_query(request: ExplainRequest) -> Dict[str, Any]:
+    """Return the parsed query plan of a SQL query"""
+    if shards is not None:
+        # Each shard has its own statistics and indexes, so its own plan
+
+        async def explain(db: aiosqlite.Connection) -> Dict[str, Any]:
+            async with sql_guard.check(db):
+                return await index_advisor.explain(
+                    db, request.query, request.params or ()
+                )
+
+        timings, failed = shard_report(await shards.fan_out(explain), dict)
+        return failed or {"shards": timings}
+    try:
+        async with pool.acquire() as db:
+            async with sql_guard.check(db):
+                return await index_advisor.explain(
+                    db, request.query, request.params or ()
+                )
+    except QueryRejected as e:
+        return {"error": str(e), "read_only_mode": READ_ONLY}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# @app.tool(
+#     "export_query",
+#     description="Run a SQL query and write all of its rows to a local CSV, NDJSON, "
+#     "Parquet or Arrow file. Returns the file path, row count and a short preview "
+#     "instead of the rows, so use it when the full result set is needed.",
+# )
+@tool_metrics.instrument
+async def export_query(request: ExportRequest) -> Dict[str, Any]:
+    """Stream the full result of a query to a file"""
+    if shards is not None:
+        return {
+            "error": "export_query is not available in sharded mode; "
+            "use execute_query, whose results are merged across shards"
+        }
+    if request.format not in EXPORT_FORMATS:
+        return {
+            "error": f"Unknown format '{request.format}'. Use one of: {', '.join(EXPORT_FORMATS)}"
+        }
+    file_name = request.file_name or (
+        f"export-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        f".{request.format}"
+    )
+    if os.path.basename(file_name) != file_name or file_name.startswith("."):
+        return {"error": "file_name must be a plain file name"}
+
+    began = time.perf_counter()
+    try:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        async with pool.acquire() as db:
+            async with sql_guard.check(db), query_budgets.limit(db, EXPORT_TIMEOUT_MS):
+                cursor = await db.execute(request.query, request.params or ())
+                try:
+                    result = await export_rows(
+                        cursor,
+                        os.path.join(EXPORT_DIR, file_name),
+                        request.format,
+                        chunk_rows=EXPORT_CHUNK_ROWS,
+                        preview_rows=EXPORT_PREVIEW_ROWS,
+                    )
+                finally:
+                    await cursor.close()
+        result["elapsed_ms"] = round((time.perf_counter() - began) * 1000, 3)
+        return result
+    except QueryRejected as e:
+        return {"error": str(e), "read_only_mode": READ_ONLY}
+    except BudgetExceeded as e:
+        return e.to_dict()
+    except Exception as e:
+        return {"error": str(e)}
 
-        results = []
-        for row in rows:
-            results.append({columns[i]: row[i] for i in range(len(columns))})
 
-        return {"columns": columns, "rows": results, "row_count": len(results)}
+# @app.tool("index_advice")
+@tool_metrics.instrument
+async def index_advice(request: IndexAdviceRequest) -> Dict[str, Any]:
+    """Suggest indexes for tables that executed queries keep scanning"""
+    suggestions = index_advisor.suggestions()
+    if not request.apply:
+        return {"suggestions": suggestions, "applied": index_advisor.applied}
+    if READ_ONLY:
+        return {"error": "Creating indexes is not allowed in read-only mode"}
+    try:
+        return {"applied": await create_suggested_indexes()}
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        await db.close()
 
 
 # @app.tool("list_tables")
+@tool_metrics.instrument
 async def list_tables() -> Dict[str, Any]:
     """List all tables in the SQLite database"""
-    db = await get_db()
     try:
-        cursor = await db.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
-        )
-        tables = [row[0] for row in await cursor.fetchall()]
-        return {"tables": tables}
+        async with pool.acquire() as db:
+            cursor = await db.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+            )
+            tables = [row[0] for row in await cursor.fetchall()]
+            if materialized is not None:
+                return {"tables": tables, "materialized_views": materialized.tables()}
+            return {"tables": tables}
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        await db.close()
 
 
 # @app.tool("describe_table")
+@tool_metrics.instrument
 async def describe_table(request: TableRequest) -> Dict[str, Any]:
     """Get the schema of a specific table"""
-    db = await get_db()
     try:
-        cursor = await db.execute(f"PRAGMA table_info({request.table_name})")
-        columns = await cursor.fetchall()
+        sql = f"PRAGMA table_info({request.table_name})"
+        if shards is not None:
+            results = await shards.fan_out(lambda db: db.execute_fetchall(sql))
+            _, failed = shard_report(results)
+            if failed is not None:
+                return failed
+            first, columns = results[0][0], list(results[0][1])
+            for name, result, _, _ in results[1:]:
+                if list(result) != columns:
+                    return {
+                        "error": f"Shards {first} and {name} disagree on the "
+                        f"columns of {request.table_name}"
+                    }
+        else:
+            async with pool.acquire() as db:
+                cursor = await db.execute(sql)
+                columns = await cursor.fetchall()
 
         schema = []
         for col in columns:
@@ -239,239 +935,316 @@ async def describe_table(request: TableRequest) -> Dict[str, Any]:
         return {"table_name": request.table_name, "columns": schema}
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        await db.close()
 
 
-# @app.tool("count_rows")
-async def count_rows(request: TableRequest) -> Dict[str, Any]:
+# @app.tool(
+#     "count_rows",
+#     description="Count the rows of a table. Large tables get a fast estimate "
+#     "unless exact=true; the response says whether the count is exact.",
+# )
+@tool_metrics.instrument
+async def count_rows(request: CountRowsRequest) -> Dict[str, Any]:
     """Count the number of rows in a table"""
-    db = await get_db()
+    if shards is not None:
+        return await count_sharded(request)
     try:
-        cursor = await db.execute(f"SELECT COUNT(*) FROM {request.table_name}")
-        count = (await cursor.fetchone())[0]
-        return {"table_name": request.table_name, "row_count": count}
+        async with pool.acquire() as db:
+            columns = await db.execute_fetchall(
+                "SELECT name FROM pragma_table_info(?)", (request.table_name,)
+            )
+            if not columns:
+                return {"error": f"Table {request.table_name} not found"}
+            async with sql_guard.check(db), query_budgets.limit(db):
+                counted = await row_counts.count(db, request.table_name, request.exact)
+            return {"table_name": request.table_name, **counted}
+    except QueryRejected as e:
+        return {"error": str(e), "read_only_mode": READ_ONLY}
+    except BudgetExceeded as e:
+        return e.to_dict()
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        await db.close()
 
+    # async def count_sharded(request: CountRowsRequest) -> Dict[str, Any]:
+    """count_rows on every shard, adding up the shards' counts"""
+    table = request.table_name
+
+    async def count(db: aiosqlite.Connection) -> Dict[str, Any]:
+        async with sql_guard.check(db), query_budgets.limit(db):
+            if not request.exact:
+                estimate, source = await row_counts.estimate(db, table)
+                if estimate is not None and estimate >= COUNT_EXACT_BELOW:
+                    return {"row_count": estimate, "exact": False, "source": source}
+            rows = await db.execute_fetchall(
+                f"SELECT count(*) FROM {quote_identifier(table)}"
+            )
+            return {"row_count": rows[0][0], "exact": True, "source": "count"}
+
+    timings, failed = shard_report(await shards.fan_out(count), dict)
+    if failed is not None:
+        return failed
+    return {
+        "table_name": table,
+        "row_count": sum(timing["row_count"] for timing in timings),
+        "exact": all(timing["exact"] for timing in timings),
+        "shards": timings,
+    }
 
-# @app.tool("insert_sample_data")
+
+@app.tool("insert_sample_data")
+@tool_metrics.instrument
 async def insert_sample_data(request: SampleDataRequest) -> Dict[str, Any]:
     """Insert sample data into a specified table (for demo purposes)"""
     if READ_ONLY:
         return {"error": "Cannot insert data in read-only mode"}
 
     count = request.count if request.count else 5
-    db = await get_db()
-
+    if not 0 < count <= MAX_SAMPLE_ROWS:
+        return {"error": f"count must be between 1 and {MAX_SAMPLE_ROWS}"}
     try:
-        # Get table schema to understand what to insert
-        cursor = await db.execute(f"PRAGMA table_info({request.table_name})")
-        columns = await cursor.fetchall()
-
-        if not columns:
-            return {"error": f"Table {request.table_name} not found"}
-
-        # Generate insert statements based on table type
-        inserted = 0
-
-        if request.table_name.lower() == "products":
-            for i in range(count):
-                await db.execute(
-                    "INSERT INTO products (name, description, price, category, in_stock) VALUES (?, ?, ?, ?, ?)",
-                    (
-                        f"Product {i+1}",
-                        f"This is a description for product {i+1}",
-                        round(10.99 + i * 5.25, 2),
-                        ["Electronics", "Clothing", "Home", "Books", "Food"][i % 5],
-                        i % 4 != 0,  # 75% of products in stock
-                    ),
-                )
-                inserted += 1
-
-        elif request.table_name.lower() == "customers":
-            for i in range(count):
-                await db.execute(
-                    "INSERT INTO customers (name, email, signup_date) VALUES (?, ?, ?)",
-                    (
-                        f"Customer {i+1}",
-                        f"customer{i+1}@example.com",
-                        f"2023-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
-                    ),
-                )
-                inserted += 1
-
-        elif request.table_name.lower() == "orders":
-            # First ensure we have customers
-            cursor = await db.execute("SELECT COUNT(*) FROM customers")
-            customer_count = (await cursor.fetchone())[0]
-
-            if customer_count == 0:
-                return {
-                    "error": "Cannot insert orders without customers. Insert customers first."
-                }
-
-            for i in range(count):
-                customer_id = (i % customer_count) + 1
-                await db.execute(
-                    "INSERT INTO orders (customer_id, order_date, total_amount) VALUES (?, ?, ?)",
-                    (
-                        customer_id,
-                        f"2023-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
-                        round(50.00 + i * 12.35, 2),
-                    ),
-                )
-                inserted += 1
-
-        elif request.table_name.lower() == "feedback":
-            for i in range(count):
-                await db.execute(
-                    "INSERT INTO feedback (user, email, feedback) VALUES (?, ?, ?)",
-                    (
-                        f"User {i+1}",
-                        f"user{i+1}@example.com",
-                        f"This is sample feedback #{i+1}. The service is great!",
-                    ),
-                )
-                inserted += 1
-
-        else:
+        async with pool.acquire() as db:
+            try:
+                sql, rows = await sample_rows(db, request.table_name, count)
+            except ValueError as e:
+                return {"error": str(e)}
+
+            began = time.perf_counter()
+            changes = db.total_changes
+            await db.execute_fetchall("BEGIN IMMEDIATE")
+            for _ in range(0, count, SAMPLE_CHUNK_ROWS):
+                # islice is consumed in aiosqlite's thread, so each chunk is
+                # generated there and never held in memory as a whole
+                cursor = await db.executemany(sql, islice(rows, SAMPLE_CHUNK_ROWS))
+                await cursor.close()
+            await db.commit()
+            elapsed = time.perf_counter() - began
+            inserted = db.total_changes - changes
+            query_cache.invalidate()
             return {
-                "error": f"Sample data generation not supported for table {request.table_name}"
+                "table_name": request.table_name,
+                "inserted_rows": inserted,
+                "skipped_rows": count - inserted,
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "rows_per_sec": round(inserted / elapsed) if elapsed else None,
+                "success": True,
             }
 
-        await db.commit()
-        return {
-            "table_name": request.table_name,
-            "inserted_rows": inserted,
-            "success": True,
-        }
-
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        await db.close()
 
 
 # @app.tool("add_feedback")
+@tool_metrics.instrument
 async def add_feedback(request: FeedbackRequest) -> Dict[str, Any]:
     """Add a new feedback entry to the feedback table"""
     if READ_ONLY:
         return {"error": "Cannot add feedback in read-only mode"}
 
-    db = await get_db()
     try:
-        await db.execute(
-            "INSERT INTO feedback (user, email, feedback) VALUES (?, ?, ?)",
+        # Committed together with whatever other feedback arrives meanwhile
+        rows = await write_queue.submit(
+            "INSERT INTO feedback (user, email, feedback) VALUES (?, ?, ?) RETURNING id",
             (request.user, request.email, request.feedback),
         )
-        await db.commit()
-
-        # Get the ID of the inserted feedback
-        cursor = await db.execute("SELECT last_insert_rowid()")
-        feedback_id = (await cursor.fetchone())[0]
-
         return {
             "success": True,
-            "feedback_id": feedback_id,
+            "feedback_id": rows[0][0],
             "message": "Feedback successfully added",
         }
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        await db.close()
 
 
 @app.tool("get_database_schema")
+@tool_metrics.instrument
 async def get_database_schema() -> str:
     """获取数据库架构信息"""
-    sqlite_db = await get_db()
-    schema_lines = []
-
+    async with pool.acquire() as sqlite_db:
+        try:
+            schema = await schema_cache.render(sqlite_db)
+            if materialized is not None:
+                # 物化视图放在最前面，提示智能体优先使用预先算好的汇总表
+                views = await materialized.render()
+                if views:
+                    schema = f"{views}\n\n{schema}"
+            return schema
+        except Exception as e:
+            print(f"Error getting schema: {e}")
+            raise
+
+
+@app.tool(
+    "get_table_details",
+    description="Get full columns and sample rows for the given tables, or the "
+    "definition and freshness of mv.<name> materialized views. "
+    "Use it after get_database_schema returned the compact table index.",
+)
+@tool_metrics.instrument
+async def get_table_details(request: TableDetailsRequest) -> str:
+    """获取指定表的完整列信息和示例数据"""
+    tables = request.tables
+    sections = []
+    if materialized is not None:
+        # mv.<name> 指物化视图，其余为普通表
+        views = [t for t in tables if t.lower().startswith("mv.")]
+        tables = [t for t in tables if t not in views]
+        built = {t.lower() for t in materialized.tables()}
+        unknown = [v for v in views if v.lower() not in built]
+        views = [v for v in views if v not in unknown]
+        if views:
+            sections.append(await materialized.render(views))
+        if unknown:
+            sections.append(f"UNKNOWN MATERIALIZED VIEWS: {', '.join(unknown)}")
+    if tables or not sections:
+        async with pool.acquire() as sqlite_db:
+            sections.append(await schema_cache.details(sqlite_db, tables))
+    return "\n\n".join(sections)
+
+
+# @app.tool("cache_stats")
+@tool_metrics.instrument
+async def cache_stats() -> Dict[str, Any]:
+    """Report hit, miss and eviction counters of the execute_query caches"""
+    return {"results": query_cache.stats(), "statements": statement_stats.stats()}
+
+
+# @app.tool("server_metrics")
+async def server_metrics() -> Dict[str, Any]:
+    """Report per-tool latency percentiles, rows, bytes and errors, pool wait time
+    and the feedback write queue's batching"""
+    return {
+        **tool_metrics.snapshot(),
+        "write_queue": write_queue.stats(),
+        "startup": startup.status(),
+    }
+
+
+# @app.tool("query_stats")
+@tool_metrics.instrument(name="query_stats")
+async def query_stats_tool(request: QueryStatsRequest) -> Dict[str, Any]:
+    """Report calls, time and rows per query fingerprint, heaviest first"""
+    if request.order_by not in STAT_ORDERS:
+        return {
+            "error": f"Unknown order_by '{request.order_by}'. Use one of: {', '.join(STAT_ORDERS)}"
+        }
+    stats = query_stats.stats(request.order_by, max(1, request.limit))
+    if request.reset:
+        query_stats.reset()
+    return stats
+
+
+# @app.tool("materialized_views")
+@tool_metrics.instrument
+async def materialized_views() -> Dict[str, Any]:
+    """List the precomputed summary tables (query them as mv.<name>), their
+    definitions and how stale each one is"""
+    if materialized is None:
+        return {"error": "No materialized views are defined (MATERIALIZED_VIEWS)"}
     try:
-        # 获取所有表名
-        cursor = await sqlite_db.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
-        )
-        tables = await cursor.fetchall()
-
-        for table_row in tables:
-            table_name = table_row["name"]
-
-            # 添加表头
-            schema_lines.append(f"\n=== TABLE: {table_name} ===")
-
-            # 获取表结构信息
-            cursor = await sqlite_db.execute(f"PRAGMA table_info({table_name})")
-            columns_info = await cursor.fetchall()
-
-            # 添加列信息
-            schema_lines.append("COLUMNS:")
-            for col in columns_info:
-                pk_marker = " [PRIMARY KEY]" if col["pk"] else ""
-                nullable = "NULL" if not col["notnull"] else "NOT NULL"
-                default = f" DEFAULT {col['dflt_value']}" if col["dflt_value"] else ""
-                schema_lines.append(
-                    f"  {col['name']}: {col['type']} {nullable}{default}{pk_marker}"
-                )
+        return {"views": await materialized.status()}
+    except Exception as e:
+        return {"error": str(e)}
 
-            # 获取前5行示例数据
-            cursor = await sqlite_db.execute(f"SELECT * FROM {table_name} LIMIT 5")
-            sample_rows = await cursor.fetchall()
-
-            if sample_rows:
-                schema_lines.append("SAMPLE DATA (first 5 rows):")
-                # 获取列名作为表头
-                column_names = list(sample_rows[0].keys())
-                header = " | ".join(column_names)
-                schema_lines.append(f"  {header}")
-                schema_lines.append(f"  {'-' * len(header)}")
-
-                # 添加数据行
-                for row in sample_rows:
-                    row_values = []
-                    for col_name in column_names:
-                        value = row[col_name]
-                        if value is None:
-                            row_values.append("NULL")
-                        else:
-                            row_values.append(str(value))
-                    row_data = " | ".join(row_values)
-                    schema_lines.append(f"  {row_data}")
-            else:
-                schema_lines.append("SAMPLE DATA: No data available")
 
+# @app.tool("refresh_materialized")
+@tool_metrics.instrument
+async def refresh_materialized(request: MaterializedRequest) -> Dict[str, Any]:
+    """Bring materialized views up to date now, optionally recomputing them"""
+    if materialized is None:
+        return {"error": "No materialized views are defined (MATERIALIZED_VIEWS)"}
+    try:
+        return {"views": await materialized.refresh(request.names, full=request.full)}
     except Exception as e:
-        print(f"Error getting schema: {e}")
-        raise
-    finally:
-        await sqlite_db.close()
+        return {"error": str(e)}
 
-    return "\n".join(schema_lines)
 
+@app.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    """Prometheus scrape endpoint served next to the SSE app"""
+    return PlainTextResponse(
+        tool_metrics.prometheus(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.custom_route("/ready", methods=["GET"])
+async def readiness(request: Request) -> JSONResponse:
+    """Readiness probe: 200 once startup has finished, 503 until then"""
+    status = {**startup.status(), "first_answer_ms": tool_metrics.first_answer_ms}
+    return JSONResponse(status, status_code=200 if startup.ready else 503)
+
+
+async def start_up() -> None:
+    """Bootstrap the database and warm everything before the first answer"""
+    async with startup.step("init_db"):
+        await init_db()
+    if ANALYZE_ON_START and not READ_ONLY and not SQLITE_IMMUTABLE:
+        # Sharded mode is read-only, so this is always the one database
+        async with startup.step("analyze"):
+            if await analyze_if_missing(DB_PATH, ANALYZE_LIMIT):
+                logger.info(f"Ran ANALYZE on {DB_PATH}, which had no statistics")
+    if materialized is not None:
+        # Creates the sidecar, so the pool's connections can attach it
+        async with startup.step("materialized"):
+            await materialized.open()
+    async with startup.step("pool"):
+        await pool.open()
+    if heavy_queries is not None:
+        async with startup.step("heavy_queries"):
+            await heavy_queries.start()
+    async with startup.step("schema"):
+        async with pool.acquire() as db:
+            await index_advisor.warm(db)
+            await schema_cache.warm(db)
+    if materialized is not None:
+        # Built or brought up to date in the background, not before answering
+        materialized.start()
+
+
+async def shut_down() -> None:
+    """Close everything start_up and the tools have opened"""
+    await startup.stop()
+    if index_task is not None:
+        index_task.cancel()
+    await write_queue.close()
+    if heavy_queries is not None:
+        heavy_queries.close()
+    if shards is not None:
+        await shards.close()
+    if materialized is not None:
+        await materialized.close()
+    await pool.close()
+
+
+async def serve(transport: str = "sse"):
+    """Run the MCP server, starting up alongside the transport.
+
+    Sessions wait in the lifespan until startup has finished, while /ready
+    already answers; everything started is closed when the server stops.
+    """
+    startup.start(start_up)
+    try:
+        if transport == "stdio":
+            await app.run_stdio_async()
+        else:
+            await app.run_sse_async()
+    finally:
+        await shut_down()
 
-async def main():
-    # Initialize the database with sample tables
-    await init_db()
 
-    # Start the MCP server
+async def main():
+    # Start the MCP server; init_db runs as part of startup
     logger.info(f"Starting SQLite MCP Server on port {MCP_PORT}")
     logger.info(f"Database path: {DB_PATH}")
     logger.info(f"Read-only mode: {READ_ONLY}")
 
     # Run the app with stdio transport (no host/port needed)
-    app.run(transport="stdio")
+    await serve(transport="stdio")
 
 
 if __name__ == "__main__":
-    # Initialize the database with sample tables
-    init_db()
-
-    # Start the MCP server
+    # Start the MCP server; init_db runs as part of startup
     logger.info(f"Starting SQLite MCP Server on port {MCP_PORT}")
     logger.info(f"Database path: {DB_PATH}")
     logger.info(f"Read-only mode: {READ_ONLY}")
+    logger.info(f"Connection pool size: {DB_POOL_SIZE}")
     # Initialize and run the server
-    app.run(transport="sse")
+    asyncio.run(serve(transport="sse"))
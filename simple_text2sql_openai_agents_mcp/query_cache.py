@@ -0,0 +1,125 @@
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+_LITERAL_OR_SPACE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|\s+")
+_CACHEABLE = re.compile(r"^\s*(select|with|values)\b", re.IGNORECASE)
+# Functions whose result changes between calls with the same data, and
+# the current date and time: CURRENT_TIMESTAMP and friends, 'now', and the
+# date functions called without a time value, which default to now
+_VOLATILE = re.compile(
+    r"\b(random|randomblob|changes|total_changes|last_insert_rowid)\s*\("
+    r"|'now'"
+    r"|\bcurrent_(timestamp|date|time)\b"
+    r"|\b(date|time|datetime|julianday|unixepoch)\s*\(\s*\)"
+    r"|\bstrftime\s*\(\s*'(?:[^']|'')*'\s*\)",
+    re.IGNORECASE,
+)
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace outside string literals and drop a trailing ';'"""
+    query = query.strip().rstrip(";").strip()
+    return _LITERAL_OR_SPACE.sub(lambda m: m.group(1) or " ", query)
+
+
+def is_cacheable(query: str) -> bool:
+    """Only deterministic read statements may be served from the cache"""
+    return bool(_CACHEABLE.match(query)) and not _VOLATILE.search(query)
+
+
+def estimate_size(columns: List[str], rows: Sequence[Sequence[Any]]) -> int:
+    """Cheap approximation of the memory held by a result set"""
+    size = 64 + sum(len(c) for c in columns)
+    for row in rows:
+        size += 56
+        for value in row:
+            size += len(value) if isinstance(value, (str, bytes)) else 8
+    return size
+
+
+class QueryCache:
+    """An LRU cache of query results bounded by an estimated byte budget.
+
+    Entries are dropped whenever the database changes. Writes made through
+    the server call ``invalidate()`` directly; commits from any other
+    connection are picked up through ``PRAGMA data_version``, which SQLite
+    bumps on a connection whenever somebody else has committed.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._data_versions: Dict[int, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    async def check_version(self, db: aiosqlite.Connection) -> None:
+        """Invalidate the cache if another connection committed since last time"""
+        version = (await db.execute_fetchall("PRAGMA data_version"))[0][0]
+        last = self._data_versions.get(id(db))
+        self._data_versions[id(db)] = version
+        # A connection we have not seen before can't vouch for cached entries
+        if last != version and (last is not None or self._entries):
+            self.invalidate()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(
+        self,
+        key: Hashable,
+        columns: List[str],
+        rows: Sequence[Sequence[Any]],
+        generation: int,
+    ) -> None:
+        """Store a result unless the cache was invalidated while it ran"""
+        if generation != self.generation:
+            return
+        size = estimate_size(columns, rows)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = ((columns, rows), size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self.invalidations += 1
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
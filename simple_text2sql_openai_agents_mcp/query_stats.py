@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+# Literals and parameters become ?, comments and whitespace disappear,
+# keywords and bare identifiers are lower-cased; quoted identifiers stay.
+_TOKEN = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<literal>[xX]?'(?:[^']|'')*'|\b\d+(?:\.\d*)?(?:[eE][-+]?\d+)?\b|\.\d+\b
+        |\?\d*|[:@$]\w+)
+    |(?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    |(?P<space>\s+)
+    |(?P<word>\w+)
+    |(?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+# IN (?, ?, ?) and VALUES (?, ?), (?, ?) collapse regardless of length
+_LIST = re.compile(r"\(\?(?:, \?)*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:, \(\.\.\.\))+")
+
+STAT_ORDERS = ("total_ms", "mean_ms", "max_ms", "calls", "rows", "errors")
+
+
+def fingerprint(query: str) -> str:
+    """Normalize a query so statements differing only in literals match"""
+    tokens = []
+    for match in _TOKEN.finditer(query):
+        kind = match.lastgroup
+        if kind in ("comment", "space"):
+            continue
+        if kind == "literal":
+            tokens.append("?")
+        elif kind == "word":
+            tokens.append(match.group().lower())
+        else:
+            tokens.append(match.group())
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    text = ""
+    for token in tokens:
+        if text and text[-1] not in "(." and token not in ",).":
+            text += " "
+        text += token
+    text = _LIST.sub("(...)", text)
+    return _ROWS.sub("(...)", text)
+
+
+def query_id(fingerprinted: str) -> str:
+    return hashlib.sha1(fingerprinted.encode("utf-8")).hexdigest()[:16]
+
+
+class QueryStats:
+    """Per-fingerprint aggregates of execute_query calls plus a slow-query log.
+
+    Like ``pg_stat_statements`` the table is bounded: once it holds more
+    than ``max_entries`` fingerprints the least-called tenth is dropped.
+    Queries slower than ``slow_ms`` are appended to a rotating log of JSON
+    lines together with their plan.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        slow_ms: float = 0,
+        log_path: Optional[str] = None,
+        log_max_bytes: int = 10 * 1024 * 1024,
+        log_backups: int = 5,
+    ):
+        self.max_entries = max_entries
+        self.slow_ms = slow_ms
+        self.since = time.time()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._slow_log: Optional[logging.Logger] = None
+        if slow_ms and log_path:
+            handler = RotatingFileHandler(
+                log_path, maxBytes=log_max_bytes, backupCount=log_backups, delay=True
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._slow_log = logging.getLogger(f"slow_queries.{log_path}")
+            self._slow_log.setLevel(logging.INFO)
+            self._slow_log.propagate = False
+            self._slow_log.addHandler(handler)
+
+    def record(self, query: str, elapsed_ms: float, response: Dict[str, Any]) -> str:
+        """Add one execute_query call to its fingerprint; returns the query id"""
+        normalized = fingerprint(query)
+        key = query_id(normalized)
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            entry = self._entries[key] = {
+                "query_id": key,
+                "fingerprint": normalized,
+                "example": query,
+                "calls": 0,
+                "total_ms": 0.0,
+                "min_ms": elapsed_ms,
+                "max_ms": 0.0,
+                "rows": 0,
+                "cache_hits": 0,
+                "errors": 0,
+                "slow": 0,
+            }
+        entry["calls"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["min_ms"] = min(entry["min_ms"], elapsed_ms)
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["rows"] += response.get("row_count", 0)
+        entry["cache_hits"] += bool(response.get("cached"))
+        entry["errors"] += "error" in response
+        entry["last_call"] = time.time()
+        if self.is_slow(elapsed_ms):
+            entry["slow"] += 1
+        return key
+
+    def _evict(self) -> None:
+        by_calls = sorted(self._entries, key=lambda k: self._entries[k]["calls"])
+        for key in by_calls[: max(1, len(by_calls) // 10)]:
+            del self._entries[key]
+
+    def is_slow(self, elapsed_ms: float) -> bool:
+        return bool(self.slow_ms) and elapsed_ms >= self.slow_ms
+
+    def log_slow(
+        self,
+        query: str,
+        params: Any,
+        elapsed_ms: float,
+        response: Dict[str, Any],
+        plan: Any,
+    ) -> None:
+        if self._slow_log is None:
+            return
+        normalized = fingerprint(query)
+        record = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "query_id": query_id(normalized),
+            "fingerprint": normalized,
+            "query": query,
+            "params": params,
+            "elapsed_ms": round(elapsed_ms, 3),
+            "rows": response.get("row_count", 0),
+            "error": response.get("error"),
+            "plan": plan,
+        }
+        self._slow_log.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    def top(self, order_by: str = "total_ms", limit: int = 20) -> List[Dict[str, Any]]:
+        """The fingerprints with the highest order_by, rounded for display"""
+        if order_by not in STAT_ORDERS:
+            raise ValueError(
+                f"Unknown order_by '{order_by}'. Use one of: {', '.join(STAT_ORDERS)}"
+            )
+        rows = []
+        for entry in self._entries.values():
+            row = dict(entry)
+            row["mean_ms"] = entry["total_ms"] / entry["calls"]
+            rows.append(row)
+        rows.sort(key=lambda r: r[order_by], reverse=True)
+        for row in rows[:limit]:
+            for name in ("total_ms", "mean_ms", "min_ms", "max_ms"):
+                row[name] = round(row[name], 3)
+        return rows[:limit]
+
+    def reset(self) -> None:
+        self._entries.clear()
+        self.since = time.time()
+
+    def stats(self, order_by: str = "total_ms", limit: int = 20) -> Dict[str, Any]:
+        return {
+            "since": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.since)),
+            "fingerprints": len(self._entries),
+            "slow_ms": self.slow_ms,
+            "statements": self.top(order_by, limit),
+        }
@@ -0,0 +1,74 @@
+import sqlite3
+from typing import Any, Dict, Optional, Tuple
+
+import aiosqlite
+
+from index_advisor import quote_identifier
+from query_cache import QueryCache
+
+
+class RowCounts:
+    """Row counts for count_rows: cached exact counts and cheap estimates.
+
+    An exact ``count(*)`` walks the whole table, so its result is kept
+    until the database changes. Changes are detected the same way as for
+    the result cache, whose generation moves on every write made through
+    the server and every commit seen through ``PRAGMA data_version``.
+
+    Estimates come from ``sqlite_stat1`` (written by ``ANALYZE``) or,
+    without statistics, from ``max(rowid)``. Tables estimated below
+    ``exact_below`` rows are cheap enough to count exactly anyway.
+    """
+
+    def __init__(self, cache: QueryCache, exact_below: int = 100000):
+        self.cache = cache
+        self.exact_below = exact_below
+        # table -> (exact count, cache generation it was counted in)
+        self._counts: Dict[str, Tuple[int, int]] = {}
+
+    async def estimate(
+        self, db: aiosqlite.Connection, table: str
+    ) -> Tuple[Optional[int], Optional[str]]:
+        """An approximate row count and where it came from"""
+        try:
+            # The table's own entry, or failing that one of its indexes;
+            # both start with the number of rows
+            rows = await db.execute_fetchall(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = ? COLLATE NOCASE "
+                "ORDER BY idx IS NOT NULL LIMIT 1",
+                (table,),
+            )
+        except sqlite3.OperationalError:
+            rows = []  # No sqlite_stat1 until ANALYZE has run
+        if rows:
+            return int(rows[0][0].split()[0]), "sqlite_stat1"
+        try:
+            rows = await db.execute_fetchall(
+                f"SELECT coalesce(max(rowid), 0) FROM {quote_identifier(table)}"
+            )
+            return rows[0][0], "max_rowid"
+        except sqlite3.Error:
+            return None, None  # Views and WITHOUT ROWID tables
+
+    async def count(
+        self, db: aiosqlite.Connection, table: str, exact: bool = False
+    ) -> Dict[str, Any]:
+        """Count the rows of table, estimating large tables unless exact"""
+        await self.cache.check_version(db)
+        key = table.lower()
+        cached = self._counts.get(key)
+        if cached is not None and cached[1] == self.cache.generation:
+            return {"row_count": cached[0], "exact": True, "source": "cache"}
+
+        if not exact:
+            estimate, source = await self.estimate(db, table)
+            if estimate is not None and estimate >= self.exact_below:
+                return {"row_count": estimate, "exact": False, "source": source}
+
+        generation = self.cache.generation
+        rows = await db.execute_fetchall(
+            f"SELECT count(*) FROM {quote_identifier(table)}"
+        )
+        count = rows[0][0]
+        self._counts[key] = (count, generation)
+        return {"row_count": count, "exact": True, "source": "count"}
@@ -0,0 +1,260 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from row_counts import RowCounts
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def render_columns(table_name: str, columns_info) -> List[str]:
+    """表头和列信息"""
+    lines = [f"\n=== TABLE: {table_name} ===", "COLUMNS:"]
+    for col in columns_info:
+        pk_marker = " [PRIMARY KEY]" if col["pk"] else ""
+        nullable = "NULL" if not col["notnull"] else "NOT NULL"
+        default = f" DEFAULT {col['dflt_value']}" if col["dflt_value"] else ""
+        lines.append(f"  {col['name']}: {col['type']} {nullable}{default}{pk_marker}")
+    return lines
+
+
+def render_samples(sample_rows, limit: int) -> List[str]:
+    """示例数据"""
+    if not sample_rows:
+        return ["SAMPLE DATA: No data available"]
+
+    lines = [f"SAMPLE DATA (first {limit} rows):"]
+    # 获取列名作为表头
+    column_names = list(sample_rows[0].keys())
+    header = " | ".join(column_names)
+    lines.append(f"  {header}")
+    lines.append(f"  {'-' * len(header)}")
+
+    # 添加数据行
+    for row in sample_rows:
+        row_values = []
+        for col_name in column_names:
+            value = row[col_name]
+            if value is None:
+                row_values.append("NULL")
+            else:
+                row_values.append(str(value))
+        lines.append(f"  {' | '.join(row_values)}")
+    return lines
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数：约 4 字节一个 token，无需分词器"""
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def render_index(
+    entries: List[Tuple[str, Optional[int], List[str], List[str]]],
+    token_budget: int,
+) -> str:
+    """表索引：表名、估计行数、外键；超出 token 预算时逐级精简
+
+    entries 为 (表名, 估计行数, 列名, 外键) 列表。依次尝试：带列名、
+    只带外键、只有表名和行数；仍然超出预算时截断表列表。
+    """
+    header = (
+        f"TABLES ({len(entries)}). Call get_table_details(tables=[...]) "
+        "for full columns and sample rows."
+    )
+
+    def line(entry, detail: str) -> str:
+        name, rows, columns, keys = entry
+        text = f"{name} (~{rows} rows)" if rows is not None else name
+        if detail == "columns" and columns:
+            text += ": " + ", ".join(columns)
+        if detail in ("columns", "keys") and keys:
+            text += " | FK " + "; ".join(keys)
+        return text
+
+    for detail in ("columns", "keys", "names"):
+        text = "\n".join([header] + [line(e, detail) for e in entries])
+        if estimate_tokens(text) <= token_budget:
+            return text
+
+    # 只放得下部分表名：保留能放下的，并说明省略了多少
+    lines = [header]
+    used = estimate_tokens(header) + 16
+    for shown, entry in enumerate(entries):
+        candidate = line(entry, "names")
+        used += estimate_tokens(candidate + "\n")
+        if used > token_budget:
+            lines.append(
+                f"... and {len(entries) - shown} more tables "
+                "(SELECT name FROM sqlite_master lists all)"
+            )
+            break
+        lines.append(candidate)
+    return "\n".join(lines)
+
+
+class SchemaCache:
+    """缓存 get_database_schema 的渲染结果
+
+    表结构按 ``PRAGMA schema_version`` 失效，只重新渲染定义发生变化的表；
+    示例数据有独立的 TTL。没有任何变化时只需一次 PRAGMA 查询。
+
+    架构分两层：完整架构（列和示例数据）超出 ``token_budget`` 时，
+    get_database_schema 改为返回精简的表索引（表名、估计行数、外键），
+    再由 get_table_details 按需返回选中表的完整信息。两层都有缓存。
+    """
+
+    def __init__(
+        self,
+        sample_ttl: float = 60.0,
+        sample_rows: int = 5,
+        token_budget: int = 4000,
+        row_counts: Optional[RowCounts] = None,
+    ):
+        self.sample_ttl = sample_ttl
+        self.sample_rows = sample_rows
+        self.token_budget = token_budget
+        self.row_counts = row_counts
+        self._schema_version: Optional[int] = None
+        self._tables: List[str] = []
+        # 表名 -> (建表 SQL, 渲染好的列信息)
+        self._columns: Dict[str, Tuple[str, List[str]]] = {}
+        # 表名 -> (列名, 外键 "列 -> 表.列")
+        self._outlines: Dict[str, Tuple[List[str], List[str]]] = {}
+        # 表名 -> (获取时间, 渲染好的示例数据)
+        self._samples: Dict[str, Tuple[float, List[str]]] = {}
+        self._text: Optional[str] = None
+        # (生成时间, 表索引文本)，行数估计随 sample_ttl 刷新
+        self._index: Optional[Tuple[float, str]] = None
+        self._lock = asyncio.Lock()
+
+    async def _refresh_tables(self, db: aiosqlite.Connection) -> None:
+        rows = await db.execute_fetchall(
+            "SELECT name, sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        )
+        tables = [row["name"] for row in rows]
+        for row in rows:
+            table_name, sql = row["name"], row["sql"]
+            cached = self._columns.get(table_name)
+            if cached is not None and cached[0] == sql:
+                continue
+            columns_info = await db.execute_fetchall(
+                f"PRAGMA table_info({quote_identifier(table_name)})"
+            )
+            self._columns[table_name] = (sql, render_columns(table_name, columns_info))
+            foreign_keys = await db.execute_fetchall(
+                "SELECT * FROM pragma_foreign_key_list(?)", (table_name,)
+            )
+            self._outlines[table_name] = (
+                [col["name"] for col in columns_info],
+                [
+                    f"{fk['from']} -> {fk['table']}.{fk['to'] or 'rowid'}"
+                    for fk in foreign_keys
+                ],
+            )
+            self._samples.pop(table_name, None)
+
+        for table_name in set(self._columns) - set(tables):
+            del self._columns[table_name]
+            self._outlines.pop(table_name, None)
+            self._samples.pop(table_name, None)
+        self._tables = tables
+        self._index = None
+
+    async def _check_schema(self, db: aiosqlite.Connection) -> bool:
+        """表结构有变化时增量刷新，返回是否发生了变化"""
+        version = (await db.execute_fetchall("PRAGMA schema_version"))[0][0]
+        if version == self._schema_version:
+            return False
+        await self._refresh_tables(db)
+        self._schema_version = version
+        return True
+
+    async def _refresh_samples(
+        self, db: aiosqlite.Connection, tables: Optional[List[str]] = None
+    ) -> bool:
+        now = time.monotonic()
+        refreshed = False
+        for table_name in self._tables if tables is None else tables:
+            cached = self._samples.get(table_name)
+            if cached is not None and now - cached[0] < self.sample_ttl:
+                continue
+            sample_rows = await db.execute_fetchall(
+                f"SELECT * FROM {quote_identifier(table_name)} LIMIT {self.sample_rows}"
+            )
+            self._samples[table_name] = (
+                now,
+                render_samples(sample_rows, self.sample_rows),
+            )
+            refreshed = True
+        return refreshed
+
+    async def _index_text(self, db: aiosqlite.Connection) -> str:
+        now = time.monotonic()
+        if self._index is not None and now - self._index[0] < self.sample_ttl:
+            return self._index[1]
+        entries = []
+        for table_name in self._tables:
+            rows = None
+            if self.row_counts is not None:
+                rows, _ = await self.row_counts.estimate(db, table_name)
+            entries.append((table_name, rows, *self._outlines[table_name]))
+        self._index = (now, render_index(entries, self.token_budget))
+        return self._index[1]
+
+    async def render(self, db: aiosqlite.Connection) -> str:
+        """返回数据库架构文本，按需增量刷新
+
+        完整架构放得进 token 预算时返回完整架构，否则返回表索引。
+        """
+        async with self._lock:
+            changed = await self._check_schema(db)
+            column_tokens = sum(
+                estimate_tokens("\n".join(self._columns[t][1])) for t in self._tables
+            )
+            # 只看列信息就已超出预算，无需再读示例数据
+            if column_tokens > self.token_budget:
+                return await self._index_text(db)
+            if await self._refresh_samples(db) or changed or self._text is None:
+                lines: List[str] = []
+                for table_name in self._tables:
+                    lines.extend(self._columns[table_name][1])
+                    lines.extend(self._samples[table_name][1])
+                self._text = "\n".join(lines)
+            if estimate_tokens(self._text) > self.token_budget:
+                return await self._index_text(db)
+            return self._text
+
+    async def details(self, db: aiosqlite.Connection, tables: List[str]) -> str:
+        """返回指定表的完整列信息和示例数据，表名不区分大小写"""
+        async with self._lock:
+            await self._check_schema(db)
+            by_name = {t.lower(): t for t in self._tables}
+            found = list(
+                dict.fromkeys(
+                    by_name[t.lower()] for t in tables if t.lower() in by_name
+                )
+            )
+            await self._refresh_samples(db, found)
+            lines: List[str] = []
+            for table_name in found:
+                lines.extend(self._columns[table_name][1])
+                lines.extend(self._samples[table_name][1])
+            missing = [t for t in tables if t.lower() not in by_name]
+            if missing:
+                lines.append(f"\nUNKNOWN TABLES: {', '.join(missing)}")
+            return "\n".join(lines).lstrip("\n")
+
+    async def warm(self, db: aiosqlite.Connection) -> None:
+        """预先生成两层架构，避免第一次调用时等待"""
+        await self.render(db)
+        async with self._lock:
+            await self._index_text(db)
+
+    def invalidate(self) -> None:
+        self._schema_version = None
+        self._samples.clear()
+        self._index = None
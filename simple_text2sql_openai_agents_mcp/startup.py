@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+
+class Startup:
+    """Process-wide startup work, run once before the server's first answer.
+
+    FastMCP enters its lifespan for every session, once per SSE connection,
+    so the lifespan must not own shared resources. Instead every session's
+    lifespan waits for the same startup task, which ``serve()`` starts next
+    to the transport; a readiness endpoint can report progress meanwhile.
+    Each step is timed, as is the whole cold start from construction.
+    """
+
+    def __init__(self):
+        self.began = time.perf_counter()
+        self.steps: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def step(self, name: str) -> AsyncIterator[None]:
+        """Time one named startup step"""
+        began = time.perf_counter()
+        yield
+        self.steps[name] = round((time.perf_counter() - began) * 1000, 2)
+
+    async def _run(self, start_up: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await start_up()
+        except Exception as e:
+            self.error = str(e)
+            logger.exception("Server startup failed")
+            raise
+        self.ready_ms = round((time.perf_counter() - self.began) * 1000, 2)
+        logger.info(
+            f"Ready {self.ready_ms:.0f} ms after start: "
+            + ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.steps.items())
+        )
+
+    def start(self, start_up: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start the startup task unless it is already running or done"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(start_up))
+        return self._task
+
+    async def wait(self, start_up: Callable[[], Awaitable[Any]]) -> None:
+        """Start if needed, then wait until startup has finished"""
+        # Shielded, so a session giving up does not cancel the shared task
+        await asyncio.shield(self.start(start_up))
+
+    async def stop(self) -> None:
+        """Cancel a startup still in progress, e.g. on shutdown"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_ms is not None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "ready_ms": self.ready_ms,
+            "steps": dict(self.steps),
+            "error": self.error,
+        }
+
+
+async def analyze_if_missing(path: str, analysis_limit: int = 0) -> bool:
+    """Run ANALYZE on the database at path unless it already has statistics.
+
+    Uses its own read-write connection, since the pool may be read-only;
+    ANALYZE only writes the planner's ``sqlite_stat1`` table. A non-zero
+    ``analysis_limit`` samples that many index rows per index, which keeps
+    large databases quick to analyze. Returns whether ANALYZE ran.
+    """
+    if not os.access(path, os.W_OK):
+        return False
+    async with aiosqlite.connect(path) as db:
+        rows = await db.execute_fetchall(
+            "SELECT type = 'table' AND name = 'sqlite_stat1' FROM sqlite_master "
+            "WHERE type = 'table' ORDER BY 1 DESC LIMIT 1"
+        )
+        # No tables to analyze, or statistics already there
+        if not rows or rows[0][0]:
+            return False
+        if analysis_limit:
+            await db.execute_fetchall(f"PRAGMA analysis_limit={int(analysis_limit)}")
+        await db.execute_fetchall("ANALYZE")
+        await db.commit()
+    return True
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import sqlite3
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+from db_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+_Write = Tuple[str, Sequence[Any], "asyncio.Future[List[aiosqlite.Row]]"]
+
+
+class WriteQueue:
+    """A single writer that group-commits queued statements.
+
+    Callers submit one statement at a time (typically ``INSERT ...
+    RETURNING``) and await its rows. One background task drains the queue:
+    it takes the first pending write, waits up to ``max_wait`` seconds for
+    more, and runs up to ``max_batch`` of them in one ``BEGIN IMMEDIATE``
+    transaction, so a burst of writes shares a single commit and fsync.
+    Callers are answered only after that commit, so a returned row id is as
+    durable as with one transaction per write.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        max_batch: int = 64,
+        max_wait: float = 0.002,
+        on_commit: Optional[Callable[[], None]] = None,
+    ):
+        if max_batch < 1:
+            raise ValueError("Batch size must be at least 1")
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.on_commit = on_commit
+        self.batches = 0
+        self.writes = 0
+        self._queue: "asyncio.Queue[Optional[_Write]]" = asyncio.Queue()
+        self._writer: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def submit(self, sql: str, params: Sequence[Any] = ()) -> List[aiosqlite.Row]:
+        """Queue one write and return its rows once its batch has committed"""
+        if self._closed:
+            raise RuntimeError("Write queue is closed")
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((sql, params, future))
+        return await future
+
+    async def _next_batch(self) -> Optional[List[_Write]]:
+        first = await self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                # Closing: commit what we have, then stop
+                self._queue.put_nowait(None)
+                break
+            batch.append(item)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            if batch is None:
+                return
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[_Write]) -> None:
+        # Skip writes whose caller was cancelled while queued
+        batch = [write for write in batch if not write[2].done()]
+        if not batch:
+            return
+        results = []
+        try:
+            async with self.pool.acquire() as db:
+                await db.execute_fetchall("BEGIN IMMEDIATE")
+                for sql, params, future in batch:
+                    try:
+                        rows = await db.execute_fetchall(sql, params)
+                        results.append((future, list(rows), None))
+                    except sqlite3.Error as e:
+                        # A failed statement is undone on its own unless the
+                        # error rolled back the whole transaction
+                        if not db.in_transaction:
+                            raise
+                        results.append((future, None, e))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Write batch of {len(batch)} failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        if self.on_commit is not None:
+            self.on_commit()
+        for future, rows, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(rows)
+
+    async def close(self) -> None:
+        """Commit every queued write, then stop the writer"""
+        self._closed = True
+        if self._writer is not None and not self._writer.done():
+            self._queue.put_nowait(None)
+            await self._writer
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "mean_batch": round(self.writes / self.batches, 2) if self.batches else 0,
+            "queued": self._queue.qsize(),
+        }
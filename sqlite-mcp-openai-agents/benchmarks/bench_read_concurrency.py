@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Measure concurrent read throughput for each SQLite connection mode.
+
+Usage:
+    python benchmarks/bench_read_concurrency.py --rows 200000 --concurrency 8 --writer
+
+Every mode runs the same query mix through a ConnectionPool sized to the
+concurrency level. With --writer a separate thread commits a small insert
+every few milliseconds, which is where rollback-journal readers start to
+queue behind the writer's lock and WAL readers do not.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool, pragma_hook, sqlite_uri  # noqa: E402
+
+# name -> (journal mode of the file, read_only, immutable, pragmas)
+MODES = {
+    "rollback": ("delete", False, False, {}),
+    "wal": ("wal", False, False, {}),
+    "ro": ("delete", True, False, {}),
+    "ro+mmap": ("delete", True, False, {"mmap_size": 268435456}),
+    "wal+ro+mmap": ("wal", True, False, {"mmap_size": 268435456}),
+    "immutable": ("delete", True, True, {"mmap_size": 268435456}),
+}
+
+
+def build_database(path: str, rows: int, journal_mode: str) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    conn.execute(
+        "CREATE TABLE metrics (id INTEGER PRIMARY KEY, name TEXT, value REAL, timestamp TEXT)"
+    )
+    names = ["cpu_usage", "memory_usage", "disk_usage", "network_in", "network_out"]
+    conn.executemany(
+        "INSERT INTO metrics (name, value, timestamp) VALUES (?, ?, datetime('now'))",
+        ((names[i % 5], random.uniform(1, 100)) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def writer(path: str, stop: threading.Event, interval: float) -> None:
+    conn = sqlite3.connect(path, timeout=30)
+    while not stop.is_set():
+        conn.execute(
+            "INSERT INTO metrics (name, value, timestamp) VALUES ('cpu_usage', 1, datetime('now'))"
+        )
+        conn.commit()
+        time.sleep(interval)
+    conn.close()
+
+
+async def run_mode(path: str, mode: str, args) -> dict:
+    _, read_only, immutable, pragmas = MODES[mode]
+    pool = ConnectionPool(
+        sqlite_uri(path, read_only=read_only, immutable=immutable),
+        size=args.concurrency,
+        uri=True,
+        timeout=30,
+    )
+    pool.on_connect(pragma_hook(pragmas))
+    await pool.open()
+
+    latencies = []
+    deadline = time.perf_counter() + args.seconds
+
+    async def client():
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            start = rng.randint(1, args.rows - 1000)
+            if rng.random() < 0.8:
+                sql = "SELECT * FROM metrics WHERE id = ?"
+                params = (start,)
+            else:
+                sql = "SELECT name, avg(value) FROM metrics WHERE id BETWEEN ? AND ? GROUP BY name"
+                params = (start, start + 1000)
+            began = time.perf_counter()
+            async with pool.acquire() as db:
+                await db.execute_fetchall(sql, params)
+            latencies.append(time.perf_counter() - began)
+
+    stop = threading.Event()
+    writer_thread = None
+    if args.writer and not immutable:
+        writer_thread = threading.Thread(
+            target=writer, args=(path, stop, args.write_interval / 1000)
+        )
+        writer_thread.start()
+    try:
+        await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    finally:
+        stop.set()
+        if writer_thread:
+            writer_thread.join()
+        await pool.close()
+
+    latencies.sort()
+    return {
+        "qps": len(latencies) / args.seconds,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writer", action="store_true", help="commit in background")
+    parser.add_argument("--write-interval", type=float, default=5, help="ms")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_read_")
+    try:
+        templates = {}
+        for journal_mode in {MODES[m][0] for m in args.modes}:
+            templates[journal_mode] = os.path.join(
+                workdir, f"template-{journal_mode}.db"
+            )
+            build_database(templates[journal_mode], args.rows, journal_mode)
+
+        print(
+            f"{args.rows} rows, concurrency {args.concurrency}, "
+            f"{args.seconds}s per mode, writer {'on' if args.writer else 'off'}\n"
+        )
+        print(f"{'mode':<14}{'qps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for mode in args.modes:
+            # Fresh copy so one mode's writes don't affect the next
+            path = os.path.join(workdir, f"{mode}.db")
+            shutil.copy(templates[MODES[mode][0]], path)
+            result = await run_mode(path, mode, args)
+            print(
+                f"{mode:<14}{result['qps']:>10.0f}{result['p50']:>10.2f}"
+                f"{result['p95']:>10.2f}{result['p99']:>10.2f}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
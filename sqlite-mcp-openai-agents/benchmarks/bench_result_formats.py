@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Compare payload size and serialization time of execute_query formats.
+
+Usage:
+    python benchmarks/bench_result_formats.py --rows 100000
+
+Rows come from an in-memory SQLite table shaped like ``metrics`` so the
+value types match what the server returns. "wire" is the JSON FastMCP
+actually sends (``pydantic_core.to_json`` with ``indent=2``), "compact" is
+the same payload without whitespace.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import pydantic_core
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_format import RESULT_FORMATS, encode_rows  # noqa: E402
+
+
+def load_rows(count: int):
+    conn = sqlite3.connect(":memory:")
+    rows = conn.execute(
+        """
+        WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < ?)
+        SELECT
+            i AS id,
+            CASE i % 5 WHEN 0 THEN 'cpu_usage' WHEN 1 THEN 'memory_usage'
+                WHEN 2 THEN 'disk_usage' WHEN 3 THEN 'network_in'
+                ELSE 'network_out' END AS name,
+            (i * 7919 % 10000) / 100.0 AS value,
+            datetime('2024-01-01', '+' || i || ' seconds') AS timestamp
+        FROM seq
+        """,
+        (count,),
+    )
+    columns = [c[0] for c in rows.description]
+    data = rows.fetchall()
+    conn.close()
+    return columns, data
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    columns, rows = load_rows(args.rows)
+    print(f"{args.rows} rows x {len(columns)} columns, best of {args.repeat}\n")
+    print(
+        f"{'format':<10}{'encode ms':>11}{'wire ms':>10}{'wire bytes':>14}"
+        f"{'compact bytes':>15}{'vs objects':>12}"
+    )
+
+    baseline = None
+    for fmt in RESULT_FORMATS:
+        payload, encode_s = timed(lambda: encode_rows(columns, rows, fmt), args.repeat)
+        wire, wire_s = timed(
+            lambda: pydantic_core.to_json(payload, fallback=str, indent=2),
+            args.repeat,
+        )
+        compact = json.dumps(payload, separators=(",", ":"), default=str)
+        baseline = baseline or len(wire)
+        print(
+            f"{fmt:<10}{encode_s * 1000:>11.1f}{wire_s * 1000:>10.1f}"
+            f"{len(wire):>14,}{len(compact):>15,}{len(wire) / baseline:>11.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""Benchmark the MCP tools of both SQLite servers in-process and over SSE.
+
+Usage:
+    python benchmarks/bench_tools.py --scales 0 0.1 1 --concurrency 1 8
+    python benchmarks/bench_tools.py --server text2sql --modes inproc
+    python benchmarks/bench_tools.py --compare benchmarks/results/old.json
+
+For every server, scale and mode the tools run in a fresh process, so
+module-level configuration (DB_PATH, the pool) and peak RSS are per run.
+"inproc" starts the server up through its own lifespan and awaits the tool
+functions directly; "sse" starts the server as a subprocess and calls the
+tools through an MCP client session, so it includes transport and JSON
+serialization. Only the tools a server registers are benchmarked. Scale 0 is the small fixed
+sample database and scale 1 is about a million rows. Results are written
+as JSON (by default to benchmarks/results/) and --compare prints the
+change in p95 latency and throughput against an earlier results file.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SQLITE_DIR = os.path.dirname(BENCH_DIR)
+TEXT2SQL_DIR = os.path.join(
+    os.path.dirname(SQLITE_DIR), "simple_text2sql_openai_agents_mcp"
+)
+
+# Per server: where it lives, its module, the table the id-range query walks
+# and the arguments each tool is called with. {lo}/{hi} are random id ranges;
+# tools the server does not register are skipped.
+SERVERS = {
+    "sqlite": {
+        "dir": SQLITE_DIR,
+        "module": "server",
+        "id_table": "orders",
+        "tools": {
+            "execute_query": {
+                "query": "SELECT o.id, o.total_amount, u.username FROM orders o "
+                "JOIN users u ON u.id = o.user_id WHERE o.id BETWEEN ? AND ?",
+                "params": ["{lo}", "{hi}"],
+            },
+            "list_tables": None,
+            "describe_table": {"table_name": "orders"},
+            "count_rows": {"table_name": "order_items"},
+        },
+    },
+    "text2sql": {
+        "dir": TEXT2SQL_DIR,
+        "module": "mcp_server",
+        "id_table": "employees",
+        "tools": {
+            "execute_query": {
+                "query": "SELECT e.name, p.name AS project FROM employee_projects ep "
+                "JOIN employees e ON e.id = ep.employee_id "
+                "JOIN projects p ON p.id = ep.project_id "
+                "WHERE ep.employee_id BETWEEN ? AND ?",
+                "params": ["{lo}", "{hi}"],
+            },
+            "list_tables": None,
+            "describe_table": {"table_name": "employees"},
+            "count_rows": {"table_name": "employee_projects"},
+            "get_database_schema": None,
+        },
+    },
+}
+ID_RANGE = 20
+
+
+def build_database(server: str, scale: float, path: str) -> None:
+    """Create the database for one scale with the server's own generator"""
+    if server == "sqlite":
+        cmd = [
+            sys.executable,
+            os.path.join(SQLITE_DIR, "generate_sample_db.py"),
+            "--output",
+            path,
+        ]
+        if scale:
+            cmd += ["--scale", str(scale)]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        return
+    script = os.path.join(TEXT2SQL_DIR, "create_database.py")
+    if scale:
+        # about a million rows per unit of scale, like generate_sample_db.py
+        employees = str(max(10, int(250_000 * scale)))
+        cmd = [sys.executable, script, "--employees", employees, "--output", path]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+    else:
+        # The fixed sample always writes company_data.db in the working dir
+        workdir = os.path.dirname(path)
+        subprocess.run(
+            [sys.executable, script], check=True, cwd=workdir, stdout=subprocess.DEVNULL
+        )
+        os.replace(os.path.join(workdir, "company_data.db"), path)
+
+
+def percentile(latencies, q: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+    }
+
+
+def tool_arguments(template, max_id: int, rng: random.Random):
+    """Fill a tool's argument template with a fresh random id range"""
+    if template is None:
+        return None
+    lo = rng.randint(1, max(1, max_id - ID_RANGE))
+    values = {"{lo}": lo, "{hi}": lo + ID_RANGE}
+    args = dict(template)
+    if "params" in args:
+        args["params"] = [values.get(p, p) for p in args["params"]]
+    return args
+
+
+def is_error(result) -> bool:
+    return isinstance(result, dict) and "error" in result
+
+
+async def measure(
+    call, template, max_id: int, requests: int, concurrency: int, warmup: int
+) -> dict:
+    """Run requests calls of one tool from concurrency concurrent clients"""
+    rng = random.Random(0)
+    for _ in range(warmup):
+        await call(tool_arguments(template, max_id, rng))
+
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def client():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            args = tool_arguments(template, max_id, rng)
+            began = time.perf_counter()
+            result = await call(args)
+            latencies.append(time.perf_counter() - began)
+            if is_error(result):
+                errors += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - began)
+
+
+def max_id(db_path: str, table: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f"SELECT coalesce(max(id), 1) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+async def run_inproc(server: str, db_path: str, args) -> dict:
+    config = SERVERS[server]
+    sys.path.insert(0, config["dir"])
+    os.environ["DB_PATH"] = db_path
+    module = __import__(config["module"])
+
+    def caller(name):
+        fn = getattr(module, name)
+        params = list(inspect.signature(fn).parameters.values())
+
+        async def call(arguments):
+            if params:
+                return await fn(params[0].annotation(**arguments))
+            return await fn()
+
+        return call
+
+    top = max_id(db_path, config["id_table"])
+    results = {}
+    available = {tool.name for tool in await module.app.list_tools()}
+    try:
+        # The lifespan every session enters runs the server's startup
+        async with module.lifespan(module.app):
+            for name, template in config["tools"].items():
+                if name not in available:
+                    continue
+                results[name] = {
+                    str(c): await measure(
+                        caller(name), template, top, args.requests, c, args.warmup
+                    )
+                    for c in args.concurrency
+                }
+    finally:
+        await module.shut_down()
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {"tools": results, "peak_rss_mb": round(rss / divisor, 1)}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb(pid: int):
+    """VmHWM of a live process, None where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+async def run_sse(server: str, db_path: str, args) -> dict:
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+
+    config = SERVERS[server]
+    port = free_port()
+    env = dict(os.environ, DB_PATH=db_path, MCP_PORT=str(port))
+    proc = subprocess.Popen(
+        [sys.executable, config["module"] + ".py"],
+        cwd=config["dir"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"{server} server did not start")
+                await asyncio.sleep(0.1)
+
+        top = max_id(db_path, config["id_table"])
+        results = {}
+        async with sse_client(f"http://127.0.0.1:{port}/sse") as streams:
+            async with ClientSession(*streams) as session:
+                await session.initialize()
+                available = {tool.name for tool in (await session.list_tools()).tools}
+
+                def caller(name):
+                    async def call(arguments):
+                        request = (
+                            {"request": arguments} if arguments is not None else {}
+                        )
+                        result = await session.call_tool(name, request)
+                        if result.isError:
+                            return {"error": result.content[0].text}
+                        text = result.content[0].text if result.content else ""
+                        # get_database_schema returns plain text
+                        return json.loads(text) if text[:1] in "{[" else text
+
+                    return call
+
+                for name, template in config["tools"].items():
+                    if name not in available:
+                        continue
+                    results[name] = {
+                        str(c): await measure(
+                            caller(name), template, top, args.requests, c, args.warmup
+                        )
+                        for c in args.concurrency
+                    }
+        return {"tools": results, "peak_rss_mb": peak_rss_mb(proc.pid)}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SQLITE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {
+        (r["server"], r["scale"], r["mode"], r["tool"], r["concurrency"]): r
+        for r in baseline["results"]
+    }
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('commit')})")
+    print(
+        f"{'server':<10}{'scale':>6}{'mode':>8}{'tool':>22}{'conc':>6}{'p95':>10}{'rps':>10}"
+    )
+    for r in results["results"]:
+        before = old.get(
+            (r["server"], r["scale"], r["mode"], r["tool"], r["concurrency"])
+        )
+        if before is None:
+            continue
+        p95 = (r["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        rps = (
+            (r["throughput_rps"] / before["throughput_rps"] - 1) * 100
+            if before["throughput_rps"]
+            else 0.0
+        )
+        print(
+            f"{r['server']:<10}{r['scale']:>6g}{r['mode']:>8}{r['tool']:>22}"
+            f"{r['concurrency']:>6}{p95:>+9.1f}%{rps:>+9.1f}%"
+        )
+
+
+def run_one(argv) -> None:
+    """Child process entry: benchmark one server/scale/mode, print JSON"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--server", required=True)
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--mode", required=True)
+    parser.add_argument("--requests", type=int, required=True)
+    parser.add_argument("--warmup", type=int, required=True)
+    parser.add_argument("--concurrency", type=int, nargs="+", required=True)
+    args = parser.parse_args(argv)
+    runner = run_inproc if args.mode == "inproc" else run_sse
+    result = asyncio.run(runner(args.server, args.db, args))
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", nargs="+", default=list(SERVERS), choices=SERVERS)
+    parser.add_argument("--scales", type=float, nargs="+", default=[0, 0.1])
+    parser.add_argument(
+        "--modes", nargs="+", default=["inproc", "sse"], choices=["inproc", "sse"]
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument(
+        "--requests", type=int, default=200, help="per tool and concurrency"
+    )
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--workdir", help="keep generated databases here between runs")
+    parser.add_argument(
+        "--output",
+        help="results JSON (default benchmarks/results/<time>-<commit>.json)",
+    )
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_tools_")
+    os.makedirs(workdir, exist_ok=True)
+    commit = git_commit()
+    started = datetime.now(timezone.utc)
+    results = {
+        "meta": {
+            "commit": commit,
+            "started": started.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {
+                k: v for k, v in vars(args).items() if k not in ("output", "compare")
+            },
+        },
+        "results": [],
+    }
+
+    print(
+        f"{'server':<10}{'scale':>6}{'mode':>8}{'tool':>22}{'conc':>6}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}{'rss MB':>8}"
+    )
+    for server in args.server:
+        for scale in args.scales:
+            db_path = os.path.join(workdir, f"{server}-scale-{scale:g}.db")
+            if not os.path.exists(db_path):
+                build_database(server, scale, db_path)
+            for mode in args.modes:
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "--run-one",
+                        "--server",
+                        server,
+                        "--db",
+                        db_path,
+                        "--mode",
+                        mode,
+                        "--requests",
+                        str(args.requests),
+                        "--warmup",
+                        str(args.warmup),
+                        "--concurrency",
+                        *map(str, args.concurrency),
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                run = json.loads(output.strip().splitlines()[-1])
+                for tool, by_concurrency in run["tools"].items():
+                    for concurrency, stats in by_concurrency.items():
+                        row = {
+                            "server": server,
+                            "scale": scale,
+                            "mode": mode,
+                            "tool": tool,
+                            "concurrency": int(concurrency),
+                            **stats,
+                            "peak_rss_mb": run["peak_rss_mb"],
+                        }
+                        results["results"].append(row)
+                        print(
+                            f"{server:<10}{scale:>6g}{mode:>8}{tool:>22}{concurrency:>6}"
+                            f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                            f"{stats['p99_ms']:>10.2f}{stats['throughput_rps']:>10.0f}"
+                            f"{run['peak_rss_mb'] or 0:>8.0f}"
+                        )
+
+    path = args.output or os.path.join(
+        BENCH_DIR, "results", f"{started:%Y%m%dT%H%M%S}-{commit or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {path}")
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run-one"]:
+        run_one(sys.argv[2:])
+    else:
+        main()
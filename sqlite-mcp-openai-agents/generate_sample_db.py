@@ -2,207 +2,448 @@
 import sqlite3
 import os
 import random
+import argparse
+import multiprocessing
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
-# Define the database path
-DB_PATH = Path("sample.db")
-
-# Create parent directory if it doesn't exist
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-# Remove existing database if it exists
-if DB_PATH.exists():
-    print(f"Removing existing database at {DB_PATH}")
-    os.remove(DB_PATH)
-
-# Connect to database
-print(f"Creating database at {DB_PATH}")
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-
-# Create metrics table
-print("Creating metrics table")
-cursor.execute('''
-CREATE TABLE metrics (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    value REAL NOT NULL,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-)
-''')
-
-# Create users table
-print("Creating users table")
-cursor.execute('''
-CREATE TABLE users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL UNIQUE,
-    email TEXT NOT NULL,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    last_login DATETIME,
-    is_active BOOLEAN DEFAULT TRUE
-)
-''')
-
-# Create products table
-print("Creating products table")
-cursor.execute('''
-CREATE TABLE products (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    category TEXT NOT NULL,
-    price REAL NOT NULL,
-    stock INTEGER NOT NULL,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-)
-''')
-
-# Create orders table
-print("Creating orders table")
-cursor.execute('''
-CREATE TABLE orders (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL,
-    total_amount REAL NOT NULL,
-    status TEXT NOT NULL,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users (id)
-)
-''')
-
-# Create order_items table
-print("Creating order_items table")
-cursor.execute('''
-CREATE TABLE order_items (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    order_id INTEGER NOT NULL,
-    product_id INTEGER NOT NULL,
-    quantity INTEGER NOT NULL,
-    unit_price REAL NOT NULL,
-    FOREIGN KEY (order_id) REFERENCES orders (id),
-    FOREIGN KEY (product_id) REFERENCES products (id)
-)
-''')
-
-# Sample metrics data
-print("Inserting sample metrics data")
-metrics_data = []
-current_time = datetime.now()
-
-# Generate 50 metrics entries with timestamps over the last 24 hours
-for i in range(50):
-    metrics_data.append((
-        random.choice(['cpu_usage', 'memory_usage', 'disk_usage', 'network_in', 'network_out']),
-        random.uniform(1, 100),
-        (current_time - timedelta(hours=i % 24)).strftime('%Y-%m-%d %H:%M:%S')
-    ))
-
-cursor.executemany(
-    "INSERT INTO metrics (name, value, timestamp) VALUES (?, ?, ?)",
-    metrics_data
-)
+# Rows generated per unit of --scale, so --scale 1 is about a million rows.
+# order_items are generated with their orders, 2.5 per order on average.
+SCALE_ROWS = {
+    "users": 10_000,
+    "products": 1_000,
+    "orders": 200_000,
+    "metrics": 290_000,
+}
+CHUNK_ROWS = 50_000
+COMMIT_ROWS = 1_000_000
 
-# Sample users data
-print("Inserting sample users data")
-users_data = [
-    ('john_doe', 'john.doe@example.com', '2023-01-15 12:30:45', '2023-06-20 08:15:30', True),
-    ('jane_smith', 'jane.smith@example.com', '2023-02-20 10:15:20', '2023-06-19 14:20:10', True),
-    ('bob_johnson', 'bob.johnson@example.com', '2023-03-10 09:45:12', '2023-06-15 11:30:45', True),
-    ('alice_williams', 'alice.williams@example.com', '2023-04-05 15:20:30', '2023-06-18 09:10:25', True),
-    ('charlie_brown', 'charlie.brown@example.com', '2023-05-12 14:10:35', '2023-06-10 16:45:15', False)
-]
-
-cursor.executemany(
-    "INSERT INTO users (username, email, created_at, last_login, is_active) VALUES (?, ?, ?, ?, ?)",
-    users_data
+# Bulk load settings: no rollback journal, no fsync, big page cache.
+# None of these persist, so the finished file opens normally.
+LOAD_PRAGMAS = (
+    "PRAGMA page_size=8192",
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA cache_size=-262144",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA locking_mode=EXCLUSIVE",
 )
 
-# Sample products data
-print("Inserting sample products data")
-products_data = [
-    ('Laptop', 'Electronics', 1299.99, 10, '2023-01-10 09:00:00', '2023-06-01 10:15:30'),
-    ('Smartphone', 'Electronics', 699.99, 15, '2023-02-15 10:30:00', '2023-06-05 11:20:45'),
-    ('Headphones', 'Electronics', 149.99, 30, '2023-03-20 11:45:00', '2023-06-10 14:30:20'),
-    ('T-shirt', 'Clothing', 19.99, 100, '2023-04-25 13:00:00', '2023-06-15 09:45:10'),
-    ('Jeans', 'Clothing', 49.99, 50, '2023-05-30 14:15:00', '2023-06-20 15:10:35'),
-    ('Coffee Maker', 'Appliances', 89.99, 20, '2023-06-05 15:30:00', '2023-06-25 12:25:40'),
-    ('Blender', 'Appliances', 49.99, 25, '2023-06-10 16:45:00', '2023-06-30 16:40:15'),
-    ('Monitor', 'Electronics', 249.99, 12, '2023-06-15 09:00:00', '2023-07-01 10:15:30')
-]
-
-cursor.executemany(
-    "INSERT INTO products (name, category, price, stock, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
-    products_data
-)
+INSERTS = {
+    "users": "INSERT INTO users (id, username, email, created_at, last_login, is_active) VALUES (?, ?, ?, ?, ?, ?)",
+    "products": "INSERT INTO products (id, name, category, price, stock, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "orders": "INSERT INTO orders (id, user_id, total_amount, status, created_at) VALUES (?, ?, ?, ?, ?)",
+    "order_items": "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
+    "metrics": "INSERT INTO metrics (name, value, timestamp) VALUES (?, ?, ?)",
+}
 
-# Sample orders data
-print("Inserting sample orders data")
-orders_data = [
-    (1, 1299.99, 'Completed', '2023-06-01 10:30:45'),
-    (1, 149.99, 'Completed', '2023-06-10 14:15:20'),
-    (2, 749.98, 'Processing', '2023-06-15 09:45:30'),
-    (3, 89.99, 'Shipped', '2023-06-18 11:20:15'),
-    (4, 269.98, 'Pending', '2023-06-20 16:10:25'),
-    (2, 1349.97, 'Completed', '2023-06-22 12:30:40'),
-    (5, 49.99, 'Cancelled', '2023-06-25 10:05:15')
-]
-
-cursor.executemany(
-    "INSERT INTO orders (user_id, total_amount, status, created_at) VALUES (?, ?, ?, ?)",
-    orders_data
-)
+METRIC_NAMES = ['cpu_usage', 'memory_usage', 'disk_usage', 'network_in', 'network_out']
+METRIC_WEIGHTS = [35, 30, 10, 15, 10]
+ORDER_STATUSES = ['Completed', 'Shipped', 'Processing', 'Pending', 'Cancelled']
+ORDER_STATUS_WEIGHTS = [60, 15, 10, 10, 5]
+EMAIL_DOMAINS = ['example.com', 'mail.com', 'corp.example', 'webmail.net']
+# category -> (weight, median price, product nouns)
+CATEGORIES = {
+    'Electronics': (30, 250.0, ['Laptop', 'Smartphone', 'Headphones', 'Monitor', 'Tablet', 'Camera']),
+    'Clothing': (30, 35.0, ['T-shirt', 'Jeans', 'Jacket', 'Sneakers', 'Dress', 'Hat']),
+    'Appliances': (15, 90.0, ['Coffee Maker', 'Blender', 'Toaster', 'Kettle', 'Vacuum']),
+    'Books': (15, 15.0, ['Novel', 'Cookbook', 'Textbook', 'Comic', 'Biography']),
+    'Sports': (10, 45.0, ['Yoga Mat', 'Football', 'Racket', 'Dumbbell', 'Helmet']),
+}
+ADJECTIVES = ['Classic', 'Pro', 'Ultra', 'Mini', 'Smart', 'Eco', 'Deluxe', 'Basic']
+
+# Set in each worker by init_worker
+_config = {}
+
+
+def skewed_id(rng, n, skew):
+    """Pick an id in 1..n where low ids are picked more often (skew=1 is uniform)"""
+    return min(n, int(n * rng.random() ** skew) + 1)
+
+
+def timestamp(rng, now, days):
+    return (now - timedelta(seconds=rng.randrange(days * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def generate_products(start, count, seed, now):
+    rng = random.Random(f"{seed}:products:{start}")
+    categories = list(CATEGORIES)
+    weights = [CATEGORIES[c][0] for c in categories]
+    rows = []
+    for product_id in range(start, start + count):
+        category = rng.choices(categories, weights)[0]
+        _, median, nouns = CATEGORIES[category]
+        created = now - timedelta(seconds=rng.randrange(3 * 365 * 86400))
+        rows.append((
+            product_id,
+            f"{rng.choice(ADJECTIVES)} {rng.choice(nouns)} {product_id}",
+            category,
+            round(median * rng.lognormvariate(0, 0.6), 2),
+            rng.randint(0, 500),
+            created.strftime('%Y-%m-%d %H:%M:%S'),
+            (created + timedelta(seconds=rng.randrange(90 * 86400))).strftime('%Y-%m-%d %H:%M:%S'),
+        ))
+    return rows
+
+
+def init_worker(config):
+    _config.update(config)
+
+
+def generate_chunk(task):
+    """Generate one chunk of rows as a list of (table, rows) pairs"""
+    table, start, count = task
+    seed, skew, now = _config['seed'], _config['skew'], _config['now']
+    rng = random.Random(f"{seed}:{table}:{start}")
+
+    if table == 'users':
+        rows = []
+        for user_id in range(start, start + count):
+            created = now - timedelta(seconds=rng.randrange(3 * 365 * 86400))
+            last_login = None
+            if rng.random() < 0.9:
+                last_login = (created + (now - created) * rng.random()).strftime('%Y-%m-%d %H:%M:%S')
+            rows.append((
+                user_id,
+                f"user_{user_id}",
+                f"user_{user_id}@{rng.choice(EMAIL_DOMAINS)}",
+                created.strftime('%Y-%m-%d %H:%M:%S'),
+                last_login,
+                rng.random() < 0.9,
+            ))
+        return [('users', rows)]
+
+    if table == 'orders':
+        prices, users = _config['prices'], _config['users']
+        orders, items = [], []
+        for order_id in range(start, start + count):
+            total = 0.0
+            # 1 + geometric: most orders hold one or two items
+            while True:
+                product_id = skewed_id(rng, len(prices) - 1, skew)
+                quantity = 1 if rng.random() < 0.7 else rng.randint(2, 5)
+                items.append((order_id, product_id, quantity, prices[product_id]))
+                total += quantity * prices[product_id]
+                if rng.random() < 0.4:
+                    break
+            orders.append((
+                order_id,
+                skewed_id(rng, users, skew),
+                round(total, 2),
+                rng.choices(ORDER_STATUSES, ORDER_STATUS_WEIGHTS)[0],
+                timestamp(rng, now, 2 * 365),
+            ))
+        return [('orders', orders), ('order_items', items)]
+
+    if table == 'metrics':
+        names = rng.choices(METRIC_NAMES, METRIC_WEIGHTS, k=count)
+        return [('metrics', [
+            (name, round(rng.betavariate(2, 5) * 100, 2), timestamp(rng, now, 30))
+            for name in names
+        ])]
+
+    raise ValueError(f"Unknown table {table}")
+
+
+def generated_chunks(tasks, workers, config):
+    """Yield generate_chunk results in task order, in parallel if workers > 1"""
+    if workers <= 1:
+        init_worker(config)
+        for task in tasks:
+            yield generate_chunk(task)
+        return
+    with multiprocessing.Pool(workers, init_worker, (config,)) as pool:
+        # A bounded window keeps generated-but-not-inserted rows in check
+        window = workers * 2
+        for i in range(0, len(tasks), window):
+            yield from pool.imap(generate_chunk, tasks[i:i + window])
+
+
+def chunk_tasks(table, start, count):
+    return [(table, s, min(CHUNK_ROWS, start + count - s)) for s in range(start, start + count, CHUNK_ROWS)]
+
+
+def load_scaled_data(conn, scale, seed, skew, workers):
+    """Append about scale million generated rows after the fixed sample rows"""
+    cursor = conn.cursor()
+    counts = {table: max(1, int(rows * scale)) for table, rows in SCALE_ROWS.items()}
+    next_id = {
+        table: cursor.execute(f"SELECT coalesce(max(id), 0) + 1 FROM {table}").fetchone()[0]
+        for table in counts
+    }
+    now = datetime.now().replace(microsecond=0)
+    started = time.perf_counter()
+    inserted = 0
+
+    # Products are few; generate them here so orders can use their prices
+    for start in range(next_id['products'], next_id['products'] + counts['products'], CHUNK_ROWS):
+        count = min(CHUNK_ROWS, next_id['products'] + counts['products'] - start)
+        rows = generate_products(start, count, seed, now)
+        cursor.executemany(INSERTS['products'], rows)
+        inserted += len(rows)
+    prices = [0.0] * (next_id['products'] + counts['products'])
+    for product_id, price in cursor.execute("SELECT id, price FROM products"):
+        prices[product_id] = price
+
+    config = {
+        'seed': seed,
+        'skew': skew,
+        'now': now,
+        'prices': prices,
+        'users': next_id['users'] + counts['users'] - 1,
+    }
+    tasks = (
+        chunk_tasks('users', next_id['users'], counts['users'])
+        + chunk_tasks('orders', next_id['orders'], counts['orders'])
+        + chunk_tasks('metrics', next_id['metrics'], counts['metrics'])
+    )
+    uncommitted = 0
+    for chunk in generated_chunks(tasks, workers, config):
+        for table, rows in chunk:
+            cursor.executemany(INSERTS[table], rows)
+            inserted += len(rows)
+            uncommitted += len(rows)
+        if uncommitted >= COMMIT_ROWS:
+            conn.commit()
+            uncommitted = 0
+            elapsed = time.perf_counter() - started
+            print(f"  {inserted:,} rows ({inserted / elapsed:,.0f} rows/s)")
+    conn.commit()
+
+    print("Running ANALYZE")
+    cursor.execute("ANALYZE")
+    elapsed = time.perf_counter() - started
+    print(f"Generated {inserted:,} rows in {elapsed:.1f}s ({inserted / elapsed:,.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the sample SQLite database")
+    parser.add_argument("--output", default="sample.db", help="database file to create")
+    parser.add_argument(
+        "--scale", type=float,
+        help="also generate about SCALE million skewed rows across all tables",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="random seed for --scale")
+    parser.add_argument(
+        "--skew", type=float, default=2.5,
+        help="how strongly orders favour low user and product ids (1 is uniform)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes generating rows in parallel for --scale",
+    )
+    args = parser.parse_args()
+
+    # Define the database path
+    DB_PATH = Path(args.output)
+
+    # Create parent directory if it doesn't exist
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    # Remove existing database if it exists
+    if DB_PATH.exists():
+        print(f"Removing existing database at {DB_PATH}")
+        os.remove(DB_PATH)
+
+    # Connect to database
+    print(f"Creating database at {DB_PATH}")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    if args.scale:
+        for pragma in LOAD_PRAGMAS:
+            cursor.execute(pragma)
+
+    # Create metrics table
+    print("Creating metrics table")
+    cursor.execute('''
+    CREATE TABLE metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        value REAL NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Create users table
+    print("Creating users table")
+    cursor.execute('''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        email TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        last_login DATETIME,
+        is_active BOOLEAN DEFAULT TRUE
+    )
+    ''')
+
+    # Create products table
+    print("Creating products table")
+    cursor.execute('''
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        category TEXT NOT NULL,
+        price REAL NOT NULL,
+        stock INTEGER NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Create orders table
+    print("Creating orders table")
+    cursor.execute('''
+    CREATE TABLE orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        total_amount REAL NOT NULL,
+        status TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+
+    # Create order_items table
+    print("Creating order_items table")
+    cursor.execute('''
+    CREATE TABLE order_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        unit_price REAL NOT NULL,
+        FOREIGN KEY (order_id) REFERENCES orders (id),
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+    ''')
+
+    # Sample metrics data
+    print("Inserting sample metrics data")
+    metrics_data = []
+    current_time = datetime.now()
+
+    # Generate 50 metrics entries with timestamps over the last 24 hours
+    for i in range(50):
+        metrics_data.append((
+            random.choice(['cpu_usage', 'memory_usage', 'disk_usage', 'network_in', 'network_out']),
+            random.uniform(1, 100),
+            (current_time - timedelta(hours=i % 24)).strftime('%Y-%m-%d %H:%M:%S')
+        ))
+
+    cursor.executemany(
+        "INSERT INTO metrics (name, value, timestamp) VALUES (?, ?, ?)",
+        metrics_data
+    )
+
+    # Sample users data
+    print("Inserting sample users data")
+    users_data = [
+        ('john_doe', 'john.doe@example.com', '2023-01-15 12:30:45', '2023-06-20 08:15:30', True),
+        ('jane_smith', 'jane.smith@example.com', '2023-02-20 10:15:20', '2023-06-19 14:20:10', True),
+        ('bob_johnson', 'bob.johnson@example.com', '2023-03-10 09:45:12', '2023-06-15 11:30:45', True),
+        ('alice_williams', 'alice.williams@example.com', '2023-04-05 15:20:30', '2023-06-18 09:10:25', True),
+        ('charlie_brown', 'charlie.brown@example.com', '2023-05-12 14:10:35', '2023-06-10 16:45:15', False)
+    ]
+
+    cursor.executemany(
+        "INSERT INTO users (username, email, created_at, last_login, is_active) VALUES (?, ?, ?, ?, ?)",
+        users_data
+    )
+
+    # Sample products data
+    print("Inserting sample products data")
+    products_data = [
+        ('Laptop', 'Electronics', 1299.99, 10, '2023-01-10 09:00:00', '2023-06-01 10:15:30'),
+        ('Smartphone', 'Electronics', 699.99, 15, '2023-02-15 10:30:00', '2023-06-05 11:20:45'),
+        ('Headphones', 'Electronics', 149.99, 30, '2023-03-20 11:45:00', '2023-06-10 14:30:20'),
+        ('T-shirt', 'Clothing', 19.99, 100, '2023-04-25 13:00:00', '2023-06-15 09:45:10'),
+        ('Jeans', 'Clothing', 49.99, 50, '2023-05-30 14:15:00', '2023-06-20 15:10:35'),
+        ('Coffee Maker', 'Appliances', 89.99, 20, '2023-06-05 15:30:00', '2023-06-25 12:25:40'),
+        ('Blender', 'Appliances', 49.99, 25, '2023-06-10 16:45:00', '2023-06-30 16:40:15'),
+        ('Monitor', 'Electronics', 249.99, 12, '2023-06-15 09:00:00', '2023-07-01 10:15:30')
+    ]
+
+    cursor.executemany(
+        "INSERT INTO products (name, category, price, stock, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+        products_data
+    )
+
+    # Sample orders data
+    print("Inserting sample orders data")
+    orders_data = [
+        (1, 1299.99, 'Completed', '2023-06-01 10:30:45'),
+        (1, 149.99, 'Completed', '2023-06-10 14:15:20'),
+        (2, 749.98, 'Processing', '2023-06-15 09:45:30'),
+        (3, 89.99, 'Shipped', '2023-06-18 11:20:15'),
+        (4, 269.98, 'Pending', '2023-06-20 16:10:25'),
+        (2, 1349.97, 'Completed', '2023-06-22 12:30:40'),
+        (5, 49.99, 'Cancelled', '2023-06-25 10:05:15')
+    ]
+
+    cursor.executemany(
+        "INSERT INTO orders (user_id, total_amount, status, created_at) VALUES (?, ?, ?, ?)",
+        orders_data
+    )
+
+    # Sample order items data
+    print("Inserting sample order items data")
+    order_items_data = [
+        (1, 1, 1, 1299.99),  # Order 1: 1 Laptop
+        (2, 3, 1, 149.99),   # Order 2: 1 Headphones
+        (3, 2, 1, 699.99),   # Order 3: 1 Smartphone
+        (3, 5, 1, 49.99),    # Order 3: 1 Jeans
+        (4, 6, 1, 89.99),    # Order 4: 1 Coffee Maker
+        (5, 8, 1, 249.99),   # Order 5: 1 Monitor
+        (5, 4, 1, 19.99),    # Order 5: 1 T-shirt
+        (6, 1, 1, 1299.99),  # Order 6: 1 Laptop
+        (6, 7, 1, 49.99),    # Order 6: 1 Blender
+        (7, 7, 1, 49.99)     # Order 7: 1 Blender
+    ]
+
+    cursor.executemany(
+        "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
+        order_items_data
+    )
+
+    if args.scale:
+        print(f"Generating scale {args.scale} data with {args.workers} worker(s)")
+        load_scaled_data(conn, args.scale, args.seed, args.skew, args.workers)
+
+    # Create a view for order analytics
+    print("Creating order_analytics view")
+    cursor.execute('''
+    CREATE VIEW order_analytics AS
+    SELECT 
+        o.id as order_id,
+        u.username,
+        p.name as product_name,
+        p.category,
+        oi.quantity,
+        oi.unit_price,
+        (oi.quantity * oi.unit_price) as item_total,
+        o.status,
+        o.created_at
+    FROM orders o
+    JOIN users u ON o.user_id = u.id
+    JOIN order_items oi ON oi.order_id = o.id
+    JOIN products p ON oi.product_id = p.id
+    ''')
+
+    # Commit changes
+    conn.commit()
+
+    print(f"Sample database created at {DB_PATH}")
+    print("Tables created: metrics, users, products, orders, order_items")
+    print("Views created: order_analytics")
+    print(f"Total metrics records: {cursor.execute('SELECT count(*) FROM metrics').fetchone()[0]}")
+    print(f"Total users records: {cursor.execute('SELECT count(*) FROM users').fetchone()[0]}")
+    print(f"Total products records: {cursor.execute('SELECT count(*) FROM products').fetchone()[0]}")
+    print(f"Total orders records: {cursor.execute('SELECT count(*) FROM orders').fetchone()[0]}")
+    print(f"Total order items records: {cursor.execute('SELECT count(*) FROM order_items').fetchone()[0]}")
+    conn.close()
 
-# Sample order items data
-print("Inserting sample order items data")
-order_items_data = [
-    (1, 1, 1, 1299.99),  # Order 1: 1 Laptop
-    (2, 3, 1, 149.99),   # Order 2: 1 Headphones
-    (3, 2, 1, 699.99),   # Order 3: 1 Smartphone
-    (3, 5, 1, 49.99),    # Order 3: 1 Jeans
-    (4, 6, 1, 89.99),    # Order 4: 1 Coffee Maker
-    (5, 8, 1, 249.99),   # Order 5: 1 Monitor
-    (5, 4, 1, 19.99),    # Order 5: 1 T-shirt
-    (6, 1, 1, 1299.99),  # Order 6: 1 Laptop
-    (6, 7, 1, 49.99),    # Order 6: 1 Blender
-    (7, 7, 1, 49.99)     # Order 7: 1 Blender
-]
-
-cursor.executemany(
-    "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
-    order_items_data
-)
 
-# Create a view for order analytics
-print("Creating order_analytics view")
-cursor.execute('''
-CREATE VIEW order_analytics AS
-SELECT 
-    o.id as order_id,
-    u.username,
-    p.name as product_name,
-    p.category,
-    oi.quantity,
-    oi.unit_price,
-    (oi.quantity * oi.unit_price) as item_total,
-    o.status,
-    o.created_at
-FROM orders o
-JOIN users u ON o.user_id = u.id
-JOIN order_items oi ON oi.order_id = o.id
-JOIN products p ON oi.product_id = p.id
-''')
-
-# Commit changes and close connection
-conn.commit()
-conn.close()
-
-print(f"Sample database created at {DB_PATH}")
-print("Tables created: metrics, users, products, orders, order_items")
-print("Views created: order_analytics")
-print(f"Total metrics records: {len(metrics_data)}")
-print(f"Total users records: {len(users_data)}")
-print(f"Total products records: {len(products_data)}")
-print(f"Total orders records: {len(orders_data)}")
-print(f"Total order items records: {len(order_items_data)}") 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
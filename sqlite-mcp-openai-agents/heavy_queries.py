@@ -0,0 +1,209 @@
+import asyncio
+import marshal
+import multiprocessing
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import aiosqlite
+
+from index_advisor import quote_identifier
+from query_budget import CHECK_INTERVAL, BudgetExceeded
+from query_cache import estimate_size
+
+# Seconds a cached table row count is trusted for cost estimates
+ROW_COUNT_TTL = 30.0
+
+# The worker process's own connection, opened by _init_worker
+_connection: Optional[sqlite3.Connection] = None
+
+
+def _init_worker(uri: str, pragmas: Dict[str, Any], attach: Dict[str, str]) -> None:
+    global _connection
+    _connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    for name, value in pragmas.items():
+        _connection.execute(f"PRAGMA {name}={value}")
+    for schema, database in attach.items():
+        _connection.execute(
+            f"ATTACH DATABASE ? AS {quote_identifier(schema)}", (database,)
+        )
+    # The URI is already mode=ro; this also refuses writes to temp tables
+    _connection.execute("PRAGMA query_only=ON")
+
+
+def _execute(
+    sql: str,
+    params: Union[Sequence[Any], Dict[str, Any]],
+    max_rows: int,
+    timeout_ms: int,
+    max_steps: int,
+    max_result_bytes: int,
+) -> Union[bytes, Tuple[str, int]]:
+    """Run one query in a worker; returns marshalled (columns, rows).
+
+    A blown budget comes back as (budget, limit) rather than an exception,
+    since BudgetExceeded cannot be rebuilt from its pickled message.
+    """
+    db = _connection
+    deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+    steps = 0
+    exceeded: List[Tuple[str, int]] = []
+
+    def check() -> int:
+        nonlocal steps
+        steps += CHECK_INTERVAL
+        if max_steps and steps > max_steps:
+            exceeded.append(("vm_steps", max_steps))
+            return 1
+        if deadline is not None and time.monotonic() > deadline:
+            exceeded.append(("time_ms", timeout_ms))
+            return 1
+        return 0
+
+    if deadline is not None or max_steps:
+        db.set_progress_handler(check, CHECK_INTERVAL)
+    try:
+        cursor = db.execute(sql, params)
+        try:
+            columns = (
+                [column[0] for column in cursor.description]
+                if cursor.description
+                else []
+            )
+            rows: List[Tuple[Any, ...]] = []
+            size = 0
+            while len(rows) < max_rows:
+                chunk = cursor.fetchmany(min(256, max_rows - len(rows)))
+                if not chunk:
+                    break
+                rows.extend(chunk)
+                if max_result_bytes:
+                    size += estimate_size([], chunk)
+                    if size > max_result_bytes:
+                        return ("result_bytes", max_result_bytes)
+        finally:
+            cursor.close()
+    except sqlite3.OperationalError:
+        if exceeded:
+            return exceeded[0]
+        raise
+    finally:
+        db.set_progress_handler(None, 0)
+    # marshal handles exactly SQLite's value types and is several times
+    # faster and smaller than pickling the same list of tuples
+    return marshal.dumps((columns, rows))
+
+
+class HeavyQueryPool:
+    """Run expensive read queries in worker processes.
+
+    aiosqlite gives each connection one thread, and converting rows to
+    Python objects holds the GIL, so one large aggregate stalls every other
+    request of the server. Queries judged heavy go to a pool of processes
+    instead; each opens its own read-only connection to ``uri`` and sends
+    results back marshalled. Workers start with ``forkserver`` so they never
+    inherit the server's aiosqlite threads; like any spawned worker they
+    re-import the entry script, which must guard its ``__main__`` code.
+    The time, VM step and result size budgets apply in the workers too.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        workers: int,
+        pragmas: Optional[Dict[str, Any]] = None,
+        heavy_rows: int = 1_000_000,
+        timeout_ms: int = 0,
+        max_steps: int = 0,
+        max_result_bytes: int = 0,
+        attach: Optional[Dict[str, str]] = None,
+    ):
+        if workers < 1:
+            raise ValueError("Worker count must be at least 1")
+        self.uri = uri
+        self.workers = workers
+        self.pragmas = pragmas or {}
+        self.heavy_rows = heavy_rows
+        self.timeout_ms = timeout_ms
+        self.max_steps = max_steps
+        self.max_result_bytes = max_result_bytes
+        # schema name -> database URI attached on every worker connection
+        self.attach = attach or {}
+        self.offloaded = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # table -> (estimated rows, monotonic time read)
+        self._row_counts: Dict[str, Tuple[int, float]] = {}
+
+    async def _table_rows(self, db: aiosqlite.Connection, table: str) -> int:
+        cached = self._row_counts.get(table)
+        if cached is not None and time.monotonic() - cached[1] < ROW_COUNT_TTL:
+            return cached[0]
+        try:
+            # max(rowid) is one b-tree descent, unlike count(*)
+            rows = await db.execute_fetchall(
+                f"SELECT coalesce(max(rowid), 0) FROM {quote_identifier(table)}"
+            )
+            count = rows[0][0]
+        except sqlite3.Error:
+            count = 0  # WITHOUT ROWID tables are assumed small
+        self._row_counts[table] = (count, time.monotonic())
+        return count
+
+    async def is_heavy(self, db: aiosqlite.Connection, scanned: List[str]) -> bool:
+        """Whether full scans of the scanned tables add up to heavy_rows rows"""
+        total = 0
+        for table in scanned:
+            total += await self._table_rows(db, table)
+            if total >= self.heavy_rows:
+                return True
+        return False
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_init_worker,
+                initargs=(self.uri, self.pragmas, self.attach),
+            )
+        return self._executor
+
+    async def start(self) -> None:
+        """Start every worker now instead of on the first heavy query"""
+        loop = asyncio.get_running_loop()
+        executor = self._pool()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, time.sleep, 0.05)
+                for _ in range(self.workers)
+            )
+        )
+
+    async def run(
+        self,
+        sql: str,
+        params: Union[Sequence[Any], Dict[str, Any]],
+        max_rows: int,
+    ) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """Run sql in a worker and return its columns and up to max_rows rows"""
+        self.offloaded += 1
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._pool(),
+            _execute,
+            sql,
+            params,
+            max_rows,
+            self.timeout_ms,
+            self.max_steps,
+            self.max_result_bytes,
+        )
+        if isinstance(result, tuple):
+            raise BudgetExceeded(*result)
+        columns, rows = marshal.loads(result)
+        return columns, rows
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,384 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+from query_cache import normalize_sql
+
+# "SCAN o" on SQLite >= 3.36, "SCAN TABLE orders AS o" before that
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$")
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+# A table or view after FROM, JOIN or a comma, with an optional alias
+_SOURCE = re.compile(
+    r"(?:\bFROM|\bJOIN|,)\s*\"?(\w+)\"?(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE
+)
+_COLUMN_REF = r"((?:\w+\.)?\w+)"
+# column op [column]; the right side is left empty for ? and literals
+_COMPARISON = re.compile(
+    _COLUMN_REF
+    + r"\s*(==|=|<=|>=|<|>|\bIN\b|\bIS\b|\bBETWEEN\b|\bLIKE\b|\bGLOB\b)\s*"
+    + _COLUMN_REF
+    + "?",
+    re.IGNORECASE,
+)
+_IDENTIFIER = re.compile(r"(?<![\w.])" + _COLUMN_REF + r"(?![\w(])")
+# SELECT * or alias.*, but not count(*) or a multiplication
+_STAR = re.compile(r"(?:(\w+)\.)?\*\s*(?=,|\bFROM\b)", re.IGNORECASE)
+_EQUALITY = frozenset(("=", "==", "IN", "IS"))
+_KEYWORDS = frozenset(
+    "cross except full group having inner intersect join left limit natural "
+    "on order outer right union using where window".split()
+)
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def parse_plan(rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Turn EXPLAIN QUERY PLAN rows (id, parent, notused, detail) into a tree"""
+    nodes: Dict[int, Dict[str, Any]] = {}
+    roots: List[Dict[str, Any]] = []
+    for node_id, parent, _, detail in rows:
+        node = {"detail": detail, "children": []}
+        nodes[node_id] = node
+        siblings = nodes[parent]["children"] if parent in nodes else roots
+        siblings.append(node)
+    return roots
+
+
+def _plan_details(plan: List[Dict[str, Any]]) -> List[str]:
+    details = []
+    for node in plan:
+        details.append(node["detail"])
+        details.extend(_plan_details(node["children"]))
+    return details
+
+
+class IndexAdvisor:
+    """Suggest indexes for tables that executed queries keep scanning.
+
+    Each distinct statement is explained once. A ``SCAN`` step on a table
+    that the statement filters or joins on becomes a candidate index: the
+    equality columns, then one range column, then (when few enough) the
+    other columns the statement reads from that table so the index covers
+    it. Candidates seen in at least ``min_scans`` executions are suggested.
+    """
+
+    def __init__(self, min_scans: int = 3, max_columns: int = 6, max_plans: int = 1000):
+        self.min_scans = min_scans
+        self.max_columns = max_columns
+        self.max_plans = max_plans
+        self.applied: List[Dict[str, Any]] = []
+        # normalized SQL -> candidate index names found in its plan
+        self._plans: "OrderedDict[str, List[str]]" = OrderedDict()
+        # index name -> candidate with execution counters
+        self._candidates: Dict[str, Dict[str, Any]] = {}
+        self._schema_version: Optional[int] = None
+        self._schema_checked = 0.0
+        self._tables: Dict[str, List[Tuple[str, bool]]] = {}
+        self._views: Dict[str, str] = {}
+
+    async def _load_schema(self, db: aiosqlite.Connection, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._schema_checked < 1.0:
+            return
+        version = (await db.execute_fetchall("PRAGMA schema_version"))[0][0]
+        if version == self._schema_version:
+            self._schema_checked = now
+            return
+        rows = await db.execute_fetchall(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'"
+        )
+        # Built aside and swapped in at the end, so concurrent callers never
+        # see a half-loaded schema
+        tables: Dict[str, List[Tuple[str, bool]]] = {}
+        views: Dict[str, str] = {}
+        for row in rows:
+            if row[0] == "view":
+                views[row[1].lower()] = row[2] or ""
+                continue
+            columns = await db.execute_fetchall(
+                f"PRAGMA table_info({quote_identifier(row[1])})"
+            )
+            rowid = [c["name"] for c in columns if c["pk"]]
+            rowid_alias = (
+                rowid[0]
+                if len(rowid) == 1
+                and any(
+                    c["name"] == rowid[0] and c["type"].upper() == "INTEGER"
+                    for c in columns
+                )
+                else None
+            )
+            # (column, is the rowid alias and therefore part of every index)
+            tables[row[1].lower()] = [
+                (c["name"], c["name"] == rowid_alias) for c in columns
+            ]
+        self._tables = tables
+        self._views = views
+        self._schema_version = version
+        self._schema_checked = now
+        self._plans.clear()
+
+    async def warm(self, db: aiosqlite.Connection) -> None:
+        """Load the schema now rather than on the first recorded query"""
+        await self._load_schema(db, force=True)
+
+    def _statement_text(self, sql: str) -> str:
+        """The statement plus the definitions of the views it reads"""
+        text = _COMMENT.sub(" ", _LITERAL.sub("?", sql))
+        seen = set()
+        pending = [text]
+        while pending:
+            for name, _ in _SOURCE.findall(pending.pop()):
+                name = name.lower()
+                if name in self._views and name not in seen:
+                    seen.add(name)
+                    view_sql = _LITERAL.sub("?", self._views[name])
+                    pending.append(view_sql)
+                    text += "\n" + view_sql
+        return text
+
+    def _aliases(self, text: str) -> Dict[str, str]:
+        """Table names and aliases in text, mapped to the table they name"""
+        aliases: Dict[str, str] = {}
+        for name, alias in _SOURCE.findall(text):
+            if name.lower() not in self._tables:
+                continue
+            aliases[name.lower()] = name.lower()
+            if alias and alias.lower() not in _KEYWORDS:
+                aliases[alias.lower()] = name.lower()
+        return aliases
+
+    def _candidates_for(
+        self, sql: str, plan: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        text = self._statement_text(sql)
+        aliases = self._aliases(text)
+        tables = set(aliases.values())
+
+        def resolve(ref: str) -> Optional[Tuple[str, str]]:
+            qualifier, _, column = ref.lower().rpartition(".")
+            if qualifier:
+                owners = [aliases[qualifier]] if qualifier in aliases else []
+            else:
+                owners = list(tables)
+            owners = [
+                t
+                for t in owners
+                if any(c.lower() == column for c, _ in self._tables[t])
+            ]
+            if len(owners) != 1:
+                return None
+            for name, _ in self._tables[owners[0]]:
+                if name.lower() == column:
+                    return owners[0], name
+            return None
+
+        # Per table: equality filters against constants, join columns and
+        # range filters, in that order of usefulness as leading index columns
+        filters: Dict[str, List[str]] = {}
+        joins: Dict[str, List[str]] = {}
+        ranges: Dict[str, List[str]] = {}
+
+        def add(target: Dict[str, List[str]], table: str, column: str) -> None:
+            columns = target.setdefault(table, [])
+            if column not in columns:
+                columns.append(column)
+
+        for left_ref, op, right_ref in _COMPARISON.findall(text):
+            left = resolve(left_ref)
+            right = resolve(right_ref) if right_ref else None
+            equality = op.upper() in _EQUALITY
+            if left and right:
+                if equality and left[0] != right[0]:
+                    add(joins, *left)
+                    add(joins, *right)
+            elif left:
+                add(filters if equality else ranges, *left)
+
+        referenced: Dict[str, List[str]] = {}
+        for ref in _IDENTIFIER.findall(text):
+            resolved = resolve(ref)
+            if resolved is not None and resolved[1] not in referenced.setdefault(
+                resolved[0], []
+            ):
+                referenced[resolved[0]].append(resolved[1])
+        uncoverable = set()
+        for qualifier in _STAR.findall(text):
+            if not qualifier:
+                uncoverable = set(tables)
+            elif qualifier.lower() in aliases:
+                uncoverable.add(aliases[qualifier.lower()])
+
+        candidates = []
+        for detail in _plan_details(plan):
+            match = _SCAN.match(detail)
+            if not match or "USING" in match.group(3):
+                continue
+            table = aliases.get((match.group(2) or match.group(1)).lower())
+            if table is None:
+                continue
+            rowid = {c for c, is_rowid in self._tables[table] if is_rowid}
+            key_columns = list(
+                dict.fromkeys(filters.get(table, []) + joins.get(table, []))
+            )
+            key_columns += [c for c in ranges.get(table, []) if c not in key_columns][
+                :1
+            ]
+            key_columns = [c for c in key_columns if c not in rowid]
+            if not key_columns:
+                continue
+            columns = key_columns + [
+                c
+                for c in referenced.get(table, [])
+                if c not in key_columns and c not in rowid
+            ]
+            covering = table not in uncoverable and len(columns) <= self.max_columns
+            if not covering:
+                columns = key_columns[: self.max_columns]
+            name = "idx_advisor_" + "_".join([table] + [c.lower() for c in columns])
+            candidates.append(
+                {
+                    "index": name,
+                    "table": table,
+                    "columns": columns,
+                    "covering": covering,
+                    "create_sql": (
+                        f"CREATE INDEX IF NOT EXISTS {quote_identifier(name)} "
+                        f"ON {quote_identifier(table)} "
+                        f"({', '.join(quote_identifier(c) for c in columns)})"
+                    ),
+                }
+            )
+        return candidates
+
+    async def explain(
+        self, db: aiosqlite.Connection, sql: str, params: Any = ()
+    ) -> Dict[str, Any]:
+        """Return the plan tree of sql and the indexes that would avoid its scans"""
+        await self._load_schema(db, force=True)
+        rows = await db.execute_fetchall(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = parse_plan(rows)
+        return {"plan": plan, "index_candidates": self._candidates_for(sql, plan)}
+
+    async def scanned_tables(
+        self, db: aiosqlite.Connection, sql: str, params: Any = ()
+    ) -> List[str]:
+        """Tables the plan of sql reads in full, by table or covering index"""
+        await self._load_schema(db)
+        rows = await db.execute_fetchall(f"EXPLAIN QUERY PLAN {sql}", params)
+        aliases = self._aliases(self._statement_text(sql))
+        tables = []
+        for detail in _plan_details(parse_plan(rows)):
+            match = _SCAN.match(detail)
+            if match:
+                table = aliases.get((match.group(2) or match.group(1)).lower())
+                if table is not None:
+                    tables.append(table)
+        return tables
+
+    async def record(
+        self, db: aiosqlite.Connection, sql: str, params: Any, elapsed_ms: float
+    ) -> None:
+        """Count one execution of sql towards the candidates in its plan"""
+        await self._load_schema(db)
+        key = normalize_sql(sql)
+        names = self._plans.get(key)
+        if names is None:
+            names = []
+            for candidate in (await self.explain(db, sql, params))["index_candidates"]:
+                stats = self._candidates.setdefault(
+                    candidate["index"], {**candidate, "scans": 0, "total_ms": 0.0}
+                )
+                names.append(stats["index"])
+            self._plans[key] = names
+            if len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        else:
+            self._plans.move_to_end(key)
+        for name in names:
+            stats = self._candidates[name]
+            stats["scans"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["example"] = (sql, params)
+
+    def suggestions(self) -> List[Dict[str, Any]]:
+        """Candidates scanned often enough to be worth an index"""
+        applied = {entry["index"] for entry in self.applied}
+        result = []
+        for stats in self._candidates.values():
+            if stats["scans"] < self.min_scans or stats["index"] in applied:
+                continue
+            suggestion = {
+                k: v for k, v in stats.items() if k not in ("example", "total_ms")
+            }
+            suggestion["avg_ms"] = round(stats["total_ms"] / stats["scans"], 3)
+            suggestion["example_query"] = stats["example"][0]
+            result.append(suggestion)
+        result.sort(key=lambda s: s["scans"] * s["avg_ms"], reverse=True)
+        return result
+
+    async def _time(self, db: aiosqlite.Connection, sql: str, params: Any) -> float:
+        began = time.perf_counter()
+        cursor = await db.execute(sql, params)
+        try:
+            while await cursor.fetchmany(1000):
+                pass
+        finally:
+            await cursor.close()
+        return round((time.perf_counter() - began) * 1000, 3)
+
+    async def apply(self, db: aiosqlite.Connection, name: str) -> Dict[str, Any]:
+        """Create a suggested index, keeping it only if the planner uses it.
+
+        The example query is timed before and after; the index is created
+        inside a transaction that is rolled back when the new plan ignores it.
+        A failed attempt is recorded too, so the index is not tried again.
+        """
+        stats = self._candidates[name]
+        sql, params = stats["example"]
+        try:
+            before_ms = await self._time(db, sql, params)
+            await db.execute("BEGIN")
+            try:
+                await db.execute(stats["create_sql"])
+                plan = parse_plan(
+                    await db.execute_fetchall(f"EXPLAIN QUERY PLAN {sql}", params)
+                )
+                used = any(name in detail for detail in _plan_details(plan))
+                after_ms = await self._time(db, sql, params) if used else None
+            except Exception:
+                await db.rollback()
+                raise
+        except Exception as e:
+            self.applied.append(
+                {
+                    "index": name,
+                    "create_sql": stats["create_sql"],
+                    "created": False,
+                    "error": str(e),
+                }
+            )
+            raise
+        if used:
+            await db.commit()
+        else:
+            await db.rollback()
+        result = {
+            "index": name,
+            "create_sql": stats["create_sql"],
+            "created": used,
+            "before_ms": before_ms,
+            "after_ms": after_ms,
+            "plan_after": plan,
+        }
+        self.applied.append(result)
+        self._schema_version = None
+        self._schema_checked = 0.0
+        return result
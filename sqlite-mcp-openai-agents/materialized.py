@@ -0,0 +1,585 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+from db_pool import sqlite_uri
+from index_advisor import quote_identifier
+from shards import MergePlan, plan_merge
+
+logger = logging.getLogger(__name__)
+
+# Schema name the sidecar database is attached under on query connections
+SCHEMA = "mv"
+
+_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+_META_COLUMNS = (
+    "name",
+    "sql",
+    "source",
+    "watermark_column",
+    "watermark",
+    "mode",
+    "rows",
+    "refreshed_at",
+    "full_refresh_at",
+    "refresh_ms",
+)
+_META = """
+CREATE TABLE IF NOT EXISTS _mv_meta (
+    name TEXT PRIMARY KEY,
+    sql TEXT NOT NULL,
+    source TEXT,
+    watermark_column TEXT,
+    watermark,
+    mode TEXT NOT NULL,
+    rows INTEGER,
+    refreshed_at REAL,
+    full_refresh_at REAL,
+    refresh_ms REAL
+)
+"""
+
+
+def _literal(value: Any) -> str:
+    """value as an SQL literal, for the delta view that cannot bind parameters"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, bytes):
+        return f"X'{value.hex()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class ViewDefinition:
+    """One summary table: its name, defining SELECT and how to refresh it.
+
+    A definition whose SELECT the shard merger understands (plain,
+    grouped or DISTINCT selects, with count, sum, total, min, max and avg)
+    and that names a ``source`` table declared ``append_only`` is refreshed
+    incrementally: only source rows past the watermark are aggregated and
+    then merged into the stored groups. Anything else is recomputed in
+    full, since rows updated or deleted below the watermark would never
+    reach the summary otherwise.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        sql: str,
+        source: Optional[str] = None,
+        watermark: str = "rowid",
+        full_every_s: float = 0,
+        description: Optional[str] = None,
+        append_only: bool = False,
+    ):
+        if not _NAME.match(name or "") or name.lower().startswith(("sqlite_", "_mv_")):
+            raise ValueError(f"Invalid materialized view name: {name!r}")
+        self.name = name
+        self.sql = sql.strip().rstrip(";").strip()
+        self.source = source
+        self.watermark = watermark
+        self.full_every_s = full_every_s
+        self.description = description
+        self.append_only = append_only
+        self.table = f"_mv_{name}"
+        self.plan: Optional[MergePlan] = None
+        self.reason: Optional[str] = None
+        try:
+            plan = plan_merge(self.sql)
+        except ValueError as e:
+            self.reason = str(e)
+        else:
+            if source is None:
+                self.reason = "no source table to take new rows from"
+            elif plan.limit is not None or plan.offset:
+                self.reason = "LIMIT and OFFSET need the whole result"
+            elif not append_only:
+                self.reason = (
+                    f"{source} is not declared append_only, so updated and "
+                    "deleted rows need a full refresh"
+                )
+            else:
+                self.plan = plan
+        self.mode = "incremental" if self.plan is not None else "full"
+
+    @property
+    def query(self) -> str:
+        return f"SELECT * FROM {SCHEMA}.{self.name}"
+
+
+def load_definitions(path: str) -> List[ViewDefinition]:
+    """Read view definitions from a JSON list of objects"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{path} must hold a JSON list of view definitions")
+    views = [ViewDefinition(**entry) for entry in entries]
+    names = [view.name.lower() for view in views]
+    if len(set(names)) != len(names):
+        raise ValueError(f"{path} defines a materialized view twice")
+    return views
+
+
+class MaterializedViews:
+    """Summary tables kept up to date next to the database.
+
+    Results live in a sidecar database, so the served database can stay
+    read-only; query connections attach it read-only as ``mv`` and read
+    each summary as ``mv.<name>``. One connection of its own opens the
+    sidecar for writing and attaches the source database read-only as
+    ``src``. Status reads go through a read-only connection of their own,
+    so they never wait for a refresh.
+
+    An incremental refresh reads the source's current watermark, the
+    largest rowid or timestamp, then runs the definition with the source
+    table shadowed by a temporary view of only the rows past the previous
+    watermark. The partial result (avg kept as sum plus count) is merged
+    into the stored groups. Only sources declared append-only are merged
+    this way; should rows be updated or deleted anyway, they are picked
+    up by a full refresh, which happens when the definition changes,
+    every ``full_every_s`` seconds if set, or on request. All of it runs in one transaction, so readers see a
+    summary and its watermark change together.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        source_path: str,
+        views: Sequence[ViewDefinition],
+        refresh_interval: float = 60.0,
+        on_commit: Optional[Callable[[], None]] = None,
+    ):
+        self.path = path
+        self.source_path = source_path
+        self.views = {view.name: view for view in views}
+        self.refresh_interval = refresh_interval
+        self.on_commit = on_commit
+        self.refreshes = 0
+        self._db: Optional[aiosqlite.Connection] = None
+        # Source connection for status reads, which must not queue behind
+        # a refresh on self._db
+        self._reader: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._columns: Dict[str, List[str]] = {}
+        self._errors: Dict[str, str] = {}
+        # name -> self._reader's source data_version when its last
+        # full-mode refresh began
+        self._versions: Dict[str, int] = {}
+
+    @property
+    def attachment(self) -> Dict[str, str]:
+        """Schema name -> URI that query connections attach"""
+        return {SCHEMA: sqlite_uri(self.path, read_only=True)}
+
+    async def attach(self, db: aiosqlite.Connection) -> None:
+        """on_connect hook: attach the sidecar read-only as mv"""
+        if os.path.exists(self.path):
+            await db.execute_fetchall(
+                f"ATTACH DATABASE ? AS {SCHEMA}", (self.attachment[SCHEMA],)
+            )
+
+    def tables(self) -> List[str]:
+        """Qualified names of the views built so far"""
+        return [
+            f"{SCHEMA}.{name}"
+            for name in self.views
+            if self._meta.get(name, {}).get("rows") is not None
+        ]
+
+    async def open(self) -> None:
+        """Create the sidecar and drop summaries no longer defined"""
+        db = await aiosqlite.connect(
+            sqlite_uri(self.path), uri=True, isolation_level=None
+        )
+        self._db = db
+        # Readers on other connections keep going while a refresh commits
+        await db.execute_fetchall("PRAGMA journal_mode=WAL")
+        await db.execute_fetchall(
+            "ATTACH DATABASE ? AS src",
+            (sqlite_uri(self.source_path, read_only=True),),
+        )
+        await db.execute_fetchall(_META)
+        tables = {
+            row[0].lower()
+            for row in await db.execute_fetchall(
+                "SELECT name FROM src.sqlite_master WHERE type IN ('table', 'view')"
+            )
+        }
+        for name in self.views:
+            # Inside the sidecar the summary would shadow the source table
+            if name.lower() in tables:
+                raise ValueError(
+                    f"Materialized view {name} has the name of a source table"
+                )
+        for row in await db.execute_fetchall("SELECT * FROM _mv_meta"):
+            meta = dict(zip(_META_COLUMNS, row))
+            if meta["name"] in self.views:
+                self._meta[meta["name"]] = meta
+                continue
+            await self._drop(meta["name"])
+            await db.execute_fetchall(
+                "DELETE FROM _mv_meta WHERE name = ?", (meta["name"],)
+            )
+            logger.info(f"Dropped materialized view {meta['name']}, no longer defined")
+        for name in self._meta:
+            self._columns[name] = await self._view_columns(name)
+        self._reader = await aiosqlite.connect(":memory:")
+        await self._reader.execute_fetchall(
+            "ATTACH DATABASE ? AS src",
+            (sqlite_uri(self.source_path, read_only=True),),
+        )
+
+    async def _drop(self, name: str) -> None:
+        await self._db.execute_fetchall(
+            f"DROP VIEW IF EXISTS main.{quote_identifier(name)}"
+        )
+        await self._db.execute_fetchall(
+            f"DROP TABLE IF EXISTS main.{quote_identifier('_mv_' + name)}"
+        )
+
+    async def _view_columns(self, name: str) -> List[str]:
+        rows = await self._db.execute_fetchall(
+            f"PRAGMA main.table_info({quote_identifier(name)})"
+        )
+        return [row[1] for row in rows]
+
+    async def _source_watermark(
+        self, view: ViewDefinition, db: Optional[aiosqlite.Connection] = None
+    ) -> Any:
+        rows = await (db or self._db).execute_fetchall(
+            f"SELECT max({quote_identifier(view.watermark)}) "
+            f"FROM src.{quote_identifier(view.source)}"
+        )
+        return rows[0][0]
+
+    async def _data_version(self) -> int:
+        # Only comparable between calls on the same connection
+        rows = await self._reader.execute_fetchall("PRAGMA src.data_version")
+        return rows[0][0]
+
+    def _needs_full(self, view: ViewDefinition) -> bool:
+        meta = self._meta.get(view.name)
+        if meta is None or view.mode == "full":
+            return True
+        if (meta["sql"], meta["source"], meta["watermark_column"]) != (
+            view.sql,
+            view.source,
+            view.watermark,
+        ):
+            return True
+        return bool(
+            view.full_every_s
+            and time.time() - (meta["full_refresh_at"] or 0) >= view.full_every_s
+        )
+
+    async def refresh(
+        self, names: Optional[Sequence[str]] = None, full: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Bring the named views (all by default) up to date; returns their status"""
+        views = self._select(names)
+        for view in views:
+            async with self._lock:
+                try:
+                    await self._refresh(view, full)
+                    self._errors.pop(view.name, None)
+                except Exception as e:
+                    if self._db.in_transaction:
+                        await self._db.execute_fetchall("ROLLBACK")
+                    self._errors[view.name] = str(e)
+                    logger.warning(
+                        f"Refreshing materialized view {view.name} failed: {e}"
+                    )
+        return await self.status([view.name for view in views])
+
+    def _select(self, names: Optional[Sequence[str]]) -> List[ViewDefinition]:
+        if not names:
+            return list(self.views.values())
+        by_name = {name.lower(): view for name, view in self.views.items()}
+        views = []
+        for name in names:
+            key = name.lower()
+            if key.startswith(f"{SCHEMA}."):
+                key = key[len(SCHEMA) + 1 :]
+            if key not in by_name:
+                raise ValueError(f"Unknown materialized view: {name}")
+            if by_name[key] not in views:
+                views.append(by_name[key])
+        return views
+
+    async def _refresh(self, view: ViewDefinition, full: bool) -> None:
+        db = self._db
+        version = await self._data_version() if view.mode == "full" else None
+        if not full and view.mode == "full" and view.name in self._meta:
+            # Recomputing is only worth it once the source has changed
+            if self._versions.get(view.name) == version:
+                await self._save_meta(view, changed=False)
+                return
+        full = full or self._needs_full(view)
+        began = time.perf_counter()
+        await db.execute_fetchall("BEGIN IMMEDIATE")
+        if full:
+            changed, watermark = await self._rebuild(view)
+        else:
+            changed, watermark = await self._apply_delta(view)
+        if version is not None:
+            # Taken before the rebuild, so a write during it shows as stale
+            self._versions[view.name] = version
+        await self._save_meta(
+            view,
+            changed=changed,
+            full=full,
+            watermark=watermark,
+            refresh_ms=round((time.perf_counter() - began) * 1000, 2),
+        )
+        await db.execute_fetchall("COMMIT")
+        self.refreshes += 1
+        if changed and self.on_commit is not None:
+            self.on_commit()
+        if full:
+            self._columns[view.name] = await self._view_columns(view.name)
+
+    async def _rebuild(self, view: ViewDefinition) -> Tuple[bool, Any]:
+        """Recompute a view from the whole source"""
+        db = self._db
+        table = quote_identifier(view.table)
+        plan = view.plan
+        watermark = await self._source_watermark(view) if plan is not None else None
+        await self._drop(view.name)
+        await db.execute_fetchall(
+            f"CREATE TABLE main.{table} AS {plan.sql if plan else view.sql}"
+        )
+        columns = [
+            row[1]
+            for row in await db.execute_fetchall(f"PRAGMA main.table_info({table})")
+        ]
+        select, order = "*", ""
+        if plan is not None and plan.grouped and any(plan.aggregates):
+            if plan.keys:
+                # Merging a delta looks up each of its groups
+                await db.execute_fetchall(
+                    f"CREATE INDEX main.{quote_identifier(view.table + '_key')} "
+                    f"ON {table}("
+                    + ", ".join(quote_identifier(columns[i]) for i in plan.keys)
+                    + ")"
+                )
+            visible = []
+            for i, column in enumerate(columns[: len(plan.items)]):
+                name = quote_identifier(column)
+                if i in plan.avg_counts:
+                    count = quote_identifier(plan.avg_counts[i])
+                    visible.append(f"{name} * 1.0 / nullif({count}, 0) AS {name}")
+                else:
+                    visible.append(name)
+            select = ", ".join(visible)
+        if plan is not None:
+            order = plan.order_by(columns)
+        # Unqualified, so the view reads the table of its own database
+        # wherever the sidecar is attached
+        await db.execute_fetchall(
+            f"CREATE VIEW main.{quote_identifier(view.name)} AS "
+            f"SELECT {select} FROM {table} {order}".rstrip()
+        )
+        return True, watermark
+
+    async def _apply_delta(self, view: ViewDefinition) -> Tuple[bool, Any]:
+        """Merge the source rows past the watermark into a view"""
+        db = self._db
+        plan = view.plan
+        low = self._meta[view.name]["watermark"]
+        high = await self._source_watermark(view)
+        if high is None or (low is not None and high <= low):
+            return False, low
+        column = quote_identifier(view.watermark)
+        condition = f"{column} <= {_literal(high)}"
+        if low is not None:
+            condition = f"{column} > {_literal(low)} AND {condition}"
+        source = quote_identifier(view.source)
+        # The temp schema is searched first, so the definition's references
+        # to the source table now only see the new rows
+        await db.execute_fetchall(
+            f"CREATE TEMP VIEW {source} AS "
+            f"SELECT * FROM src.{source} WHERE {condition}"
+        )
+        try:
+            cursor = await db.execute(plan.sql)
+            columns = [c[0] for c in cursor.description]
+            delta = await cursor.fetchall()
+            await cursor.close()
+        finally:
+            await db.execute_fetchall(f"DROP VIEW temp.{source}")
+
+        table = f"main.{quote_identifier(view.table)}"
+        names = ", ".join(quote_identifier(c) for c in columns)
+        marks = ", ".join("?" for _ in columns)
+        insert = f"INSERT INTO {table} ({names}) VALUES ({marks})"
+        if not plan.grouped:
+            await db.executemany(insert, delta)
+        else:
+            keys = plan.keys if plan.keys is not None else range(len(columns))
+            match = " AND ".join(f"{quote_identifier(columns[i])} IS ?" for i in keys)
+            lookup = f"SELECT rowid, * FROM {table} WHERE {match or 1} LIMIT 1"
+            update = (
+                f"UPDATE {table} SET "
+                + ", ".join(f"{quote_identifier(c)} = ?" for c in columns)
+                + " WHERE rowid = ?"
+            )
+            for row in delta:
+                found = await db.execute_fetchall(lookup, [row[i] for i in keys])
+                if not found:
+                    await db.execute_fetchall(insert, row)
+                elif plan.keys is not None:
+                    old = found[0]
+                    merged = plan.combine(columns, [[old[1:]], [row]])[0]
+                    await db.execute_fetchall(update, [*merged, old[0]])
+        return bool(delta), high
+
+    async def _save_meta(
+        self,
+        view: ViewDefinition,
+        changed: bool,
+        full: bool = False,
+        watermark: Any = None,
+        refresh_ms: Optional[float] = None,
+    ) -> None:
+        now = time.time()
+        meta = dict(self._meta.get(view.name) or {})
+        meta.update(
+            name=view.name,
+            sql=view.sql,
+            source=view.source,
+            watermark_column=view.watermark if view.plan is not None else None,
+            mode=view.mode,
+            refreshed_at=now,
+        )
+        if refresh_ms is not None:
+            meta["watermark"] = watermark
+            meta["refresh_ms"] = refresh_ms
+        if full:
+            meta["full_refresh_at"] = now
+        if changed:
+            rows = await self._db.execute_fetchall(
+                f"SELECT count(*) FROM main.{quote_identifier(view.table)}"
+            )
+            meta["rows"] = rows[0][0]
+        meta = {name: meta.get(name) for name in _META_COLUMNS}
+        await self._db.execute_fetchall(
+            f"INSERT OR REPLACE INTO _mv_meta VALUES ({', '.join('?' * len(meta))})",
+            list(meta.values()),
+        )
+        self._meta[view.name] = meta
+
+    async def status(
+        self, names: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """How fresh each view is, and how far its source has moved on.
+
+        Reads the last committed state, even while a refresh is running.
+        """
+        views = self._select(names)
+        now = time.time()
+        statuses = []
+        version = await self._data_version()
+        for view in views:
+            meta = self._meta.get(view.name) or {}
+            refreshed = meta.get("refreshed_at")
+            status: Dict[str, Any] = {
+                "name": view.name,
+                "query": view.query,
+                "mode": view.mode,
+                "source": view.source,
+                "rows": meta.get("rows"),
+                "refreshed_at": (
+                    time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(refreshed))
+                    if refreshed
+                    else None
+                ),
+                "age_s": round(now - refreshed, 1) if refreshed else None,
+                "refresh_ms": meta.get("refresh_ms"),
+            }
+            if view.mode == "full":
+                status["reason"] = view.reason
+                status["stale"] = self._versions.get(view.name) != version
+            else:
+                high = await self._source_watermark(view, self._reader)
+                low = meta.get("watermark")
+                status.update(
+                    watermark_column=view.watermark,
+                    watermark=low,
+                    source_watermark=high,
+                    stale=high is not None and (low is None or high > low),
+                )
+                if view.watermark.lower() == "rowid":
+                    status["behind_rows"] = max(0, (high or 0) - (low or 0))
+            if view.name in self._errors:
+                status["error"] = self._errors[view.name]
+            statuses.append(status)
+        return statuses
+
+    async def render(self, names: Optional[Sequence[str]] = None) -> str:
+        """Describe the built views for a schema prompt, staleness included"""
+        statuses = [s for s in await self.status(names) if s["rows"] is not None]
+        if not statuses:
+            return ""
+        lines = [
+            "MATERIALIZED VIEWS: precomputed summaries of the base tables. "
+            f"Query them as {SCHEMA}.<name> instead of recomputing the same "
+            "aggregates from the base tables."
+        ]
+        for status in statuses:
+            view = self.views[status["name"]]
+            if status["stale"]:
+                freshness = (
+                    f"{status['behind_rows']} source rows behind"
+                    if status.get("behind_rows")
+                    else "source changed since"
+                )
+            else:
+                freshness = "up to date"
+            lines.append(
+                f"{SCHEMA}.{view.name} ({status['rows']} rows; refreshed "
+                f"{status['age_s']:.0f}s ago, {freshness}): "
+                + ", ".join(self._columns.get(view.name, []))
+            )
+            if view.description:
+                lines.append(f"  -- {view.description}")
+            lines.append(f"  AS {' '.join(view.sql.split())}")
+        return "\n".join(lines)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Refreshing materialized views failed")
+            if self.refresh_interval <= 0:
+                return
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> asyncio.Task:
+        """Refresh now in the background, then every refresh_interval seconds"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+        return self._task
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        for db in (self._db, self._reader):
+            if db is not None:
+                await db.close()
+        self._db = self._reader = None
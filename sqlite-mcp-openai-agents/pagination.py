@@ -0,0 +1,67 @@
+import base64
+import hashlib
+import json
+import re
+from typing import Any
+
+from shards import _tokenize
+
+# Statements that produce rows and can take a LIMIT
+_PAGEABLE = re.compile(r"^\s*(select|with|values)\b", re.IGNORECASE)
+
+
+def _query_hash(query: str, params: Any = None) -> str:
+    # The bound values are part of what a page continues, not just the SQL
+    bound = json.dumps(params, sort_keys=True, default=repr)
+    text = f"{query.strip()}\0{bound}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def paginated_sql(query: str, named: bool = False) -> str:
+    """Page a read query so SQLite itself skips to the requested page.
+
+    The returned statement takes two extra parameters after the query's
+    own: positional ``LIMIT ? OFFSET ?``, or ``:_page_limit`` and
+    ``:_page_offset`` when the query uses named parameters. They are
+    appended to the query itself so its result columns keep their names;
+    only a bare ``VALUES`` or a query with its own ``LIMIT`` is wrapped in
+    a sub-select, where SQLite renames duplicate columns (``id, id``
+    becomes ``id, id:1``).
+    Pages are only stable if the query has an ``ORDER BY``.
+    """
+    query = query.strip().rstrip(";").strip()
+    if not _PAGEABLE.match(query):
+        raise ValueError("Pagination is only supported for SELECT queries")
+    if named:
+        page = "LIMIT :_page_limit OFFSET :_page_offset"
+    else:
+        page = "LIMIT ? OFFSET ?"
+    tokens = _tokenize(query)
+    while tokens[-1].text == ";":
+        tokens.pop()
+    if tokens[0].key == "values" or any(
+        t.depth == 0 and t.key == "limit" for t in tokens
+    ):
+        return f"SELECT * FROM ({query}) {page}"
+    # Cut trailing comments and semicolons so they cannot swallow the clause
+    return f"{query[:tokens[-1].end]} {page}"
+
+
+def encode_page_token(query: str, offset: int, params: Any = None) -> str:
+    """Build an opaque continuation token for the page starting at offset"""
+    payload = json.dumps({"q": _query_hash(query, params), "o": offset}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_page_token(token: str, query: str, params: Any = None) -> int:
+    """Return the offset stored in a continuation token issued for query
+    with the same params"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        offset = int(payload["o"])
+        query_hash = payload["q"]
+    except Exception:
+        raise ValueError("Invalid continuation token")
+    if query_hash != _query_hash(query, params) or offset < 0:
+        raise ValueError("Continuation token does not belong to this query")
+    return offset
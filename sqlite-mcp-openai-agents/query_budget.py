@@ -0,0 +1,138 @@
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiosqlite
+
+from query_cache import estimate_size
+
+# How many SQLite VM instructions run between progress handler calls
+CHECK_INTERVAL = 1000
+
+NARROW_QUERY_HINT = (
+    "Narrow the query: add WHERE filters or a LIMIT, avoid unconstrained joins, "
+    "or aggregate instead of returning raw rows."
+)
+
+
+class BudgetExceeded(Exception):
+    """Raised when a query runs past one of its budgets"""
+
+    def __init__(self, budget: str, limit: Any):
+        super().__init__(f"Query exceeded its {budget} budget ({limit})")
+        self.budget = budget
+        self.limit = limit
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "error": str(self),
+            "budget": self.budget,
+            "limit": self.limit,
+            "hint": NARROW_QUERY_HINT,
+        }
+
+
+class _Budget:
+    """Limits for the statement currently running on one connection.
+
+    ``check`` is SQLite's progress handler and runs on the connection's
+    worker thread; returning non-zero makes SQLite interrupt the statement.
+    """
+
+    def __init__(self):
+        self.deadline: Optional[float] = None
+        self.timeout_ms = 0
+        self.max_steps: Optional[int] = None
+        self.steps = 0
+        self.exceeded: Optional[BudgetExceeded] = None
+        self.installed = False
+
+    def check(self) -> int:
+        self.steps += CHECK_INTERVAL
+        if self.max_steps and self.steps > self.max_steps:
+            self.exceeded = BudgetExceeded("vm_steps", self.max_steps)
+            return 1
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.exceeded = BudgetExceeded("time_ms", self.timeout_ms)
+            return 1
+        return 0
+
+
+class QueryBudgets:
+    """Enforce time, VM step and result size budgets inside SQLite"""
+
+    def __init__(
+        self,
+        timeout_ms: int = 0,
+        max_steps: int = 0,
+        max_result_bytes: int = 0,
+    ):
+        self.timeout_ms = timeout_ms
+        self.max_steps = max_steps
+        self.max_result_bytes = max_result_bytes
+        self._budgets: Dict[int, _Budget] = {}
+
+    async def install(self, db: aiosqlite.Connection) -> None:
+        """on_connect hook: attach the progress handler to a new connection.
+
+        Without configured budgets the handler is only attached once a
+        limit() block asks for a time budget of its own.
+        """
+        budget = _Budget()
+        self._budgets[id(db)] = budget
+        if self.timeout_ms or self.max_steps:
+            await self._attach(db, budget)
+
+    async def _attach(self, db: aiosqlite.Connection, budget: _Budget) -> None:
+        await db.set_progress_handler(budget.check, CHECK_INTERVAL)
+        budget.installed = True
+
+    @asynccontextmanager
+    async def limit(
+        self, db: aiosqlite.Connection, timeout_ms: Optional[int] = None
+    ) -> AsyncIterator[None]:
+        """Apply the budgets to every statement run on db inside the block.
+
+        timeout_ms replaces the configured time budget for this block only.
+        """
+        budget = self._budgets.get(id(db))
+        if budget is None:
+            yield
+            return
+        if timeout_ms is None:
+            timeout_ms = self.timeout_ms
+        if timeout_ms and not budget.installed:
+            await self._attach(db, budget)
+        budget.steps = 0
+        budget.exceeded = None
+        budget.max_steps = self.max_steps
+        budget.timeout_ms = timeout_ms
+        budget.deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+        try:
+            yield
+        except sqlite3.OperationalError as e:
+            if budget.exceeded is not None:
+                raise budget.exceeded from e
+            raise
+        finally:
+            budget.deadline = None
+            budget.max_steps = None
+
+    async def fetch(self, cursor: aiosqlite.Cursor, max_rows: int) -> List[Any]:
+        """Fetch up to max_rows rows, stopping once max_result_bytes is passed"""
+        if not self.max_result_bytes:
+            return list(await cursor.fetchmany(max_rows))
+
+        rows: List[Any] = []
+        size = 0
+        chunk_size = min(max_rows, 256)
+        while len(rows) < max_rows:
+            chunk = await cursor.fetchmany(min(chunk_size, max_rows - len(rows)))
+            if not chunk:
+                break
+            rows.extend(chunk)
+            size += estimate_size([], chunk)
+            if size > self.max_result_bytes:
+                raise BudgetExceeded("result_bytes", self.max_result_bytes)
+        return rows
@@ -0,0 +1,210 @@
+import asyncio
+import csv
+import json
+import os
+from typing import Any, Dict, List, Sequence
+
+import aiosqlite
+
+# Supported values for ExportRequest.format
+EXPORT_FORMATS = ("csv", "ndjson", "parquet", "arrow")
+
+# Arrow type for each SQLite storage class
+_ARROW_TYPES = {int: "int64", float: "float64", str: "string", bytes: "binary"}
+
+
+def _text(value: Any) -> Any:
+    # BLOBs have no CSV/JSON form; hex keeps them lossless and readable
+    return value.hex() if isinstance(value, bytes) else value
+
+
+class _CsvWriter:
+    def __init__(self, path: str, columns: List[str]):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        self._writer.writerows([_text(v) for v in row] for row in rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _NdjsonWriter:
+    def __init__(self, path: str, columns: List[str]):
+        self._file = open(path, "w", encoding="utf-8")
+        self._columns = columns
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        self._file.writelines(
+            json.dumps(dict(zip(self._columns, map(_text, row))), ensure_ascii=False)
+            + "\n"
+            for row in rows
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ArrowWriter:
+    """Parquet row groups or Arrow IPC record batches, one per chunk.
+
+    SQLite types each value rather than each column, so column types are
+    widened as chunks arrive: NULL, then integer, then real; text, or BLOBs
+    mixed with anything else, turn the column into text. A chunk that
+    widens a column has the rows already written copied into a file with
+    the wider schema, which happens at most a few times per column.
+    """
+
+    def __init__(self, path: str, columns: List[str], parquet: bool):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError(
+                "Parquet and Arrow exports need pyarrow: pip install pyarrow"
+            )
+        self._pa = pyarrow
+        self._path = path
+        self._columns = columns
+        self._parquet = parquet
+        self._types = [pyarrow.null()] * len(columns)
+        self._writer = None
+
+    def _widen(self, old, new):
+        pa = self._pa
+        if old == new or new == pa.null():
+            return old
+        if old == pa.null():
+            return new
+        if {old, new} == {pa.int64(), pa.float64()}:
+            return pa.float64()
+        return pa.string()
+
+    def _array(self, values: List[Any], arrow_type):
+        if arrow_type == self._pa.string():
+            values = [
+                v if v is None or isinstance(v, str) else str(_text(v)) for v in values
+            ]
+        return self._pa.array(values, type=arrow_type)
+
+    def _batches(self, source):
+        if self._parquet:
+            yield from self._pa.parquet.ParquetFile(source).iter_batches()
+        else:
+            reader = self._pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+    def _write(self, data: List[List[Any]]) -> None:
+        arrays = [self._array(v, t) for v, t in zip(data, self._types)]
+        self._writer.write_table(
+            self._pa.Table.from_arrays(arrays, schema=self._schema)
+        )
+
+    def _open(self, types) -> None:
+        written = None
+        if self._writer is not None:
+            self._writer.close()
+            written = self._path + ".old"
+            os.replace(self._path, written)
+        self._types = types
+        # Unlike a dict of columns, a schema keeps duplicate column names
+        self._schema = self._pa.schema(list(zip(self._columns, types)))
+        if self._parquet:
+            self._writer = self._pa.parquet.ParquetWriter(self._path, self._schema)
+        else:
+            self._writer = self._pa.ipc.new_file(self._path, self._schema)
+        if written is None:
+            return
+        try:
+            with open(written, "rb") as source:
+                for batch in self._batches(source):
+                    self._write([column.to_pylist() for column in batch.columns])
+        finally:
+            os.remove(written)
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        data = [list(values) for values in zip(*rows)]
+        types = []
+        for arrow_type, values in zip(self._types, data):
+            for kind in {type(v) for v in values if v is not None}:
+                arrow_type = self._widen(
+                    arrow_type, getattr(self._pa, _ARROW_TYPES[kind])()
+                )
+            types.append(arrow_type)
+        if self._writer is None or types != self._types:
+            self._open(types)
+        self._write(data)
+
+    def close(self) -> None:
+        if self._writer is None:
+            # No rows: still leave a valid file with untyped columns
+            self._open(self._types)
+        self._writer.close()
+
+
+def open_writer(path: str, columns: List[str], fmt: str):
+    if fmt == "csv":
+        return _CsvWriter(path, columns)
+    if fmt == "ndjson":
+        return _NdjsonWriter(path, columns)
+    if fmt in ("parquet", "arrow"):
+        return _ArrowWriter(path, columns, parquet=fmt == "parquet")
+    raise ValueError(
+        f"Unknown export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}"
+    )
+
+
+async def export_rows(
+    cursor: aiosqlite.Cursor,
+    path: str,
+    fmt: str,
+    chunk_rows: int = 10000,
+    preview_rows: int = 5,
+) -> Dict[str, Any]:
+    """Stream every row of cursor into a file at path, chunk by chunk.
+
+    Only one chunk is held at a time and each is written from a worker
+    thread, so memory stays flat however large the result is and the
+    event loop keeps serving other requests. The file is written under a
+    temporary name and renamed once complete; a failed export leaves
+    nothing behind.
+    """
+    columns = [column[0] for column in cursor.description or ()]
+    partial = path + ".part"
+    writer = open_writer(partial, columns, fmt)
+    row_count = 0
+    preview: List[Dict[str, Any]] = []
+    try:
+        while True:
+            rows = await cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            rows = [tuple(row) for row in rows]
+            if len(preview) < preview_rows:
+                preview.extend(
+                    dict(zip(columns, map(_text, row)))
+                    for row in rows[: preview_rows - len(preview)]
+                )
+            await asyncio.to_thread(writer.write, rows)
+            row_count += len(rows)
+        await asyncio.to_thread(writer.close)
+        os.replace(partial, path)
+    except BaseException:
+        try:
+            writer.close()
+        except Exception:
+            pass
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return {
+        "path": os.path.abspath(path),
+        "format": fmt,
+        "row_count": row_count,
+        "bytes": os.path.getsize(path),
+        "columns": columns,
+        "preview": preview,
+    }
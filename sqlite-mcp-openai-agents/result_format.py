@@ -0,0 +1,51 @@
+import re
+from typing import Any, Dict, List, Sequence
+
+# Supported values for QueryRequest.format
+RESULT_FORMATS = ("objects", "columnar", "rows", "tsv")
+
+
+_TSV_SPECIAL = re.compile(r"[\\\t\n\r]")
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _tsv_value(value: Any) -> str:
+    # NULL follows the COPY convention so it can't be confused with ''
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        if _TSV_SPECIAL.search(value):
+            return value.translate(_TSV_ESCAPES)
+        return value
+    return str(value)
+
+
+def encode_rows(
+    columns: List[str], rows: Sequence[Sequence[Any]], fmt: str = "objects"
+) -> Dict[str, Any]:
+    """Encode result rows in one of RESULT_FORMATS.
+
+    - ``objects``: ``{"rows": [{col: val, ...}, ...]}`` (the original format)
+    - ``columnar``: ``{"data": [[col0 values], [col1 values], ...]}``
+    - ``rows``: ``{"rows": [[val, val, ...], ...]}``
+    - ``tsv``: ``{"text": "col\\tcol\\nval\\tval..."}``
+
+    Every format also carries the column names in ``columns``.
+    """
+    if fmt == "objects":
+        return {
+            "columns": columns,
+            "rows": [{columns[i]: row[i] for i in range(len(columns))} for row in rows],
+        }
+    if fmt == "columnar":
+        data = [list(values) for values in zip(*rows)] if rows else []
+        return {"columns": columns, "data": data or [[] for _ in columns]}
+    if fmt == "rows":
+        return {"columns": columns, "rows": [list(row) for row in rows]}
+    if fmt == "tsv":
+        lines = ["\t".join(columns)]
+        lines.extend("\t".join(map(_tsv_value, row)) for row in rows)
+        return {"columns": columns, "text": "\n".join(lines)}
+    raise ValueError(
+        f"Unknown result format '{fmt}'. Use one of: {', '.join(RESULT_FORMATS)}"
+    )
@@ -0,0 +1,200 @@
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import aiosqlite
+
+from index_advisor import quote_identifier
+
+# Parent key values read per foreign key when generating generic rows
+MAX_PARENT_KEYS = 10000
+
+CATEGORIES = ["Electronics", "Clothing", "Home", "Books", "Food"]
+
+Rows = Iterator[Tuple[Any, ...]]
+
+
+def _date(n: int) -> str:
+    return f"2023-{(n % 12) + 1:02d}-{(n % 28) + 1:02d}"
+
+
+def _products(start: int, count: int) -> Rows:
+    for i in range(start, start + count):
+        yield (
+            f"Product {i+1}",
+            f"This is a description for product {i+1}",
+            round(10.99 + i * 5.25, 2),
+            CATEGORIES[i % 5],
+            i % 4 != 0,  # 75% of products in stock
+        )
+
+
+def _customers(start: int, count: int) -> Rows:
+    for i in range(start, start + count):
+        yield (f"Customer {i+1}", f"customer{i+1}@example.com", _date(i))
+
+
+def _orders(start: int, count: int, customer_count: int) -> Rows:
+    for i in range(start, start + count):
+        yield ((i % customer_count) + 1, _date(i), round(50.00 + i * 12.35, 2))
+
+
+def _feedback(start: int, count: int) -> Rows:
+    for i in range(start, start + count):
+        yield (
+            f"User {i+1}",
+            f"user{i+1}@example.com",
+            f"This is sample feedback #{i+1}. The service is great!",
+        )
+
+
+# The demo tables created by init_db keep their hand-written rows; other
+# tables, or demo names with a different schema, get generic ones
+KNOWN_TABLES = {
+    "products": (("name", "description", "price", "category", "in_stock"), _products),
+    "customers": (("name", "email", "signup_date"), _customers),
+    "orders": (("customer_id", "order_date", "total_amount"), _orders),
+    "feedback": (("user", "email", "feedback"), _feedback),
+}
+
+
+def _affinity(declared: str) -> str:
+    """SQLite's column affinity rules for a declared type"""
+    declared = declared.upper()
+    if "INT" in declared:
+        return "INTEGER"
+    if "CHAR" in declared or "CLOB" in declared or "TEXT" in declared:
+        return "TEXT"
+    if "BLOB" in declared or not declared:
+        return "BLOB"
+    if "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return "REAL"
+    return "NUMERIC"
+
+
+def _value_maker(table: str, name: str, declared: str) -> Callable[[int], Any]:
+    """Pick a generator of plausible values from a column's name and type"""
+    lowered = name.lower()
+    affinity = _affinity(declared)
+    if "email" in lowered:
+        return lambda n: f"{table.lower()}{n}@example.com"
+    if (
+        "DATE" in declared.upper()
+        or "TIME" in declared.upper()
+        or lowered.endswith(("date", "_at", "time"))
+    ) and affinity != "INTEGER":
+        return _date
+    if "BOOL" in declared.upper():
+        return lambda n: n % 4 != 0
+    if affinity == "INTEGER":
+        return lambda n: n
+    if affinity in ("REAL", "NUMERIC"):
+        return lambda n: round(10.0 + (n * 7.31) % 1000, 2)
+    return lambda n: f"{name} {n}"
+
+
+async def _parent_keys(db: aiosqlite.Connection, parent: str, key: str) -> List[Any]:
+    column = quote_identifier(key) if key else "rowid"
+    rows = await db.execute_fetchall(
+        f"SELECT DISTINCT {column} FROM {quote_identifier(parent)} "
+        f"WHERE {column} IS NOT NULL LIMIT {MAX_PARENT_KEYS}"
+    )
+    return [row[0] for row in rows]
+
+
+async def _generic_rows(
+    db: aiosqlite.Connection, table: str, columns: List[Any], start: int, count: int
+) -> Tuple[str, Rows]:
+    foreign_keys: Dict[str, Tuple[str, str]] = {
+        row["from"]: (row["table"], row["to"])
+        for row in await db.execute_fetchall(
+            "SELECT * FROM pragma_foreign_key_list(?)", (table,)
+        )
+    }
+    primary_key = [column for column in columns if column["pk"]]
+    rowid_alias = len(primary_key) == 1 and primary_key[0]["type"].upper() == "INTEGER"
+
+    names, makers, radix = [], [], 1
+    for column in columns:
+        name = column["name"]
+        if name in foreign_keys:
+            parent, key = foreign_keys[name]
+            keys = await _parent_keys(db, parent, key)
+            if not keys:
+                if column["notnull"]:
+                    raise ValueError(
+                        f"Cannot insert into {table} without rows in {parent}. "
+                        f"Insert into {parent} first."
+                    )
+                continue
+            # Mixed-radix walk over the parent keys, so composite keys made
+            # of several foreign keys get distinct combinations
+            makers.append(
+                lambda n, keys=keys, radix=radix: keys[(n // radix) % len(keys)]
+            )
+            radix *= len(keys)
+        elif column["pk"] and rowid_alias:
+            continue  # SQLite assigns the rowid
+        elif column["dflt_value"] is not None:
+            continue  # Let the column default apply
+        else:
+            makers.append(_value_maker(table, name, column["type"]))
+        names.append(name)
+    if not names:
+        return f"INSERT INTO {quote_identifier(table)} DEFAULT VALUES", (
+            () for _ in range(count)
+        )
+
+    sql = (
+        f"INSERT OR IGNORE INTO {quote_identifier(table)} "
+        f"({', '.join(quote_identifier(name) for name in names)}) "
+        f"VALUES ({', '.join('?' * len(names))})"
+    )
+    rows = (
+        tuple(make(n) for make in makers) for n in range(start + 1, start + count + 1)
+    )
+    return sql, rows
+
+
+async def sample_rows(
+    db: aiosqlite.Connection, table: str, count: int
+) -> Tuple[str, Rows]:
+    """Return an INSERT statement and a lazy iterator of count rows for table.
+
+    Numbering continues after the table's current rows, so repeated calls
+    do not collide on unique columns. Tables other than the demo ones get
+    rows built from ``PRAGMA table_info``: values chosen by column name and
+    affinity, foreign keys drawn from existing parent rows, and ``INSERT OR
+    IGNORE`` so the occasional duplicate is skipped rather than fatal.
+    Raises ValueError when the table does not exist or cannot be filled.
+    """
+    columns = await db.execute_fetchall("SELECT * FROM pragma_table_info(?)", (table,))
+    if not columns:
+        raise ValueError(f"Table {table} not found")
+    try:
+        rows = await db.execute_fetchall(
+            f"SELECT coalesce(max(rowid), 0) FROM {quote_identifier(table)}"
+        )
+    except Exception:
+        # WITHOUT ROWID tables
+        rows = await db.execute_fetchall(
+            f"SELECT count(*) FROM {quote_identifier(table)}"
+        )
+    start = rows[0][0]
+
+    known = KNOWN_TABLES.get(table.lower())
+    if known is None or not set(known[0]) <= {column["name"] for column in columns}:
+        return await _generic_rows(db, table, columns, start, count)
+    names, generate = known
+    sql = (
+        f"INSERT INTO {quote_identifier(table)} ({', '.join(names)}) "
+        f"VALUES ({', '.join('?' * len(names))})"
+    )
+    if table.lower() == "orders":
+        # First ensure we have customers
+        rows = await db.execute_fetchall("SELECT COUNT(*) FROM customers")
+        customer_count = rows[0][0]
+        if customer_count == 0:
+            raise ValueError(
+                "Cannot insert orders without customers. Insert customers first."
+            )
+        return sql, generate(start, count, customer_count)
+    return sql, generate(start, count)
@@ -0,0 +1,232 @@
+import functools
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp import types
+
+# Upper bounds in seconds, from sub-millisecond cache hits to slow scans
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf overflow bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile.
+
+        Past the last bucket this is the last bound, a lower limit; the
+        summary reports how many observations went over it.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def summary(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.sum / self.count) if self.count else None,
+            "p50_ms": ms(self.quantile(0.50)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "p99_ms": ms(self.quantile(0.99)),
+            # Observations above the last bucket, which p99_ms understates
+            "over_max_bucket": self.counts[-1],
+        }
+
+    def prometheus(self, name: str, labels: str = "") -> List[str]:
+        sep = "," if labels else ""
+        block = f"{{{labels}}}" if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{block} {self.sum:.6f}")
+        lines.append(f"{name}_count{block} {self.count}")
+        return lines
+
+
+def _error_type(result: Dict[str, Any]) -> str:
+    if "budget" in result:
+        return "budget_exceeded"
+    if "read_only_mode" in result:
+        return "rejected"
+    return "error"
+
+
+def _rows_returned(result: Dict[str, Any]) -> int:
+    # execute_query responses carry columns; count_rows' row_count does not
+    if "columns" in result:
+        return result.get("row_count", 0)
+    results = result.get("results")
+    if isinstance(results, list):
+        return sum(_rows_returned(r) for r in results if isinstance(r, dict))
+    return 0
+
+
+class ServerMetrics:
+    """Per-tool latency, rows, response bytes and errors, plus pool wait time"""
+
+    def __init__(self):
+        self.started = time.time()
+        # Cold start to the first answered tool call, from creation
+        self._created = time.perf_counter()
+        self.first_answer_ms: Optional[float] = None
+        self.latency: Dict[str, Histogram] = defaultdict(Histogram)
+        self.rows: Dict[str, int] = defaultdict(int)
+        self.bytes: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.pool_wait = Histogram()
+
+    def instrument(
+        self,
+        fn: Optional[Callable[..., Awaitable[Any]]] = None,
+        *,
+        name: Optional[str] = None,
+    ) -> Any:
+        """Wrap a tool so each call is timed and counted.
+
+        The result is returned unchanged. Metrics are kept under name,
+        which defaults to the function's and must be the name the tool is
+        registered under for measure_responses to match them up.
+        """
+        if fn is None:
+            return functools.partial(self.instrument, name=name)
+        tool = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            began = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                self.errors[(tool, type(e).__name__)] += 1
+                self.latency[tool].observe(time.perf_counter() - began)
+                raise
+            if isinstance(result, dict):
+                if "error" in result:
+                    self.errors[(tool, _error_type(result))] += 1
+                self.rows[tool] += _rows_returned(result)
+            finished = time.perf_counter()
+            self.latency[tool].observe(finished - began)
+            if self.first_answer_ms is None:
+                self.first_answer_ms = round((finished - self._created) * 1000, 2)
+            return result
+
+        return wrapper
+
+    def measure_responses(self, server: Any) -> None:
+        """Count the bytes of every tool response an MCP server sends.
+
+        Wraps the low-level server's CallToolRequest handler and measures
+        the text content it returns, which FastMCP has already serialized,
+        so no result is serialized a second time just to be measured.
+        """
+        handle = server.request_handlers[types.CallToolRequest]
+
+        async def measured(request: types.CallToolRequest) -> types.ServerResult:
+            response = await handle(request)
+            self.bytes[request.params.name] += sum(
+                len(block.text.encode("utf-8"))
+                for block in getattr(response.root, "content", None) or ()
+                if isinstance(block, types.TextContent)
+            )
+            return response
+
+        server.request_handlers[types.CallToolRequest] = measured
+
+    def observe_pool_wait(self, seconds: float) -> None:
+        self.pool_wait.observe(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        tools = {}
+        for tool, histogram in sorted(self.latency.items()):
+            tools[tool] = {
+                **histogram.summary(),
+                "rows": self.rows[tool],
+                "bytes": self.bytes[tool],
+                "errors": {
+                    error: count
+                    for (name, error), count in sorted(self.errors.items())
+                    if name == tool
+                },
+            }
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "first_answer_ms": self.first_answer_ms,
+            "tools": tools,
+            "pool_wait": self.pool_wait.summary(),
+        }
+
+    def prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = [
+            "# HELP mcp_tool_duration_seconds Time spent in each tool call.",
+            "# TYPE mcp_tool_duration_seconds histogram",
+        ]
+        for tool, histogram in sorted(self.latency.items()):
+            lines.extend(
+                histogram.prometheus("mcp_tool_duration_seconds", f'tool="{tool}"')
+            )
+        lines += [
+            "# HELP mcp_tool_rows_total Rows returned by query tools.",
+            "# TYPE mcp_tool_rows_total counter",
+        ]
+        lines.extend(
+            f'mcp_tool_rows_total{{tool="{t}"}} {n}'
+            for t, n in sorted(self.rows.items())
+        )
+        lines += [
+            "# HELP mcp_tool_response_bytes_total Bytes of serialized tool responses.",
+            "# TYPE mcp_tool_response_bytes_total counter",
+        ]
+        lines.extend(
+            f'mcp_tool_response_bytes_total{{tool="{t}"}} {n}'
+            for t, n in sorted(self.bytes.items())
+        )
+        lines += [
+            "# HELP mcp_tool_errors_total Tool calls that failed, by error type.",
+            "# TYPE mcp_tool_errors_total counter",
+        ]
+        lines.extend(
+            f'mcp_tool_errors_total{{tool="{t}",type="{e}"}} {n}'
+            for (t, e), n in sorted(self.errors.items())
+        )
+        lines += [
+            "# HELP mcp_pool_wait_seconds Time spent waiting for a pooled connection.",
+            "# TYPE mcp_pool_wait_seconds histogram",
+        ]
+        lines.extend(self.pool_wait.prometheus("mcp_pool_wait_seconds"))
+        if self.first_answer_ms is not None:
+            lines += [
+                "# HELP mcp_first_answer_seconds Process start to first tool answer.",
+                "# TYPE mcp_first_answer_seconds gauge",
+                f"mcp_first_answer_seconds {self.first_answer_ms / 1000:.6f}",
+            ]
+        return "\n".join(lines) + "\n"
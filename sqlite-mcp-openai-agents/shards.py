@@ -0,0 +1,675 @@
+import asyncio
+import glob
+import json
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+from db_pool import ConnectionPool
+
+# Aggregates whose per-shard results can be combined into the global one
+_MERGEABLE = frozenset(("count", "sum", "total", "min", "max", "avg"))
+_AGGREGATES = _MERGEABLE | frozenset(
+    ("group_concat", "string_agg", "json_group_array", "json_group_object")
+)
+# Words that end an expression rather than alias it
+_NOT_ALIASES = frozenset(
+    ("end", "null", "true", "false", "current_date", "current_time")
+)
+_CLAUSES = ("from", "where", "group", "having", "window", "order", "limit")
+# Prefix of the hidden count columns added to shard queries for avg()
+_AVG_COUNT = "_shard_count_"
+
+_TOKEN = re.compile(
+    r"""
+    (?P<space>\s+|--[^\n]*|/\*.*?(?:\*/|$))
+    |(?P<string>[xX]?'(?:[^']|'')*')
+    |(?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    |(?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)
+    |(?P<param>\?\d*|[:@$]\w+)
+    |(?P<word>\w+)
+    |(?P<other>\|\||<=|>=|<>|!=|==|<<|>>|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def shard_paths(spec: str) -> Optional[List[Tuple[str, str]]]:
+    """Resolve DB_PATH to (name, path) shards, or None for a single database.
+
+    A ``.json`` manifest holds either a list of paths or an object mapping
+    shard names to paths, relative to the manifest. A path containing glob
+    characters matches every file it expands to, in sorted order. Shards
+    are named after their file without the extension unless named.
+    """
+    if spec.lower().endswith(".json"):
+        with open(spec, encoding="utf-8") as f:
+            manifest = json.load(f)
+        base = os.path.dirname(os.path.abspath(spec))
+        if isinstance(manifest, dict):
+            entries = list(manifest.items())
+        else:
+            entries = [(None, path) for path in manifest]
+        return [
+            (
+                name or os.path.splitext(os.path.basename(path))[0],
+                os.path.join(base, path),
+            )
+            for name, path in entries
+        ]
+    if glob.has_magic(spec):
+        return [
+            (os.path.splitext(os.path.basename(path))[0], path)
+            for path in sorted(glob.glob(spec))
+        ]
+    return None
+
+
+class _Token:
+    __slots__ = ("kind", "text", "start", "end", "depth")
+
+    def __init__(self, kind: str, text: str, start: int, end: int, depth: int):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+        self.depth = depth
+
+    @property
+    def key(self) -> str:
+        """Case-folded text, with identifier quotes removed"""
+        if self.kind == "quoted":
+            return self.text[1:-1].lower()
+        return self.text.lower() if self.kind == "word" else self.text
+
+
+def _tokenize(sql: str) -> List[_Token]:
+    tokens, depth = [], 0
+    for match in _TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind == "space":
+            continue
+        text = match.group()
+        if text == ")":
+            depth -= 1
+        tokens.append(_Token(kind, text, match.start(), match.end(), depth))
+        if text == "(":
+            depth += 1
+    return tokens
+
+
+def _split(tokens: List[_Token], depth: int) -> List[List[_Token]]:
+    """Split tokens on the commas at depth"""
+    parts: List[List[_Token]] = [[]]
+    for token in tokens:
+        if token.text == "," and token.depth == depth:
+            parts.append([])
+        else:
+            parts[-1].append(token)
+    return parts
+
+
+def _key(tokens: List[_Token]) -> str:
+    return " ".join(token.key for token in tokens)
+
+
+def _subquery_tokens(tokens: List[_Token]) -> List[int]:
+    """Indexes of the tokens inside a parenthesized SELECT, like a CTE body"""
+    inside, opens = [], []
+    for i, token in enumerate(tokens):
+        if token.text == ")" and opens:
+            opens.pop()
+        if any(opens):
+            inside.append(i)
+        if token.text == "(":
+            following = tokens[i + 1].key if i + 1 < len(tokens) else ""
+            opens.append(following in ("select", "with"))
+    return inside
+
+
+def _call_args(tokens: List[_Token], i: int) -> List[_Token]:
+    """Arguments of the function call whose name is tokens[i]"""
+    depth, end = tokens[i].depth, i + 2
+    while end < len(tokens) and tokens[end].depth > depth:
+        end += 1
+    return tokens[i + 2 : end]
+
+
+def _check_subqueries(tokens: List[_Token]) -> None:
+    """Reject subqueries whose rows depend on all of a table's rows at once.
+
+    Every shard runs the whole query against its own rows only, so a
+    subquery that aggregates, groups, limits or removes duplicates gives
+    per-shard answers that no merge of the outer results can correct.
+    """
+    for i in _subquery_tokens(tokens):
+        token = tokens[i]
+        if token.kind != "word":
+            continue
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token.key in ("limit", "distinct", "group", "having", "over", "window"):
+            found = token.text.upper()
+        elif token.key in ("intersect", "except") or (
+            token.key == "union" and (following is None or following.key != "all")
+        ):
+            found = token.text.upper()
+        elif token.key in _AGGREGATES and following and following.text == "(":
+            if token.key in ("min", "max") and (
+                len(_split(_call_args(tokens, i), token.depth + 1)) > 1
+            ):
+                continue  # min(a, b) is the scalar function
+            found = f"{token.text}()"
+        else:
+            continue
+        raise ValueError(
+            f"{found} inside a subquery or CTE cannot be merged across shards: "
+            "each shard would apply it to its own rows only"
+        )
+
+
+def _sort_value(value: Any, collation: str = "binary") -> Tuple[int, Any]:
+    """Order values the way SQLite does: NULL, numbers, text, then blobs"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        if collation == "nocase":
+            value = value.lower()
+        elif collation == "rtrim":
+            value = value.rstrip(" ")
+        return (2, value)
+    return (3, bytes(value))
+
+
+class _Item:
+    """One result column of the query's select list"""
+
+    def __init__(self, sql: str, tokens: List[_Token], depth: int):
+        self.alias = None
+        expr = tokens
+        if len(tokens) >= 3 and tokens[-2].key == "as":
+            self.alias, expr = tokens[-1].key, tokens[:-2]
+        elif (
+            len(tokens) >= 2
+            and tokens[-1].kind in ("word", "quoted")
+            and tokens[-1].key not in _NOT_ALIASES
+            and (tokens[-2].text == ")" or tokens[-2].kind in ("word", "quoted"))
+        ):
+            self.alias, expr = tokens[-1].key, tokens[:-1]
+        self.expr = expr
+        self.text = sql[expr[0].start : expr[-1].end]
+        self.key = _key(expr)
+        self.star = expr[-1].text == "*" and (len(expr) == 1 or expr[-2].text == ".")
+        # Bare column references are named after the column
+        self.column = (
+            expr[-1].key
+            if all(t.kind in ("word", "quoted") or t.text == "." for t in expr)
+            else None
+        )
+        self.aggregate = self._aggregate(depth)
+
+    def _aggregate(self, depth: int) -> Optional[str]:
+        expr = self.expr
+        whole_call = (
+            len(expr) >= 3
+            and expr[0].kind == "word"
+            and expr[1].text == "("
+            and expr[-1].text == ")"
+            and all(t.depth > depth for t in expr[2:-1])
+        )
+        if whole_call and expr[0].key in _MERGEABLE:
+            name, args = expr[0].key, expr[2:-1]
+            if name in ("min", "max") and len(_split(args, depth + 1)) > 1:
+                return None  # min(a, b) is the scalar function
+            if args and args[0].key == "distinct" and name not in ("min", "max"):
+                raise ValueError(
+                    f"{self.text} cannot be merged across shards: "
+                    "distinct values may repeat between shards"
+                )
+            return name
+        for i, token in enumerate(expr):
+            if token.key == "over" or (
+                token.key in _AGGREGATES
+                and i + 1 < len(expr)
+                and expr[i + 1].text == "("
+            ):
+                raise ValueError(
+                    f"{self.text} cannot be merged across shards. Supported: "
+                    "plain columns and whole count/sum/total/min/max/avg calls"
+                )
+        return None
+
+    def matches(self, term: List[_Token]) -> bool:
+        key = _key(term)
+        return (
+            key == self.key
+            or key == self.alias
+            or (self.column is not None and len(term) == 1 and key == self.column)
+        )
+
+
+class MergePlan:
+    """How to run one read query on every shard and combine the results.
+
+    Only the query's top-level shape is merged: its select list, GROUP BY,
+    ORDER BY and LIMIT. Queries without aggregates are concatenated, or
+    merged in ORDER BY order keeping each shard's own LIMIT. Queries with
+    count, sum, total, min, max or avg results are run without their
+    ORDER BY and LIMIT on each shard, and the per-shard groups are then
+    combined by the select list's plain columns; avg is run as a sum plus
+    a hidden count. Subqueries and CTEs run on each shard unchanged.
+    Anything whose per-shard results cannot be combined exactly, like
+    HAVING, count(DISTINCT ...), grouping under a COLLATE or a subquery
+    with an aggregate, GROUP BY, LIMIT or DISTINCT, raises ValueError.
+    """
+
+    def __init__(self, sql: str):
+        sql = sql.strip()
+        while sql.endswith(";"):
+            sql = sql[:-1].rstrip()
+        tokens = _tokenize(sql)
+        if not tokens or tokens[0].key not in ("select", "with"):
+            raise ValueError("Sharded mode only runs SELECT queries")
+        # The main SELECT is the first one outside parentheses, after any CTEs
+        start = next(
+            (i for i, t in enumerate(tokens) if t.depth == 0 and t.key == "select"),
+            None,
+        )
+        if start is None:
+            raise ValueError("Sharded mode only runs SELECT queries")
+        _check_subqueries(tokens)
+        top = tokens[start + 1 :]
+        for token in top:
+            if token.depth == 0 and token.key in ("union", "intersect", "except"):
+                raise ValueError(
+                    "Compound SELECTs cannot be merged across shards; "
+                    "run each part as its own query"
+                )
+
+        self.distinct = bool(top) and top[0].key == "distinct"
+        if top and top[0].key in ("distinct", "all"):
+            top = top[1:]
+        clauses: Dict[str, int] = {}
+        for i, token in enumerate(top):
+            if token.depth == 0 and token.key in _CLAUSES and token.key not in clauses:
+                clauses[token.key] = i
+        if "having" in clauses:
+            raise ValueError(
+                "HAVING cannot be merged across shards; filter the grouped "
+                "results in a query of their own"
+            )
+
+        def clause(name: str) -> List[_Token]:
+            if name not in clauses:
+                return []
+            begin = clauses[name] + (2 if name in ("group", "order") else 1)
+            end = min([i for i in clauses.values() if i > clauses[name]] or [len(top)])
+            return top[begin:end]
+
+        select_end = min(clauses.values()) if clauses else len(top)
+        self.items = [
+            _Item(sql, part, 0) for part in _split(top[:select_end], 0) if part
+        ]
+        self.aggregates = [item.aggregate for item in self.items]
+        self.group_by = "group" in clauses
+        self.grouped = self.group_by or self.distinct or any(self.aggregates)
+        # Result columns holding each avg()'s hidden count in self.sql
+        self.avg_counts = {
+            i: f"{_AVG_COUNT}{i}"
+            for i, kind in enumerate(self.aggregates)
+            if kind == "avg"
+        }
+        if (self.group_by or any(self.aggregates)) and any(
+            item.star for item in self.items
+        ):
+            raise ValueError("Grouped queries with * cannot be merged across shards")
+        # Groups are merged on their exact values, which a collation like
+        # nocase would have treated as equal on each shard
+        key_tokens = clause("group") + [
+            token
+            for item in self.items
+            if item.aggregate is None
+            for token in item.expr
+        ]
+        if self.grouped and any(token.key == "collate" for token in key_tokens):
+            raise ValueError(
+                "Groups under a COLLATE cannot be merged across shards; "
+                "group by the column itself"
+            )
+        for term in _split(clause("group"), 0):
+            if term and not self._position(term, []):
+                raise ValueError(
+                    f"GROUP BY {_key(term)} must also be in the select list "
+                    "to merge groups across shards"
+                )
+
+        self.order: List[Tuple[List[_Token], bool, Optional[bool], str]] = []
+        for term in _split(clause("order"), 0):
+            if not term:
+                continue
+            self.order.append(self._order_term(term))
+            if not any(item.star for item in self.items) and not self._position(
+                self.order[-1][0], []
+            ):
+                raise ValueError(
+                    f"ORDER BY {_key(self.order[-1][0])} must be a result column "
+                    "to merge shards in order"
+                )
+        self.limit, self.offset = self._limit(clause("limit"))
+
+        tail = [clauses[name] for name in ("order", "limit") if name in clauses]
+        tail_start = top[min(tail)].start if tail else len(sql)
+        if self.grouped:
+            # Order and limit apply to the merged groups
+            self.sql = self._rewrite_avg(sql[:tail_start].rstrip(), top[:select_end])
+        elif self.limit is not None:
+            # Each shard needs its first offset + limit rows
+            head = sql[: top[clauses["limit"]].start].rstrip()
+            self.sql = f"{head} LIMIT {self.limit + self.offset}"
+        else:
+            self.sql = sql
+        if self.grouped:
+            self.kind = "aggregate"
+        elif self.order:
+            self.kind = "ordered"
+        else:
+            self.kind = "concat"
+
+    def _position(self, term: List[_Token], columns: List[str]) -> Optional[int]:
+        """1-based result column a GROUP BY or ORDER BY term refers to"""
+        if len(term) == 1 and term[0].kind == "number":
+            position = int(term[0].text)
+            return position if 1 <= position <= len(self.items) else None
+        for position, item in enumerate(self.items, 1):
+            if not item.star and item.matches(term):
+                return position
+        key = _key(term)
+        for position, column in enumerate(columns, 1):
+            if column.lower() == key:
+                return position
+        return None
+
+    def _order_term(
+        self, term: List[_Token]
+    ) -> Tuple[List[_Token], bool, Optional[bool], str]:
+        descending, nulls_first, collation = False, None, "binary"
+        while len(term) > 1:
+            last = term[-1].key
+            if last in ("asc", "desc"):
+                descending = last == "desc"
+                term = term[:-1]
+            elif last in ("first", "last") and term[-2].key == "nulls":
+                nulls_first = last == "first"
+                term = term[:-2]
+            elif len(term) > 2 and term[-2].key == "collate":
+                collation = last
+                term = term[:-2]
+            else:
+                break
+        if collation not in ("binary", "nocase", "rtrim"):
+            raise ValueError(f"Cannot merge shards ordered by collation {collation}")
+        return term, descending, nulls_first, collation
+
+    def _limit(self, tokens: List[_Token]) -> Tuple[Optional[int], int]:
+        if not tokens:
+            return None, 0
+        values = [t for t in tokens if t.key not in (",", "offset")]
+        if len(values) not in (1, 2) or any(t.kind != "number" for t in values):
+            raise ValueError(
+                "Sharded queries need a literal LIMIT and OFFSET, not parameters "
+                "or expressions"
+            )
+        numbers = [int(t.text) for t in values]
+        if len(numbers) == 1:
+            return numbers[0], 0
+        if any(t.text == "," for t in tokens):
+            return numbers[1], numbers[0]  # LIMIT offset, count
+        return numbers[0], numbers[1]
+
+    def _rewrite_avg(self, sql: str, select: List[_Token]) -> str:
+        """Turn each avg(x) into sum(x) plus a trailing hidden count(x)"""
+        edits, counts = [], []
+        for i, item in enumerate(self.items):
+            if item.aggregate != "avg":
+                continue
+            args = sql[item.expr[2].start : item.expr[-2].end]
+            name = (item.alias or item.text).replace('"', '""')
+            edits.append((item.expr[0].start, item.expr[-1].end, f"sum({args})"))
+            if item.alias is None:
+                # Keep the column named after the original expression
+                edits.append((item.expr[-1].end, item.expr[-1].end, f' AS "{name}"'))
+            counts.append(f', count({args}) AS "{_AVG_COUNT}{i}"')
+        if counts:
+            edits.append((select[-1].end, select[-1].end, "".join(counts)))
+        # Right to left so earlier offsets stay valid; of two inserts at one
+        # offset the later one goes in first and so ends up last
+        for _, (begin, end, text) in sorted(
+            enumerate(edits), key=lambda e: (e[1][0], e[0]), reverse=True
+        ):
+            sql = sql[:begin] + text + sql[end:]
+        return sql
+
+    def shard_rows(self, max_rows: int, max_groups: int) -> int:
+        """Rows to fetch from each shard for a result of max_rows rows"""
+        if self.grouped:
+            return max_groups + 1
+        rows = self.offset + max_rows
+        if self.limit is not None:
+            rows = min(rows, self.limit + self.offset)
+        return rows
+
+    def merge(
+        self,
+        results: Sequence[Tuple[str, List[str], List[Any]]],
+        max_groups: int,
+    ) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """Combine (shard, columns, rows) results into one result"""
+        columns = results[0][1] if results else []
+        for shard, shard_columns, _ in results:
+            if shard_columns != columns:
+                raise ValueError(
+                    f"Shard {shard} returned columns {shard_columns}, "
+                    f"expected {columns}"
+                )
+        rows: List[Tuple[Any, ...]] = []
+        if self.grouped:
+            for shard, _, shard_rows in results:
+                if len(shard_rows) > max_groups:
+                    raise ValueError(
+                        f"Shard {shard} returned more than {max_groups} groups "
+                        "to merge; narrow the query or raise SHARD_MAX_GROUPS"
+                    )
+            columns, rows = self._aggregate(columns, results)
+        else:
+            for _, _, shard_rows in results:
+                rows.extend(tuple(row) for row in shard_rows)
+        if self.distinct:
+            rows = list(dict.fromkeys(rows))
+        for term, descending, nulls_first, collation in reversed(self.order):
+            position = self._position(term, columns)
+            if position is None:
+                raise ValueError(
+                    f"ORDER BY {_key(term)} must be a result column to merge "
+                    "shards in order"
+                )
+            if nulls_first is None:
+                nulls_first = not descending
+            null_rank = 0 if nulls_first != descending else 4
+
+            def sort_key(row, index=position - 1, collation=collation):
+                value = row[index]
+                if value is None:
+                    return (null_rank, 0)
+                return _sort_value(value, collation)
+
+            rows.sort(key=sort_key, reverse=descending)
+        if self.offset or self.limit is not None:
+            end = (
+                None
+                if self.limit is None or self.limit < 0
+                else self.offset + self.limit
+            )
+            rows = rows[self.offset : end]
+        return columns, rows
+
+    def order_by(self, columns: List[str]) -> str:
+        """The query's ORDER BY clause over result columns, or an empty string"""
+        terms = []
+        for term, descending, nulls_first, collation in self.order:
+            position = self._position(term, columns)
+            if position is None:
+                raise ValueError(f"ORDER BY {_key(term)} must be a result column")
+            name = columns[position - 1].replace('"', '""')
+            text = f'"{name}" COLLATE {collation}'
+            if descending:
+                text += " DESC"
+            if nulls_first is not None:
+                text += " NULLS FIRST" if nulls_first else " NULLS LAST"
+            terms.append(text)
+        return f"ORDER BY {', '.join(terms)}" if terms else ""
+
+    @property
+    def keys(self) -> Optional[List[int]]:
+        """Columns identifying a group of self.sql's result, None for all"""
+        if not any(self.aggregates):
+            return None
+        if not self.group_by:
+            return []
+        return [i for i, kind in enumerate(self.aggregates) if kind is None]
+
+    def combine(
+        self, columns: List[str], row_lists: Sequence[Sequence[Any]]
+    ) -> List[List[Any]]:
+        """Merge rows of self.sql's result group by group.
+
+        The rows keep their partial form, with avg() still a sum next to
+        its hidden count, so the result can be merged again later.
+        """
+        if not any(self.aggregates):
+            # GROUP BY or DISTINCT over plain columns: drop repeated rows
+            rows = dict.fromkeys(tuple(row) for r in row_lists for row in r)
+            return [list(row) for row in rows]
+        counts = {i: columns.index(name) for i, name in self.avg_counts.items()}
+        bare = [i for i, kind in enumerate(self.aggregates) if kind is None]
+        # Without GROUP BY everything is one group, and like SQLite the bare
+        # columns come from the row holding a lone min() or max()
+        keys = bare if self.group_by else []
+        extremes = [
+            i for i, kind in enumerate(self.aggregates) if kind in ("min", "max")
+        ]
+        pick = extremes[0] if not self.group_by and len(extremes) == 1 else None
+        groups: Dict[Tuple[Any, ...], List[Any]] = {}
+        for shard_rows in row_lists:
+            for row in shard_rows:
+                group = tuple(row[i] for i in keys)
+                merged = groups.get(group)
+                if merged is None:
+                    groups[group] = list(row)
+                    continue
+                if pick is not None and _beats(
+                    self.aggregates[pick], row[pick], merged[pick]
+                ):
+                    for i in bare:
+                        merged[i] = row[i]
+                for i, kind in enumerate(self.aggregates):
+                    if kind is None:
+                        continue
+                    merged[i] = _combine(kind, merged[i], row[i])
+                    if kind == "avg":
+                        merged[counts[i]] += row[counts[i]]
+        return list(groups.values())
+
+    def _aggregate(
+        self, columns: List[str], results: Sequence[Tuple[str, List[str], List[Any]]]
+    ) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        merged_rows = self.combine(columns, [rows for _, _, rows in results])
+        if not any(self.aggregates):
+            return columns, [tuple(row) for row in merged_rows]
+        visible = len(self.items)
+        counts = {i: columns.index(name) for i, name in self.avg_counts.items()}
+        rows = []
+        for merged in merged_rows:
+            for i, index in counts.items():
+                # The shards returned sum(x); divide by the summed count(x)
+                merged[i] = merged[i] / merged[index] if merged[index] else None
+            rows.append(tuple(merged[:visible]))
+        return columns[:visible], rows
+
+
+def _beats(kind: str, new: Any, old: Any) -> bool:
+    """Whether new replaces old as the min() or max()"""
+    if new is None:
+        return False
+    if old is None:
+        return True
+    if kind == "min":
+        return _sort_value(new) < _sort_value(old)
+    return _sort_value(new) > _sort_value(old)
+
+
+def _combine(kind: str, a: Any, b: Any) -> Any:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if kind in ("count", "sum", "total", "avg"):
+        return a + b
+    return b if _beats(kind, b, a) else a
+
+
+def plan_merge(sql: str) -> MergePlan:
+    """Analyze sql for a sharded run; raises ValueError if it cannot be merged"""
+    return MergePlan(sql)
+
+
+class ShardSet:
+    """One small connection pool per shard and a bounded fan-out over them.
+
+    At most ``concurrency`` shards are queried at a time however many
+    there are. Pools open on first use and then stay open until close(),
+    so after a query has visited every shard, every shard file is open.
+    """
+
+    def __init__(
+        self,
+        shards: List[Tuple[str, str]],
+        make_pool: Callable[[str], ConnectionPool],
+        concurrency: int = 8,
+    ):
+        if not shards:
+            raise ValueError("No shard files found")
+        self.names = [name for name, _ in shards]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Shard names must be unique")
+        self.pools = {name: make_pool(path) for name, path in shards}
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fan_out(
+        self, run: Callable[[aiosqlite.Connection], Awaitable[Any]]
+    ) -> List[Tuple[str, Any, Optional[Exception], float]]:
+        """Call run on a connection to every shard.
+
+        Returns (shard, result, error, elapsed_ms) per shard in shard order;
+        a failing shard does not stop the others.
+        """
+
+        async def one(name: str) -> Tuple[str, Any, Optional[Exception], float]:
+            async with self._semaphore:
+                began = time.perf_counter()
+                result, error = None, None
+                try:
+                    async with self.pools[name].acquire() as db:
+                        result = await run(db)
+                except Exception as e:
+                    error = e
+                return name, result, error, (time.perf_counter() - began) * 1000
+
+        return await asyncio.gather(*(one(name) for name in self.names))
+
+    async def close(self) -> None:
+        for pool in self.pools.values():
+            await pool.close()
@@ -0,0 +1,167 @@
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import aiosqlite
+
+# Authorizer action codes by name, for error messages. Several of these
+# share numeric values with result codes, so they are listed explicitly.
+_ACTION_NAMES = {
+    getattr(sqlite3, name): name[len("SQLITE_") :]
+    for name in dir(sqlite3)
+    if name.startswith(("SQLITE_CREATE_", "SQLITE_DROP_"))
+}
+_ACTION_NAMES.update(
+    (getattr(sqlite3, f"SQLITE_{name}"), name)
+    for name in (
+        "ALTER_TABLE",
+        "ANALYZE",
+        "ATTACH",
+        "DELETE",
+        "DETACH",
+        "FUNCTION",
+        "INSERT",
+        "PRAGMA",
+        "READ",
+        "RECURSIVE",
+        "REINDEX",
+        "SAVEPOINT",
+        "SELECT",
+        "TRANSACTION",
+        "UPDATE",
+    )
+)
+
+# Always allowed: reading, and the BEGIN/COMMIT/ROLLBACK the driver issues
+_READ_ACTIONS = frozenset(
+    (
+        sqlite3.SQLITE_SELECT,
+        sqlite3.SQLITE_READ,
+        sqlite3.SQLITE_FUNCTION,
+        sqlite3.SQLITE_RECURSIVE,
+        sqlite3.SQLITE_TRANSACTION,
+        sqlite3.SQLITE_SAVEPOINT,
+    )
+)
+# Additionally allowed when the server is not read-only. Triggers and views
+# are left out: they would run SQL later, outside the statement checked here
+_WRITE_ACTIONS = frozenset(
+    (
+        sqlite3.SQLITE_INSERT,
+        sqlite3.SQLITE_ANALYZE,
+        # CREATE INDEX asks for REINDEX on the index it builds
+        sqlite3.SQLITE_REINDEX,
+        sqlite3.SQLITE_CREATE_INDEX,
+        sqlite3.SQLITE_CREATE_TABLE,
+        sqlite3.SQLITE_CREATE_TEMP_INDEX,
+        sqlite3.SQLITE_CREATE_TEMP_TABLE,
+    )
+)
+# Introspection pragmas whose argument names a table or index
+_INTROSPECTION_PRAGMAS = frozenset(
+    (
+        "foreign_key_list",
+        "index_info",
+        "index_list",
+        "index_xinfo",
+        "table_info",
+        "table_list",
+        "table_xinfo",
+    )
+)
+# Pragmas that are only safe when read, i.e. without a value
+_READ_PRAGMAS = frozenset(
+    (
+        "data_version",
+        "database_list",
+        "page_count",
+        "page_size",
+        "schema_version",
+        "user_version",
+    )
+)
+
+_SCHEMA_TABLES = frozenset(("sqlite_master", "sqlite_temp_master"))
+
+
+class QueryRejected(Exception):
+    """Raised when the authorizer refused to compile a statement"""
+
+    def __init__(self, action: str, target: Optional[str]):
+        detail = f"{action} on {target}" if target else action
+        super().__init__(f"Operation not allowed: {detail}")
+        self.action = action
+        self.target = target
+
+
+class _ConnectionGuard:
+    """The compiled policy plus the last denial seen on one connection"""
+
+    def __init__(self, allowed: frozenset):
+        self.allowed = allowed
+        self.allow_ddl = sqlite3.SQLITE_CREATE_TABLE in allowed
+        self.denied: Optional[Tuple[str, Optional[str]]] = None
+
+    def authorize(self, action, arg1, arg2, db_name, trigger_name) -> int:
+        # Runs on the connection's thread while SQLite prepares a statement
+        # Trigger bodies are compiled into the statement that fires them, so
+        # their actions are checked like the statement's own
+        if action in self.allowed:
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_PRAGMA and arg1:
+            pragma = arg1.lower()
+            if pragma in _INTROSPECTION_PRAGMAS or (
+                pragma in _READ_PRAGMAS and arg2 is None
+            ):
+                return sqlite3.SQLITE_OK
+        if (
+            self.allow_ddl
+            and action in (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE)
+            and arg1 in _SCHEMA_TABLES
+        ):
+            # CREATE records itself in the schema table; writing it directly
+            # is still refused by SQLite unless writable_schema is set
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_UPDATE and arg1 in _SCHEMA_TABLES:
+            # The first pragma_*() table-valued function on a connection
+            # registers its virtual table, reported as a schema update
+            return sqlite3.SQLITE_OK
+        if self.denied is None:
+            self.denied = (_ACTION_NAMES.get(action, str(action)), arg1)
+        return sqlite3.SQLITE_DENY
+
+
+class SqlGuard:
+    """Enforce the server's SQL policy with SQLite's authorizer callback.
+
+    SQLite asks the authorizer about every table, column, function and
+    statement type while it prepares a statement, so forbidden operations
+    fail before anything runs, wherever they appear in the SQL: after a
+    CTE, inside a subquery or behind a comment. Creating triggers and
+    views is never allowed, and the actions of existing triggers are held
+    to the same policy as the statement that fires them.
+    """
+
+    def __init__(self, read_only: bool = True):
+        self.read_only = read_only
+        self.allowed = _READ_ACTIONS if read_only else _READ_ACTIONS | _WRITE_ACTIONS
+        self._guards: Dict[int, _ConnectionGuard] = {}
+
+    async def install(self, db: aiosqlite.Connection) -> None:
+        """on_connect hook: attach the authorizer to a new connection"""
+        guard = _ConnectionGuard(self.allowed)
+        self._guards[id(db)] = guard
+        await db.set_authorizer(guard.authorize)
+
+    @asynccontextmanager
+    async def check(self, db: aiosqlite.Connection) -> AsyncIterator[None]:
+        """Turn authorizer denials inside the block into QueryRejected"""
+        guard = self._guards.get(id(db))
+        if guard is not None:
+            guard.denied = None
+        try:
+            yield
+        except sqlite3.DatabaseError as e:
+            if guard is not None and guard.denied is not None:
+                raise QueryRejected(*guard.denied) from e
+            raise
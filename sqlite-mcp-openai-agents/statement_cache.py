@@ -0,0 +1,39 @@
+from collections import OrderedDict
+from typing import Any, Dict
+
+
+class StatementCacheStats:
+    """Estimate how often execute_query reuses a prepared statement.
+
+    sqlite3 keeps an LRU of ``cached_statements`` prepared statements per
+    connection, keyed by SQL text, but does not report hits. This mirrors
+    that LRU for the statements execute_query runs on each connection.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._seen: Dict[int, "OrderedDict[str, None]"] = {}
+
+    def record(self, connection_id: int, sql: str) -> bool:
+        """Record that sql is about to run; return True if it was cached"""
+        seen = self._seen.setdefault(connection_id, OrderedDict())
+        if sql in seen:
+            seen.move_to_end(sql)
+            self.hits += 1
+            return True
+        self.misses += 1
+        seen[sql] = None
+        if len(seen) > self.size:
+            seen.popitem(last=False)
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
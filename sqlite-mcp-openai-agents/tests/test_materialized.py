@@ -0,0 +1,26 @@
+from materialized import ViewDefinition
+
+GROUPED = "SELECT status, count(*) AS orders FROM orders GROUP BY status"
+
+
+def test_append_only_source_is_refreshed_incrementally():
+    view = ViewDefinition("totals", GROUPED, source="orders", append_only=True)
+    assert view.mode == "incremental"
+    assert view.reason is None
+
+
+def test_mutable_source_is_refreshed_in_full():
+    view = ViewDefinition("totals", GROUPED, source="orders")
+    assert view.mode == "full"
+    assert "append_only" in view.reason
+
+
+def test_unmergeable_definition_is_refreshed_in_full():
+    view = ViewDefinition(
+        "recent",
+        "SELECT count(*) FROM (SELECT id FROM orders ORDER BY id DESC LIMIT 10)",
+        source="orders",
+        append_only=True,
+    )
+    assert view.mode == "full"
+    assert "subquery" in view.reason
@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from pagination import decode_page_token, encode_page_token, paginated_sql
+
+
+@pytest.fixture(scope="module")
+def db():
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    db.executemany("INSERT INTO t (name) VALUES (?)", [(c,) for c in "abcdefg"])
+    return db
+
+
+def _page(db, query, limit, offset, params=()):
+    cursor = db.execute(paginated_sql(query), (*params, limit, offset))
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+def test_duplicate_column_names_are_kept(db):
+    columns, rows = _page(
+        db, "SELECT a.id, b.id FROM t AS a JOIN t AS b USING (id) ORDER BY 1", 2, 3
+    )
+    assert columns == ["id", "id"]
+    assert rows == [(4, 4), (5, 5)]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT id FROM t ORDER BY id -- newest last",
+        "SELECT id FROM t ORDER BY id /* all */;",
+        "SELECT id FROM t ORDER BY id; -- done",
+        "WITH few AS (SELECT id FROM t ORDER BY id LIMIT 5) SELECT id FROM few",
+        "SELECT id FROM t WHERE id < 6 UNION ALL SELECT id FROM t WHERE id > 5",
+        "VALUES (1), (2), (3), (4), (5), (6), (7)",
+    ],
+)
+def test_page_is_cut_from_the_full_result(db, query):
+    full = db.execute(query).fetchall()
+    assert _page(db, query, 3, 2)[1] == full[2:5]
+
+
+def test_query_with_its_own_limit_is_paged_within_it(db):
+    query = "SELECT id, name FROM t ORDER BY id LIMIT ?"
+    columns, rows = _page(db, query, 2, 3, params=(4,))
+    assert columns == ["id", "name"]
+    assert rows == [(4, "d")]
+
+
+def test_named_parameters():
+    assert paginated_sql("SELECT * FROM t WHERE id > :id", named=True) == (
+        "SELECT * FROM t WHERE id > :id LIMIT :_page_limit OFFSET :_page_offset"
+    )
+
+
+def test_only_reads_are_paged():
+    with pytest.raises(ValueError):
+        paginated_sql("DELETE FROM t")
+
+
+def test_tokens_belong_to_their_query_and_params():
+    token = encode_page_token("SELECT * FROM t", 20, [1])
+    assert decode_page_token(token, "SELECT * FROM t", [1]) == 20
+    with pytest.raises(ValueError):
+        decode_page_token(token, "SELECT * FROM t", [2])
+    with pytest.raises(ValueError):
+        decode_page_token("not a token", "SELECT * FROM t", [1])
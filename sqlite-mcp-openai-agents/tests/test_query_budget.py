@@ -0,0 +1,42 @@
+import asyncio
+
+import aiosqlite
+import pytest
+
+from query_budget import BudgetExceeded, QueryBudgets
+
+SLOW = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c "
+    "WHERE x < 100000000) SELECT count(*) FROM c"
+)
+
+
+def _run(budgets, sql, timeout_ms=None):
+    async def go():
+        async with aiosqlite.connect(":memory:") as db:
+            await budgets.install(db)
+            async with budgets.limit(db, timeout_ms):
+                return await db.execute_fetchall(sql)
+
+    return asyncio.run(go())
+
+
+def test_override_applies_without_a_configured_budget():
+    with pytest.raises(BudgetExceeded) as exceeded:
+        _run(QueryBudgets(), SLOW, timeout_ms=50)
+    assert exceeded.value.budget == "time_ms"
+    assert exceeded.value.limit == 50
+
+
+def test_configured_budgets_apply():
+    with pytest.raises(BudgetExceeded) as exceeded:
+        _run(QueryBudgets(max_steps=100000), SLOW)
+    assert exceeded.value.budget == "vm_steps"
+    with pytest.raises(BudgetExceeded) as exceeded:
+        _run(QueryBudgets(timeout_ms=50), SLOW)
+    assert exceeded.value.budget == "time_ms"
+
+
+def test_zero_override_lifts_the_time_budget():
+    sql = SLOW.replace("100000000", "200000")
+    assert _run(QueryBudgets(timeout_ms=1), sql, timeout_ms=0)[0][0] == 200000
@@ -0,0 +1,42 @@
+import pytest
+
+from query_cache import is_cacheable
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT * FROM orders WHERE status = 'Completed'",
+        "SELECT date(created_at), count(*) FROM orders GROUP BY 1",
+        "SELECT datetime(created_at, '+1 day') FROM orders",
+        "SELECT strftime('%Y', created_at) FROM orders",
+        "WITH t AS (SELECT 1) SELECT * FROM t",
+    ],
+)
+def test_deterministic_reads_are_cacheable(query):
+    assert is_cacheable(query)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT CURRENT_TIMESTAMP",
+        "SELECT current_date",
+        "SELECT * FROM orders WHERE created_at > CURRENT_TIME",
+        "SELECT date()",
+        "SELECT time( )",
+        "SELECT datetime()",
+        "SELECT julianday() - julianday(created_at) FROM orders",
+        "SELECT unixepoch()",
+        "SELECT strftime('%s')",
+        "SELECT date('now', '-7 days')",
+        "SELECT random()",
+        "SELECT last_insert_rowid()",
+    ],
+)
+def test_volatile_reads_are_not_cacheable(query):
+    assert not is_cacheable(query)
+
+
+def test_writes_are_not_cacheable():
+    assert not is_cacheable("INSERT INTO feedback VALUES (1)")
@@ -0,0 +1,93 @@
+import asyncio
+import csv
+
+import aiosqlite
+import pytest
+
+from result_export import export_rows
+
+ROWS = [
+    (1, None, None, "a"),
+    (2, None, 3, "b"),
+    (3, 1.5, None, b"\x00\xff"),
+    (4, 2.5, "x", None),
+]
+
+
+def _export(tmp_path, fmt, sql, rows=ROWS, chunk_rows=1):
+    path = str(tmp_path / f"out.{fmt}")
+
+    async def go():
+        async with aiosqlite.connect(":memory:") as db:
+            await db.execute("CREATE TABLE t (id INTEGER, x, y, z)")
+            await db.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", rows)
+            async with db.execute(sql) as cursor:
+                return await export_rows(cursor, path, fmt, chunk_rows=chunk_rows)
+
+    return path, asyncio.run(go())
+
+
+def _read(path, fmt):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    if fmt == "parquet":
+        return pa.parquet.ParquetFile(path).read()
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def test_csv_keeps_blobs_as_hex(tmp_path):
+    path, result = _export(tmp_path, "csv", "SELECT id, z FROM t")
+    with open(path, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f))[1:] == [
+            ["1", "a"],
+            ["2", "b"],
+            ["3", "00ff"],
+            ["4", ""],
+        ]
+    assert result["row_count"] == 4
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columns_are_widened_across_chunks(tmp_path, fmt):
+    pytest.importorskip("pyarrow")
+    path, result = _export(tmp_path, fmt, "SELECT * FROM t ORDER BY id")
+    table = _read(path, fmt)
+    assert [str(t) for t in table.schema.types] == [
+        "int64",
+        "double",
+        "string",
+        "string",
+    ]
+    assert table.to_pydict() == {
+        "id": [1, 2, 3, 4],
+        "x": [None, None, 1.5, 2.5],
+        "y": [None, "3", None, "x"],
+        "z": ["a", "b", "00ff", None],
+    }
+    assert result["row_count"] == 4
+    assert not list(tmp_path.glob("*.part*")) and not list(tmp_path.glob("*.old"))
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_duplicate_column_names_are_kept(tmp_path, fmt):
+    pytest.importorskip("pyarrow")
+    sql = "SELECT a.id, b.id FROM t AS a JOIN t AS b ON b.id = a.id + 1 ORDER BY 1"
+    path, _ = _export(tmp_path, fmt, sql, chunk_rows=2)
+    table = _read(path, fmt)
+    assert table.column_names == ["id", "id"]
+    assert [table.column(0).to_pylist(), table.column(1).to_pylist()] == [
+        [1, 2, 3],
+        [2, 3, 4],
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_empty_result_leaves_untyped_columns(tmp_path, fmt):
+    pytest.importorskip("pyarrow")
+    path, result = _export(tmp_path, fmt, "SELECT id, x FROM t WHERE 0")
+    table = _read(path, fmt)
+    assert table.num_rows == 0
+    assert table.column_names == ["id", "x"]
+    assert result["row_count"] == 0
@@ -0,0 +1,142 @@
+import sqlite3
+
+import pytest
+
+from shards import _tokenize, plan_merge
+
+ROWS = [
+    (i, f"g{i % 5}", ["a", "A", "b"][i % 3], i * 1.5 if i % 7 else None)
+    for i in range(1, 46)
+]
+
+
+def _database(rows):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, g TEXT, name TEXT, x REAL)")
+    db.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", rows)
+    return db
+
+
+@pytest.fixture(scope="module")
+def shards():
+    return [_database(ROWS[i::3]) for i in range(3)]
+
+
+@pytest.fixture(scope="module")
+def combined():
+    return _database(ROWS)
+
+
+def _run_sharded(shards, sql):
+    plan = plan_merge(sql)
+    results = []
+    for i, db in enumerate(shards):
+        cursor = db.execute(plan.sql)
+        columns = [column[0] for column in cursor.description]
+        results.append((f"s{i}", columns, cursor.fetchall()))
+    return plan.merge(results, max_groups=1000)
+
+
+def test_tokenize_skips_comments_and_tracks_depth():
+    tokens = _tokenize("SELECT count(*) -- total\nFROM /* all */ t")
+    assert [t.text for t in tokens] == ["SELECT", "count", "(", "*", ")", "FROM", "t"]
+    assert [t.depth for t in tokens] == [0, 0, 0, 1, 0, 0, 0]
+
+
+def test_tokenize_keeps_strings_and_quoted_names_whole():
+    tokens = _tokenize("SELECT 'it''s (' AS \"a b\", [c] FROM t WHERE x = ?1")
+    assert [(t.kind, t.key) for t in tokens] == [
+        ("word", "select"),
+        ("string", "'it''s ('"),
+        ("word", "as"),
+        ("quoted", "a b"),
+        ("other", ","),
+        ("quoted", "c"),
+        ("word", "from"),
+        ("word", "t"),
+        ("word", "where"),
+        ("word", "x"),
+        ("other", "="),
+        ("param", "?1"),
+    ]
+    assert all(t.depth == 0 for t in tokens)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM t ORDER BY id",
+        "SELECT id, g, x FROM t WHERE x > 10 ORDER BY x DESC, id LIMIT 7",
+        "SELECT id FROM t ORDER BY id LIMIT 5 OFFSET 3",
+        "SELECT count(*), sum(x), total(x), min(x), max(x), avg(x) FROM t",
+        "SELECT g, count(*) AS n, avg(x) FROM t GROUP BY g ORDER BY g",
+        "SELECT g, max(x) FROM t GROUP BY 1 ORDER BY 2 DESC LIMIT 2",
+        "SELECT DISTINCT g FROM t ORDER BY g",
+        "SELECT name, max(x) FROM t",
+        "SELECT g, count(*) FROM t WHERE id IN (SELECT id FROM t WHERE x > 20) "
+        "GROUP BY g ORDER BY g",
+        "WITH big AS (SELECT * FROM t WHERE x > 20) SELECT count(*) FROM big",
+        "SELECT max(id, 3) AS m FROM (SELECT id FROM t) ORDER BY m",
+    ],
+)
+def test_merged_result_matches_one_database(shards, combined, sql):
+    columns, rows = _run_sharded(shards, sql)
+    cursor = combined.execute(sql)
+    assert columns == [column[0] for column in cursor.description]
+    expected = cursor.fetchall()
+    if " ORDER BY " not in sql:
+        rows, expected = sorted(rows, key=repr), sorted(expected, key=repr)
+    assert [tuple(r) for r in rows] == [
+        tuple(pytest.approx(v) if isinstance(v, float) else v for v in r)
+        for r in expected
+    ]
+
+
+def test_avg_is_summed_and_counted_per_shard():
+    plan = plan_merge("SELECT g, avg(x) FROM t GROUP BY g")
+    assert plan.sql == (
+        'SELECT g, sum(x) AS "avg(x)", count(x) AS "_shard_count_1" FROM t GROUP BY g'
+    )
+    assert plan.kind == "aggregate"
+
+
+def test_limit_is_pushed_down_with_offset():
+    plan = plan_merge("SELECT id FROM t ORDER BY id LIMIT 3, 4")
+    assert plan.sql == "SELECT id FROM t ORDER BY id LIMIT 7"
+    assert (plan.limit, plan.offset) == (4, 3)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        # Per-shard answers to the subquery cannot be combined
+        "SELECT count(*) FROM (SELECT g FROM t GROUP BY g)",
+        "WITH top AS (SELECT id FROM t ORDER BY x DESC LIMIT 3) "
+        "SELECT count(*) FROM top",
+        "SELECT * FROM (SELECT id FROM t ORDER BY id LIMIT 2)",
+        "SELECT count(*) FROM (SELECT DISTINCT g FROM t)",
+        "SELECT id FROM t WHERE x > (SELECT avg(x) FROM t)",
+        "SELECT id, (SELECT count(*) FROM t AS u WHERE u.g = t.g) FROM t",
+        "SELECT * FROM (SELECT id, rank() OVER (ORDER BY x) FROM t)",
+        "SELECT count(*) FROM (SELECT g FROM t UNION SELECT name FROM t)",
+        # Grouping under a collation splits the groups when merged
+        "SELECT name, count(*) FROM t GROUP BY name COLLATE nocase",
+        "SELECT name COLLATE nocase AS n, count(*) FROM t GROUP BY n",
+        # Top-level shapes that cannot be merged
+        "SELECT g, count(*) FROM t GROUP BY g HAVING count(*) > 2",
+        "SELECT count(DISTINCT g) FROM t",
+        "SELECT round(avg(x), 2) FROM t",
+        "SELECT g FROM t UNION SELECT name FROM t",
+        "SELECT id FROM t LIMIT ?",
+        "SELECT count(*) FROM t GROUP BY g",
+        "DELETE FROM t",
+    ],
+)
+def test_unmergeable_queries_are_rejected(sql):
+    with pytest.raises(ValueError):
+        plan_merge(sql)
+
+
+def test_union_all_in_a_subquery_is_merged(shards, combined):
+    sql = "SELECT count(*) FROM (SELECT g FROM t UNION ALL SELECT name FROM t)"
+    assert _run_sharded(shards, sql)[1] == combined.execute(sql).fetchall()
@@ -0,0 +1,89 @@
+import asyncio
+import sqlite3
+
+import aiosqlite
+import pytest
+
+from sql_guard import QueryRejected, SqlGuard
+
+
+def _run(sql, read_only, setup=(), params=()):
+    """Run sql on a fresh guarded database, returning its rows and users left"""
+
+    async def go():
+        async with aiosqlite.connect(":memory:") as db:
+            await db.executescript(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT);"
+                "CREATE TABLE feedback (id INTEGER PRIMARY KEY, text TEXT);"
+                "INSERT INTO users (name) VALUES ('a'), ('b');" + "".join(setup)
+            )
+            guard = SqlGuard(read_only=read_only)
+            await guard.install(db)
+            try:
+                async with guard.check(db):
+                    rows = await db.execute_fetchall(sql, params)
+            finally:
+                await db.commit()
+                users = (await db.execute_fetchall("SELECT count(*) FROM users"))[0]
+            return rows, users[0]
+
+    return asyncio.run(go())
+
+
+@pytest.mark.parametrize("read_only", [True, False])
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM users",
+        "WITH u AS (SELECT name FROM users) SELECT * FROM u",
+        "SELECT 'drop table users; delete from users' AS text",
+        "SELECT * FROM users WHERE name = 'update'",
+        "SELECT * FROM pragma_table_info('users')",
+        "PRAGMA table_info(users)",
+    ],
+)
+def test_reads_are_allowed(sql, read_only):
+    _run(sql, read_only)
+
+
+@pytest.mark.parametrize("read_only", [True, False])
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM users",
+        "UPDATE users SET name = 'x'",
+        "DROP TABLE users",
+        "ALTER TABLE users ADD COLUMN x",
+        "ATTACH DATABASE ':memory:' AS other",
+        "PRAGMA user_version = 3",
+        "CREATE TRIGGER tr AFTER INSERT ON feedback BEGIN DELETE FROM users; END",
+        "CREATE TEMP TRIGGER tr AFTER INSERT ON feedback "
+        "BEGIN DELETE FROM users; END",
+        "CREATE VIEW v AS SELECT * FROM users",
+        "CREATE TEMP VIEW v AS SELECT * FROM users",
+        "WITH u AS (SELECT 1) DELETE FROM users",
+    ],
+)
+def test_forbidden_statements_are_rejected(sql, read_only):
+    with pytest.raises(QueryRejected):
+        _run(sql, read_only)
+
+
+def test_writes_need_write_mode():
+    with pytest.raises(QueryRejected):
+        _run("INSERT INTO feedback (text) VALUES ('delete from users')", True)
+    _, users = _run("INSERT INTO feedback (text) VALUES ('delete from users')", False)
+    assert users == 2
+
+
+def test_existing_trigger_actions_are_checked():
+    trigger = "CREATE TRIGGER tr AFTER INSERT ON feedback BEGIN DELETE FROM users; END;"
+    with pytest.raises(QueryRejected, match="DELETE on users"):
+        _run("INSERT INTO feedback (text) VALUES ('hi')", False, setup=[trigger])
+
+
+def test_multiple_statements_are_not_run():
+    with pytest.raises(sqlite3.ProgrammingError):
+        _run("SELECT 1; DELETE FROM users", False)
+    with pytest.raises(sqlite3.ProgrammingError):
+        _run("INSERT INTO feedback (text) VALUES ('x'); DROP TABLE users", False)